@@ -0,0 +1,119 @@
+# leoweb/admin/acceso.py
+# Guardia única para las páginas del admin.
+#
+#     @admin_requerido
+#     async def on_load(self):
+#         ...  # sólo corre si la sesión es de un admin vigente
+#
+# El rol se confirma contra la BD (no sólo contra lo que quedó guardado en la
+# sesión al hacer login) pero se cachea por usuario ROL_TTL segundos, así que
+# navegar entre páginas del admin no cuesta consultas. Para revocar en todos
+# los workers se publica por el bus: bus.publicar(cur, "roles", id_usuario).
+# La consulta (psycopg2 es síncrono) corre en un hilo, fuera del event loop.
+import asyncio
+import functools
+import inspect
+import time
+from typing import Dict, Optional, Tuple
+
+import reflex as rx
+
+from ..auth_state import AuthState, get_connection
+from . import bus
+
+# Vigencia del rol cacheado (segundos)
+ROL_TTL = 60
+
+# id_usuario -> (rol o None si ya no existe, expira_en)
+_roles: Dict[int, Tuple[Optional[str], float]] = {}
+
+
+def revocar_rol(id_usuario: int):
+    """Olvida el rol cacheado; la siguiente carga vuelve a consultarlo."""
+    _roles.pop(id_usuario, None)
+
+
+def _invalidar_roles(clave: Optional[str]):
+    if clave is None:
+        _roles.clear()
+    else:
+        revocar_rol(int(clave))
+
+
+bus.registrar_cache("roles", _invalidar_roles)
+
+
+def _rol_cacheado(id_usuario: int) -> Optional[Tuple[Optional[str]]]:
+    """(rol,) si sigue vigente en la caché; None si hay que consultarlo."""
+    cacheado = _roles.get(id_usuario)
+    if cacheado is not None and time.monotonic() < cacheado[1]:
+        return (cacheado[0],)
+    return None
+
+
+def rol_vigente(id_usuario: int) -> Optional[str]:
+    """Rol actual del usuario (None si fue eliminado), con caché de ROL_TTL."""
+    cacheado = _rol_cacheado(id_usuario)
+    if cacheado is not None:
+        return cacheado[0]
+
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT rol FROM usuarios WHERE id_usuario = %s AND eliminado_en IS NULL;",
+            (id_usuario,),
+        )
+        row = cur.fetchone()
+        rol = row[0] if row else None
+    finally:
+        if conn:
+            conn.close()
+
+    _roles[id_usuario] = (rol, time.monotonic() + ROL_TTL)
+    return rol
+
+
+def admin_requerido(on_load):
+    """Decorador de on_load: corta (sin tocar la BD de la página) si no es admin."""
+
+    @functools.wraps(on_load)
+    async def envoltura(self, *args, **kwargs):
+        auth_state = await self.get_state(AuthState)
+
+        # Redireccionar si no está logueado
+        if not auth_state.logged_in or auth_state.current_user is None:
+            return rx.redirect("/login")
+
+        try:
+            # Con la caché vigente no hace falta ni el hilo
+            cacheado = _rol_cacheado(auth_state.current_user)
+            if cacheado is not None:
+                rol = cacheado[0]
+            else:
+                rol = await asyncio.to_thread(rol_vigente, auth_state.current_user)
+        except Exception as e:
+            print(f"Error verificando rol de admin: {e}")
+            return rx.toast.error("No se pudo verificar tu sesión. Intenta de nuevo.")
+
+        # La cuenta ya no existe: cerrar la sesión
+        if rol is None:
+            return auth_state.logout()
+
+        # Mantener la sesión al día si el rol cambió desde el login
+        auth_state.rol = rol
+
+        # Redireccionar si no es admin
+        if rol != "admin":
+            return [
+                rx.toast.error("Acceso denegado. Se requiere ser administrador."),
+                rx.redirect("/")
+            ]
+
+        resultado = on_load(self, *args, **kwargs)
+        if inspect.isawaitable(resultado):
+            resultado = await resultado
+        return resultado
+
+    return envoltura
@@ -0,0 +1,154 @@
+# leoweb/admin/agrupacion.py
+# Agrupación por día compartida por las páginas de reservaciones y eventos.
+#
+# La BD entrega las filas ya ordenadas por "cubeta" (ver ORDEN_POR_FECHA_SQL):
+# primero hoy y el futuro del más cercano al más lejano, luego el pasado del más
+# reciente al más antiguo, y dentro de cada día por hora. Con eso agrupar es una
+# sola pasada lineal, sin separar ni volver a ordenar en Python.
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+# Traducción manual de días y meses (para evitar problemas de locale).
+# Indexados por date.weekday() y date.month - 1.
+DIAS_ES = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+MESES_ES = [
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio",
+    "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre",
+]
+
+# Clave del separador entre los días futuros y los pasados
+PAST_HEADER_KEY = "__PAST_HEADER__"
+
+# ORDER BY que produce el orden por cubetas. Recibe la fecha de "hoy" como
+# parámetro (la del servidor de Python, la misma que usa agrupar_por_fecha).
+ORDEN_POR_FECHA_SQL = """
+    ORDER BY ({fecha} < %s),
+             CASE WHEN {fecha} >= %s THEN {fecha} END ASC,
+             {fecha} DESC,
+             {hora} ASC
+"""
+
+
+def orden_por_fecha_sql(fecha: str, hora: str) -> str:
+    """ORDER BY por cubetas para las columnas dadas (usa dos parámetros: hoy, hoy)."""
+    return ORDEN_POR_FECHA_SQL.format(fecha=fecha, hora=hora)
+
+
+# El mismo orden como una tupla comparable, con el id para desempatar: sirve
+# de ORDER BY y de condición keyset ("después de esta fila"). Para la cubeta
+# de pasadas la distancia a hoy crece hacia atrás, así que todo va ASC.
+# Usa dos parámetros: hoy, hoy.
+CLAVE_POR_FECHA_SQL = "(({fecha} < %s), ABS({fecha} - %s::date), {hora}, {id})"
+
+
+def clave_por_fecha_sql(fecha: str, hora: str, id_col: str) -> str:
+    """Tupla SQL del orden por cubetas + id (ver CLAVE_POR_FECHA_SQL)."""
+    return CLAVE_POR_FECHA_SQL.format(fecha=fecha, hora=hora, id=id_col)
+
+
+def clave_keyset(fecha_dt: datetime, id_fila: int, hoy: date) -> Tuple[bool, int, Any, int]:
+    """Valores de CLAVE_POR_FECHA_SQL para una fila (para continuar después de ella)."""
+    dia = fecha_dt.date()
+    return (dia < hoy, abs((dia - hoy).days), fecha_dt.time(), id_fila)
+
+
+def clave_orden(fecha_dt: datetime, hoy: date) -> Tuple[bool, int, Any]:
+    """Clave de ordenamiento en Python equivalente a ORDEN_POR_FECHA_SQL."""
+    dia = fecha_dt.date()
+    pasado = dia < hoy
+    return (pasado, -dia.toordinal() if pasado else dia.toordinal(), fecha_dt.time())
+
+
+def minuto_actual() -> int:
+    """
+    Minuto actual (segundos epoch // 60). Las vistas cacheadas que comparan
+    contra "ahora" (es_pasada, HOY / MAÑANA) lo llevan como dependencia para
+    recalcularse aunque los datos no cambien.
+    """
+    return int(datetime.now().timestamp()) // 60
+
+
+def reordenar_por_fecha(almacen: Dict[int, Any], hoy: date) -> Dict[int, Any]:
+    """Reordena un almacén {id: fila} por cubetas con otro "hoy" (al cambiar de día)."""
+    return dict(sorted(almacen.items(), key=lambda par: clave_orden(par[1].fecha_dt, hoy)))
+
+
+@lru_cache(maxsize=4096)
+def encabezado_fecha(dia: date) -> str:
+    """Encabezado localizado, p. ej. 'LUNES, 05 DE ENERO DE 2026' (memoizado por fecha)."""
+    return f"{DIAS_ES[dia.weekday()].upper()}, {dia.day:02d} DE {MESES_ES[dia.month - 1].upper()} DE {dia.year}"
+
+
+@lru_cache(maxsize=4096)
+def fecha_corta(dia: date) -> str:
+    """'05/01/2026' (memoizado: muchas filas comparten fecha)."""
+    return dia.strftime("%d/%m/%Y")
+
+
+@lru_cache(maxsize=1024)
+def hora_12(hora: time) -> str:
+    """'08:30 PM' (memoizado: las horas se repiten mucho)."""
+    return hora.strftime("%I:%M %p")
+
+
+def encabezado(dia: date, hoy: date) -> str:
+    """Igual que encabezado_fecha pero con HOY / MAÑANA (que dependen del día actual)."""
+    if dia == hoy:
+        return "HOY"
+    if dia == hoy + timedelta(days=1):
+        return "MAÑANA"
+    return encabezado_fecha(dia)
+
+
+def agrupar_por_fecha(
+    filas: List[Any],
+    clave_lista: str,
+    titulo_pasadas: str,
+    hoy: Optional[date] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Agrupa filas (ya ordenadas por cubetas) por su atributo `fecha_dt`.
+
+    Regresa { "2026-01-05": {"header": ..., clave_lista: [...]}, ... } en orden
+    de inserción, con un grupo vacío PAST_HEADER_KEY antes del primer día pasado.
+    """
+    hoy = hoy or date.today()
+    grupos: Dict[str, Dict[str, Any]] = {}
+    grupo = None
+    dia_actual = None
+    en_pasado = False
+
+    for fila in filas:
+        dia = fila.fecha_dt.date()
+        if dia != dia_actual:
+            if dia < hoy and not en_pasado:
+                en_pasado = True
+                grupos[PAST_HEADER_KEY] = {"header": titulo_pasadas, clave_lista: []}
+
+            dia_actual = dia
+            key = dia.isoformat()
+            grupo = grupos.get(key)
+            if grupo is None:
+                grupo = grupos[key] = {"header": encabezado(dia, hoy), clave_lista: []}
+
+        grupo[clave_lista].append(fila)
+
+    return grupos
+
+
+def agrupar_ids_por_fecha(
+    filas: List[Any],
+    clave_id: str,
+    titulo_pasadas: str,
+    hoy: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Como agrupar_por_fecha, pero cada grupo sólo lleva los ids de sus filas:
+    [{"clave": "2026-01-05", "header": ..., "ids": [...]}, ...]. Las filas viven
+    una sola vez en el almacén por id del state; los grupos sólo las ordenan.
+    """
+    return [
+        {"clave": clave, "header": grupo["header"], "ids": [getattr(f, clave_id) for f in grupo["filas"]]}
+        for clave, grupo in agrupar_por_fecha(filas, "filas", titulo_pasadas, hoy).items()
+    ]
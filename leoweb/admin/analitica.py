@@ -0,0 +1,94 @@
+# leoweb/admin/analitica.py
+# Series de tiempo del dashboard (reservaciones, personas e ingresos).
+#
+# No se agregan las tablas crudas `reserva`/`eventos` en cada visita: los
+# triggers de leoweb/schema.py mantienen `resumen_diario` (una fila por día y
+# sucursal) y aquí sólo se suman esas filas por día, semana o mes. Un año entero
+# son a lo mucho 365 x sucursales filas, así que cualquier rango sale en ms.
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+# periodo del dashboard -> unidad de date_trunc
+PERIODOS = {"dia": "day", "semana": "week", "mes": "month"}
+
+# Cuántos periodos hacia atrás se muestran por defecto
+PERIODOS_POR_DEFECTO = {"dia": 30, "semana": 12, "mes": 12}
+
+# id_sucursal con el que se guardan los eventos a domicilio y las reservas sin sucursal
+SIN_SUCURSAL = 0
+
+# generate_series pone en cero los periodos sin movimiento para que la
+# gráfica no se salte días
+SERIE_QUERY = """
+    SELECT
+        p.inicio::date AS periodo,
+        COALESCE(SUM(r.reservas), 0) AS reservas,
+        COALESCE(SUM(r.personas_reservas), 0) AS personas_reservas,
+        COALESCE(SUM(r.eventos), 0) AS eventos,
+        COALESCE(SUM(r.personas_eventos), 0) AS personas_eventos,
+        COALESCE(SUM(r.ingresos), 0) AS ingresos
+    FROM generate_series(
+        date_trunc(%(unidad)s, %(desde)s::timestamp),
+        %(hasta)s::timestamp,
+        ('1 ' || %(unidad)s)::interval
+    ) AS p(inicio)
+    LEFT JOIN resumen_diario r
+        ON date_trunc(%(unidad)s, r.dia::timestamp) = p.inicio
+       AND r.dia BETWEEN %(desde)s AND %(hasta)s
+       {sucursal}
+    GROUP BY p.inicio
+    ORDER BY p.inicio;
+"""
+
+# Formato de la etiqueta del eje X por periodo
+ETIQUETAS = {"dia": "%d/%m", "semana": "%d/%m", "mes": "%m/%Y"}
+
+
+def rango_por_defecto(periodo: str, hoy: Optional[date] = None) -> Tuple[date, date]:
+    """Rango (desde, hasta) que muestra el dashboard para un periodo."""
+    hoy = hoy or date.today()
+    n = PERIODOS_POR_DEFECTO[periodo]
+    if periodo == "dia":
+        return hoy - timedelta(days=n - 1), hoy
+    if periodo == "semana":
+        return hoy - timedelta(days=hoy.weekday() + 7 * (n - 1)), hoy
+    # Primer día del mes de hace n - 1 meses
+    mes = hoy.year * 12 + hoy.month - 1 - (n - 1)
+    return date(mes // 12, mes % 12 + 1, 1), hoy
+
+
+def serie_actividad(
+    cur,
+    periodo: str,
+    desde: date,
+    hasta: date,
+    id_sucursal: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Devuelve la serie agregada entre `desde` y `hasta` (inclusive).
+
+    Con `id_sucursal` sólo cuenta esa sucursal (y por lo tanto deja fuera los
+    eventos a domicilio, que no tienen sucursal).
+    """
+    if periodo not in PERIODOS:
+        raise ValueError(f"Periodo inválido: {periodo}")
+
+    params: Dict[str, Any] = {"unidad": PERIODOS[periodo], "desde": desde, "hasta": hasta}
+    filtro = ""
+    if id_sucursal is not None:
+        filtro = "AND r.id_sucursal = %(sucursal)s"
+        params["sucursal"] = id_sucursal
+
+    cur.execute(SERIE_QUERY.format(sucursal=filtro), params)
+
+    formato = ETIQUETAS[periodo]
+    return [
+        {
+            "periodo": inicio.strftime(formato),
+            "reservas": int(reservas),
+            "personas": int(personas_r + personas_e),
+            "eventos": int(eventos),
+            "ingresos": float(ingresos),
+        }
+        for inicio, reservas, personas_r, eventos, personas_e, ingresos in cur.fetchall()
+    ]
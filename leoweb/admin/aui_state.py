@@ -1,8 +1,12 @@
 # leoweb/admin/aui_state.py
-import reflex as rx
+# Estado visual del admin, sólo en el navegador (ver leoweb/ui_state.py).
+from reflex.experimental.client_state import ClientStateVar
 
-class AUIState(rx.State):
-    sidebar_open: bool = True # Por defecto abierta en admin suele ser mejor
+from ..ui_state import alternar
 
-    def toggle_sidebar(self):
-        self.sidebar_open = not self.sidebar_open
\ No newline at end of file
+
+class AUIState:
+    # Por defecto abierta en admin suele ser mejor
+    sidebar = ClientStateVar.create("admin_sidebar_open", default=True)
+    sidebar_open = sidebar.value
+    toggle_sidebar = alternar(sidebar)
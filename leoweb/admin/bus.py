@@ -0,0 +1,46 @@
+# leoweb/admin/bus.py
+# Bus de invalidación de cachés entre procesos.
+#
+# Con varios workers del backend cada proceso tiene sus propias cachés
+# (snapshot del dashboard, roles del admin...). Quien cambia algo publica la
+# invalidación con pg_notify en el canal CANAL_BUS; la escucha el listener
+# único de cada worker (leoweb/admin/live.py) y la aplica en su proceso. Como
+# NOTIFY es transaccional, los demás workers sólo se enteran si hay commit.
+import json
+from typing import Callable, Dict, Optional
+
+CANAL_BUS = "invalidar_cache"
+
+# nombre de la caché -> función que la invalida (recibe la clave o None = toda)
+_CACHES: Dict[str, Callable[[Optional[str]], None]] = {}
+
+
+def registrar_cache(nombre: str, invalidar: Callable[[Optional[str]], None]):
+    """Declara una caché local que se puede invalidar por el bus."""
+    _CACHES[nombre] = invalidar
+
+
+def invalidar_local(nombre: str, clave: Optional[str] = None):
+    """Invalida la caché sólo en este proceso."""
+    invalidar = _CACHES.get(nombre)
+    if invalidar is not None:
+        invalidar(clave)
+
+
+def publicar(cur, nombre: str, clave: Optional[object] = None):
+    """
+    Invalida la caché aquí de inmediato y la publica para los demás workers
+    (se entrega al hacer commit de la transacción de `cur`).
+    """
+    clave = None if clave is None else str(clave)
+    invalidar_local(nombre, clave)
+    cur.execute(
+        "SELECT pg_notify(%s, %s);",
+        (CANAL_BUS, json.dumps({"cache": nombre, "clave": clave})),
+    )
+
+
+def aplicar(payload: str):
+    """Aplica una invalidación recibida por el bus."""
+    datos = json.loads(payload)
+    invalidar_local(datos["cache"], datos.get("clave"))
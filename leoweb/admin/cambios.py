@@ -0,0 +1,150 @@
+# leoweb/admin/cambios.py
+# Lectura del feed de cambios (tabla `cambios`, ver leoweb/schema.py) para que
+# los states del admin parchen sólo las filas que cambiaron en lugar de recargar
+# todo después de cada operación.
+#
+# La marca que guarda cada state es el xmin del snapshot con el que leyó: toda
+# transacción con xid menor ya había terminado, así que sus cambios ya se
+# veían. Lo que pudo faltar (transacciones en curso o posteriores) tiene
+# xid >= marca, y eso es lo que se vuelve a pedir. No depende del orden de
+# `id_cambio`, que se asigna al insertar y no al hacer commit. Releer un
+# cambio ya aplicado no hace daño: las filas se vuelven a leer por id.
+#
+# Cada trigger agrega filas al feed; purgar_cambios_periodicamente() (una
+# tarea de fondo registrada en leoweb.py) borra las de más de CAMBIOS_RETENCION.
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from ..auth_state import get_connection
+from . import lider
+
+# Los cambios viejos ya no le sirven a nadie (cualquier state que lleve más de
+# CAMBIOS_RETENCION sin sincronizar vuelve a cargar todo), así que se purgan
+CAMBIOS_RETENCION = "1 day"
+# Cada cuánto corre la purga (segundos)
+CAMBIOS_PURGA_SEGUNDOS = 15 * 60
+
+# Borra lo viejo y recuerda hasta qué xid se borró (ver cambios_desde)
+PURGAR_CAMBIOS_SQL = """
+    WITH purgados AS (
+        DELETE FROM cambios WHERE fecha < now() - %s::interval RETURNING xid
+    )
+    INSERT INTO cambios_purga (id, hasta_xid)
+    SELECT TRUE, MAX(xid) FROM purgados HAVING COUNT(*) > 0
+    ON CONFLICT (id) DO UPDATE SET hasta_xid = GREATEST(cambios_purga.hasta_xid, EXCLUDED.hasta_xid);
+"""
+
+# Marca actual y hasta dónde se purgó el feed
+MARCA_SQL = """
+    SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint,
+           (SELECT hasta_xid FROM cambios_purga);
+"""
+
+
+def ultimo_cambio(cur) -> int:
+    """Marca del feed; se toma ANTES de leer las filas."""
+    cur.execute(MARCA_SQL)
+    return cur.fetchone()[0]
+
+
+def cambios_desde(cur, tabla: str, desde: int) -> Optional[Tuple[List[int], Set[int], int]]:
+    """
+    Obtiene los registros de `tabla` que pudieron cambiar desde la marca `desde`.
+
+    Regresa (ids_modificados, ids_eliminados, marca_nueva). Si el feed ya se
+    purgó más allá de `desde` regresa None y el state debe hacer una carga
+    completa. Un feed vacío significa "sin cambios".
+    """
+    cur.execute(MARCA_SQL)
+    marca, purgado = cur.fetchone()
+    if purgado is not None and purgado >= desde:
+        return None
+
+    # Sólo importa la última operación de cada registro (los cambios de una
+    # misma fila sí llegan en orden: el lock de la fila los serializa)
+    cur.execute("""
+        SELECT DISTINCT ON (id_registro) id_registro, operacion
+        FROM cambios
+        WHERE tabla = %s AND xid >= %s
+        ORDER BY id_registro, id_cambio DESC;
+    """, (tabla, desde))
+
+    modificados = []
+    eliminados = set()
+    for id_registro, operacion in cur.fetchall():
+        if operacion == "D":
+            eliminados.add(id_registro)
+        else:
+            modificados.append(id_registro)
+
+    return modificados, eliminados, marca
+
+
+def leer_filas(cur, fetch, clave: str, modificados: List[int], eliminados: Set[int]) -> Tuple[List[Any], Set[int]]:
+    """
+    Lee con `fetch(cur, ids)` las filas modificadas. Un id "modificado" que ya
+    no regresa la consulta fue borrado después, así que se suma a eliminados.
+    """
+    nuevas = fetch(cur, modificados) if modificados else []
+    eliminados = eliminados | (set(modificados) - {getattr(f, clave) for f in nuevas})
+    return nuevas, eliminados
+
+
+def aplicar_cambios(
+    filas: List[Any],
+    clave: str,
+    nuevas: List[Any],
+    eliminados: Set[int],
+    orden: Optional[Callable[[Any], Any]] = None,
+) -> List[Any]:
+    """Reemplaza/agrega `nuevas` y quita `eliminados` de `filas` (por su atributo `clave`)."""
+    por_id = {getattr(f, clave): f for f in nuevas}
+    resultado = [
+        por_id.pop(getattr(f, clave), f)
+        for f in filas
+        if getattr(f, clave) not in eliminados
+    ]
+    # Lo que sobra en por_id son registros nuevos
+    resultado.extend(por_id.values())
+
+    if orden is not None:
+        resultado.sort(key=orden)
+    return resultado
+
+
+def aplicar_cambios_por_id(
+    almacen: Dict[int, Any],
+    clave: str,
+    nuevas: List[Any],
+    eliminados: Set[int],
+    orden: Optional[Callable[[Any], Any]] = None,
+) -> Dict[int, Any]:
+    """Igual que aplicar_cambios, sobre un almacén {id: fila} que guarda el orden de las filas."""
+    filas = aplicar_cambios(list(almacen.values()), clave, nuevas, eliminados, orden)
+    return {getattr(f, clave): f for f in filas}
+
+
+def purgar_cambios():
+    """Borra del feed los cambios más viejos que CAMBIOS_RETENCION."""
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(PURGAR_CAMBIOS_SQL, (CAMBIOS_RETENCION,))
+        conn.commit()
+    except Exception as e:
+        print(f"Error purgando el feed de cambios: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+
+async def purgar_cambios_periodicamente():
+    """Tarea de fondo: mantiene acotada la tabla `cambios`."""
+    while True:
+        # psycopg2 bloquea: se corre en un hilo para no frenar el event loop.
+        # Con varios workers sólo lo corre el que tenga el lock (ver lider.py)
+        await asyncio.to_thread(lider.como_lider, "cambios", purgar_cambios)
+        await asyncio.sleep(CAMBIOS_PURGA_SEGUNDOS)
@@ -2,8 +2,128 @@
 import reflex as rx
 from .adminsidebar import admin_sidebar, admin_sidebar_button
 from .aui_state import AUIState
-from ..auth_state import AuthState, get_connection # Importar get_connection del padre
-from typing import List, Dict, Any # Importar tipos para la lista de usuarios/datos
+from .acceso import admin_requerido
+from ..auth_state import get_connection # Importar get_connection del padre
+from typing import List, Dict, Any, Optional # Importar tipos para la lista de usuarios/datos
+import asyncio
+import threading
+import time
+from .analitica import PERIODOS, rango_por_defecto, serie_actividad
+from .demanda import HORIZONTE_DIAS, leer_pronostico
+from ..hashing import HASH_MAX_PENDIENTES, metricas_hash
+from . import bus
+
+# --- SNAPSHOT COMPARTIDO DEL DASHBOARD ---
+# Todos los admins comparten el mismo resultado durante DASHBOARD_TTL segundos,
+# así que tener el dashboard abierto en varias pestañas no cuesta consultas extra.
+# Incluye todo lo que muestra la carga inicial (conteos, sucursales, la serie
+# del periodo por defecto y el pronóstico) y se arma en un hilo con una sola
+# conexión. live.py (cambios en reserva/eventos/menu) y el bus (borrado de
+# usuarios en cualquier worker) lo invalidan.
+DASHBOARD_TTL = 30
+
+# Periodo con el que abre la gráfica (su serie "Todas" va en el snapshot)
+PERIODO_INICIAL = "dia"
+
+# Una sola consulta (un solo viaje a la BD) con todos los datos del dashboard
+DASHBOARD_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM menu) AS productos,
+        -- Sin las de cuentas eliminadas pendientes de purga (índice parcial
+        -- idx_usuarios_eliminados: casi siempre está vacío)
+        (
+            SELECT COUNT(*) FROM reserva r
+            WHERE NOT EXISTS (
+                SELECT 1 FROM usuarios u
+                WHERE u.id_usuario = r.id_usuario AND u.eliminado_en IS NOT NULL
+            )
+        ) AS reservas,
+        (
+            SELECT COUNT(*) FROM eventos e
+            WHERE NOT EXISTS (
+                SELECT 1 FROM usuarios u
+                WHERE u.id_usuario = e.id_usuario AND u.eliminado_en IS NOT NULL
+            )
+        ) AS eventos,
+        (SELECT COUNT(*) FROM usuarios WHERE rol = 'usuario' AND eliminado_en IS NULL) AS usuarios,
+        (
+            SELECT COALESCE(json_agg(json_build_array(nombre, correo, id_usuario)), '[]'::json)
+            FROM (
+                SELECT nombre, correo, id_usuario
+                FROM usuarios
+                WHERE rol = 'usuario' AND eliminado_en IS NULL
+                ORDER BY id_usuario DESC
+                LIMIT 5
+            ) ultimos
+        ) AS ultimos_usuarios;
+"""
+
+_snapshot: Dict[str, Any] = {"expira": 0.0, "datos": None}
+_snapshot_lock = threading.Lock()
+
+def invalidar_snapshot():
+    """Fuerza a que la siguiente carga del dashboard vuelva a consultar la BD."""
+    _snapshot["expira"] = 0.0
+
+bus.registrar_cache("dashboard", lambda clave: invalidar_snapshot())
+
+def obtener_snapshot() -> Optional[Dict[str, Any]]:
+    """Devuelve los datos del dashboard, consultando la BD sólo si el snapshot venció."""
+    if _snapshot["datos"] is not None and time.monotonic() < _snapshot["expira"]:
+        return _snapshot["datos"]
+
+    # Se llama desde hilos: si varios admins llegan con el snapshot vencido,
+    # sólo uno consulta y los demás esperan su resultado
+    with _snapshot_lock:
+        if _snapshot["datos"] is not None and time.monotonic() < _snapshot["expira"]:
+            return _snapshot["datos"]
+        return _armar_snapshot()
+
+def _armar_snapshot() -> Optional[Dict[str, Any]]:
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(DASHBOARD_QUERY)
+        productos, reservas, eventos, usuarios, ultimos = cur.fetchone()
+
+        cur.execute("SELECT id_sucursal, nombre FROM sucursales ORDER BY nombre;")
+        sucursal_ids = {nombre: id_s for id_s, nombre in cur.fetchall()}
+
+        desde, hasta = rango_por_defecto(PERIODO_INICIAL)
+
+        _snapshot["datos"] = {
+            "productos": productos,
+            "reservas": reservas,
+            "eventos": eventos,
+            "usuarios": usuarios,
+            # (Asumiendo que no hay columna de registro, usamos id_usuario descendente)
+            "ultimos_usuarios": [[name, email, f"ID: {user_id}"] for name, email, user_id in ultimos],
+            "sucursal_ids": sucursal_ids,
+            "serie": serie_actividad(cur, PERIODO_INICIAL, desde, hasta),
+            "demanda": leer_pronostico(cur),
+        }
+        _snapshot["expira"] = time.monotonic() + DASHBOARD_TTL
+        return _snapshot["datos"]
+
+    except Exception as e:
+        print(f"Error cargando dashboard: {e}")
+        # Si la BD falla, mejor mostrar el último snapshot que nada
+        return _snapshot["datos"]
+    finally:
+        if conn:
+            conn.close()
+
+def leer_serie(periodo: str, id_sucursal: Optional[int]) -> List[Dict[str, Any]]:
+    """Serie de un periodo/sucursal que no está en el snapshot (se llama en un hilo)."""
+    conn = None
+    try:
+        conn = get_connection()
+        desde, hasta = rango_por_defecto(periodo)
+        return serie_actividad(conn.cursor(), periodo, desde, hasta, id_sucursal)
+    finally:
+        if conn:
+            conn.close()
 
 # --- STATE DEL DASHBOARD ---
 class DashboardState(rx.State):
@@ -13,95 +133,144 @@ class DashboardState(rx.State):
     count_usuarios: int = 0
 
     # 🟢 Nuevas variables para la gráfica y la tabla
-    activity_data: List[Dict[str, Any]] = []
     latest_users: List[List[str]] = [] # Lista de listas: [[nombre, correo, fecha_registro], ...]
 
-    # Validación de sesión de admin al cargar
+    # 🟢 Serie de tiempo (sale de resumen_diario, ver analitica.py)
+    periodo: str = PERIODO_INICIAL
+    sucursal_filtro: str = "Todas"
+    sucursales: List[str] = ["Todas"]
+    serie: List[Dict[str, Any]] = []
+    _sucursal_ids: Dict[str, int] = {}
+
+    # 🟢 Demanda esperada por producto (precalculada por demanda.py)
+    demanda: List[Dict[str, Any]] = []
+
+    # 🟢 Pool de hashing de contraseñas de este worker (ver leoweb/hashing.py)
+    hash_metricas: List[List[str]] = [] # [[etiqueta, valor], ...]
+
+    # Validación de sesión de admin al cargar (ver acceso.py)
+    @admin_requerido
     async def on_load(self):
-        # 🟢 1. Obtener el estado de autenticación de forma asíncrona
-        auth_state = await self.get_state(AuthState)
-        
-        # Redireccionar si no está logueado
-        if not auth_state.logged_in:
-            return rx.redirect("/login")
-        
-        # Redireccionar si no es admin
-        if auth_state.rol != "admin":
-            return [
-                rx.toast.error("Acceso denegado. Se requiere ser administrador."),
-                rx.redirect("/") 
-            ]
-        
-        # 3. Cargar datos
-        return self.load_counts() # Por ahora cargamos directo para probar
-    
-    def load_counts(self):
-        """Carga los conteos para las tarjetas del dashboard."""
-        conn = None
+        self.load_hash()
+        # psycopg2 bloquea: el snapshot (si venció) se arma en un hilo
+        datos = await asyncio.to_thread(obtener_snapshot)
+        if datos is None:
+            return
+
+        self.count_productos = datos["productos"]
+        self.count_reservas = datos["reservas"]
+        self.count_eventos = datos["eventos"]
+        self.count_usuarios = datos["usuarios"]
+
+        # 2. Últimos 5 Usuarios con rol 'usuario'
+        self.latest_users = datos["ultimos_usuarios"]
+
+        self._sucursal_ids = datos["sucursal_ids"]
+        self.sucursales = ["Todas"] + list(self._sucursal_ids)
+        self.demanda = datos["demanda"]
+
+        # La serie con los filtros iniciales ya viene en el snapshot
+        if self.periodo == PERIODO_INICIAL and self.sucursal_filtro == "Todas":
+            self.serie = datos["serie"]
+        else:
+            return DashboardState.load_serie
+
+    def load_hash(self):
+        """Lee las métricas del pool de hashing (en memoria, sin BD)."""
+        m = metricas_hash()
+        promedio = m["segundos_total"] / m["total"] * 1000 if m["total"] else 0.0
+        self.hash_metricas = [
+            ["Pendientes", f"{int(m['pendientes'])} / {HASH_MAX_PENDIENTES}"],
+            ["Pico de pendientes", str(int(m["max_pendientes"]))],
+            ["Completados", str(int(m["total"]))],
+            ["Rechazados (cola llena)", str(int(m["rechazados"]))],
+            ["Promedio por hash", f"{promedio:.0f} ms"],
+        ]
+
+    async def load_serie(self):
+        """Carga la serie de la gráfica para el periodo y sucursal elegidos."""
         try:
-            conn = get_connection()
-            cur = conn.cursor()
-            
-            # Consultas de conteo
-            cur.execute("SELECT COUNT(*) FROM menu;")
-            self.count_productos = cur.fetchone()[0]
-            
-            cur.execute("SELECT COUNT(*) FROM reserva;")
-            self.count_reservas = cur.fetchone()[0]
-            
-            cur.execute("SELECT COUNT(*) FROM eventos;")
-            self.count_eventos = cur.fetchone()[0]
-            
-            cur.execute("SELECT COUNT(*) FROM usuarios WHERE rol = 'usuario';")
-            self.count_usuarios = cur.fetchone()[0]
-
-            # 2. Datos de Actividad para la Gráfica
-            # Queremos: Cantidad de Reservaciones y Cantidad de Eventos
-            self.activity_data = [
-                {"name": "Reservaciones", "count": self.count_reservas},
-                {"name": "Eventos a Domicilio", "count": self.count_eventos},
-            ]
-            
-            # 3. Últimos 5 Usuarios con rol 'usuario'
-            # (Asumiendo que tienes una columna de registro/creación, usaremos id_usuario descendente)
-            cur.execute(
-                """
-                SELECT nombre, correo, id_usuario
-                FROM usuarios
-                WHERE rol = 'usuario'
-                ORDER BY id_usuario DESC 
-                LIMIT 5;
-                """
+            self.serie = await asyncio.to_thread(
+                leer_serie, self.periodo, self._sucursal_ids.get(self.sucursal_filtro)
             )
-            # Formatear la fecha para que se vea mejor en la tabla
-            users = cur.fetchall()
-            self.latest_users = [[name, email, f"ID: {user_id}"] for name, email, user_id in users]
-            
         except Exception as e:
-            print(f"Error cargando dashboard: {e}")
-        finally:
-            if conn:
-                conn.close()
+            print(f"Error cargando serie del dashboard: {e}")
+            return rx.toast.error("No se pudo cargar la gráfica de actividad.")
+
+    def set_periodo(self, value: str):
+        if value in PERIODOS:
+            self.periodo = value
+            return DashboardState.load_serie
+
+    def set_sucursal_filtro(self, value: str):
+        self.sucursal_filtro = value
+        return DashboardState.load_serie
     
-# 🟢 COMPONENTE GRÁFICA DE BARRAS
+# 🟢 COMPONENTE GRÁFICA DE ACTIVIDAD (barras = conteos, línea = ingresos)
 def activity_chart():
-    return rx.recharts.bar_chart(
+    return rx.recharts.composed_chart(
         rx.recharts.bar(
-            data_key="count", 
-            stroke="#ff0000", 
-            fill="#ff0000", 
-            bar_size=30,
+            data_key="reservas",
+            name="Reservaciones",
+            fill="#ff0000",
+            y_axis_id="conteo",
             radius=[5, 5, 0, 0] # Bordes redondeados
         ),
-        rx.recharts.x_axis(data_key="name", stroke="#999"),
-        rx.recharts.y_axis(stroke="#999"),
-        data=DashboardState.activity_data,
+        rx.recharts.bar(
+            data_key="eventos",
+            name="Eventos",
+            fill="#ff8a8a",
+            y_axis_id="conteo",
+            radius=[5, 5, 0, 0]
+        ),
+        rx.recharts.line(
+            data_key="personas",
+            name="Personas",
+            stroke="#ffffff",
+            y_axis_id="conteo",
+            dot=False
+        ),
+        rx.recharts.line(
+            data_key="ingresos",
+            name="Ingresos ($)",
+            stroke="#f5c518",
+            y_axis_id="ingresos",
+            dot=False
+        ),
+        rx.recharts.x_axis(data_key="periodo", stroke="#999"),
+        rx.recharts.y_axis(y_axis_id="conteo", stroke="#999"),
+        rx.recharts.y_axis(y_axis_id="ingresos", orientation="right", stroke="#f5c518"),
+        rx.recharts.graphing_tooltip(),
+        rx.recharts.legend(),
+        data=DashboardState.serie,
         margin={"top": 20, "right": 20, "left": 10, "bottom": 5},
-        background_color="#1a1a1c",
         width="100%",
         height=250
     )
 
+def activity_filters():
+    """Selectores de periodo y sucursal de la gráfica."""
+    return rx.hstack(
+        rx.select.root(
+            rx.select.trigger(),
+            rx.select.content(
+                rx.select.item("Por día", value="dia"),
+                rx.select.item("Por semana", value="semana"),
+                rx.select.item("Por mes", value="mes"),
+            ),
+            value=DashboardState.periodo,
+            on_change=DashboardState.set_periodo,
+            size="1",
+        ),
+        rx.select(
+            DashboardState.sucursales,
+            value=DashboardState.sucursal_filtro,
+            on_change=DashboardState.set_sucursal_filtro,
+            size="1",
+        ),
+        spacing="2",
+    )
+
 # 🟢 COMPONENTE TABLA DE ÚLTIMOS USUARIOS
 def latest_users_table():
     return rx.box(
@@ -131,6 +300,66 @@ def render_user_row(user: list):
         style={"color": "white", "font_size": "sm"}
     )
 
+# 🟢 COMPONENTE TABLA DE DEMANDA DE PRODUCTOS
+def demand_table():
+    return rx.box(
+        rx.text(
+            f"Demanda de Productos (próximos {HORIZONTE_DIAS} días)",
+            color="white", font_weight="bold", margin_bottom="15px"
+        ),
+        rx.table.root(
+            rx.table.header(
+                rx.table.row(
+                    rx.table.column_header_cell("Producto"),
+                    rx.table.column_header_cell("Ya pedido"),
+                    rx.table.column_header_cell("Promedio diario"),
+                    rx.table.column_header_cell("Pronóstico"),
+                ),
+                style={"color": "#aaa"}
+            ),
+            rx.table.body(
+                rx.foreach(DashboardState.demanda, render_demand_row)
+            ),
+        ),
+        width="100%",
+        background="#1a1a1c",
+        border_radius="15px",
+        padding="20px"
+    )
+
+def render_demand_row(item: dict):
+    """Renderiza una fila de demanda por producto."""
+    return rx.table.row(
+        rx.table.cell(item["nombre"]),
+        rx.table.cell(item["confirmado"]),
+        rx.table.cell(item["promedio"]),
+        rx.table.cell(item["pronostico"]),
+        style={"color": "white", "font_size": "sm"}
+    )
+
+# 🟢 COMPONENTE MÉTRICAS DEL HASHING DE CONTRASEÑAS
+def hash_table():
+    return rx.box(
+        rx.text("Hashing de Contraseñas (este worker)", color="white", font_weight="bold", margin_bottom="15px"),
+        rx.table.root(
+            rx.table.body(
+                rx.foreach(DashboardState.hash_metricas, render_metric_row)
+            ),
+        ),
+        width="100%",
+        background="#1a1a1c",
+        border_radius="15px",
+        padding="20px"
+    )
+
+def render_metric_row(metrica: list):
+    """Renderiza una fila [etiqueta, valor]."""
+    return rx.table.row(
+        rx.table.cell(metrica[0], style={"color": "#aaa"}),
+        rx.table.cell(metrica[1]),
+        style={"color": "white", "font_size": "sm"}
+    )
+
 # --- COMPONENTE TARJETA DE RESUMEN ---
 def summary_card(title, count, icon):
     return rx.box(
@@ -179,7 +408,14 @@ def dashboard_page():
                 rx.hstack(
                     # Contenedor Gráfica
                     rx.box(
-                        rx.text("Gráfica de Actividad", color="white", margin_bottom="10px", font_weight="bold"),
+                        rx.hstack(
+                            rx.text("Gráfica de Actividad", color="white", font_weight="bold"),
+                            activity_filters(),
+                            justify="between",
+                            align_items="center",
+                            width="100%",
+                            margin_bottom="10px"
+                        ),
                         activity_chart(),
                         height="300px",
                         width="65%",
@@ -200,6 +436,12 @@ def dashboard_page():
                     width="100%",
                     spacing="5"
                 ),
+
+                # Demanda por producto para planear la cocina
+                rx.box(demand_table(), width="100%", margin_top="30px"),
+
+                # Salud del pool de hashing (logins / registros)
+                rx.box(hash_table(), width="100%", margin_top="30px"),
                 
                 align_items="start",
                 width="100%",
@@ -0,0 +1,173 @@
+# leoweb/admin/demanda.py
+# Demanda por producto (a partir de menu_evento) y pronóstico de corto plazo.
+#
+# Un job periódico (registrado en leoweb.py) hace todo el trabajo pesado:
+#   1. Re-agrega la cantidad pedida por producto y por día (fecha del evento)
+#      de la ventana reciente en `demanda_diaria`.
+#   2. Arma una matriz productos x días con NumPy y calcula para todos los
+#      productos a la vez el promedio móvil y el suavizado exponencial.
+#   3. Guarda el resultado en `pronostico_demanda`.
+# El dashboard sólo lee `pronostico_demanda` (una fila por producto).
+#
+# Para correrlo a mano:  python -m leoweb.admin.demanda
+import asyncio
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..auth_state import get_connection
+from . import lider
+
+# Días de historia que se usan para el pronóstico
+HISTORIA_DIAS = 90
+# Ventana del promedio móvil
+VENTANA_PROMEDIO = 7
+# Factor de suavizado exponencial (más alto = reacciona más rápido)
+ALFA = 0.3
+# Horizonte del pronóstico y de los pedidos confirmados (días)
+HORIZONTE_DIAS = 7
+# Cada cuánto corre el job de refresco (segundos)
+REFRESCO_SEGUNDOS = 60 * 60
+
+# Re-agrega la ventana [desde, ∞): también entran los eventos ya agendados
+AGREGAR_DEMANDA_SQL = """
+    DELETE FROM demanda_diaria WHERE dia >= %(desde)s;
+
+    INSERT INTO demanda_diaria (id_producto, dia, cantidad)
+    SELECT me.id_producto, e.fecha, SUM(me.cantidad)
+    FROM menu_evento me
+    JOIN eventos e ON me.id_evento = e.id_evento
+    WHERE e.fecha >= %(desde)s
+    GROUP BY me.id_producto, e.fecha;
+"""
+
+HISTORIA_SQL = """
+    SELECT id_producto, dia, cantidad
+    FROM demanda_diaria
+    WHERE dia >= %s AND dia < %s;
+"""
+
+CONFIRMADO_SQL = """
+    SELECT id_producto, SUM(cantidad)
+    FROM demanda_diaria
+    WHERE dia >= %s AND dia < %s
+    GROUP BY id_producto;
+"""
+
+GUARDAR_PRONOSTICO_SQL = """
+    INSERT INTO pronostico_demanda
+        (id_producto, promedio_movil, suavizado, pronostico, confirmado, actualizado)
+    VALUES (%s, %s, %s, %s, %s, now());
+"""
+
+PRONOSTICO_QUERY = """
+    SELECT m.nombre, p.confirmado, p.promedio_movil, p.pronostico
+    FROM pronostico_demanda p
+    JOIN menu m ON p.id_producto = m.id_producto
+    WHERE m.estado = 'activo'
+    ORDER BY p.confirmado + p.pronostico DESC, m.nombre
+    LIMIT %s;
+"""
+
+
+def pronosticar(historia: np.ndarray, ventana: int = VENTANA_PROMEDIO, alfa: float = ALFA) -> Dict[str, np.ndarray]:
+    """
+    Pronóstico vectorizado sobre una matriz productos x días (del más viejo al
+    más reciente). Regresa, por producto, el promedio móvil de los últimos
+    `ventana` días y el nivel del suavizado exponencial simple.
+    """
+    n = historia.shape[1]
+    promedio = historia[:, -ventana:].mean(axis=1)
+
+    # Suavizado exponencial en forma cerrada (sin recorrer los días en Python):
+    # nivel = Σ α(1-α)^(n-1-j)·x_j  para j >= 1,  + (1-α)^(n-1)·x_0
+    exponentes = np.arange(n - 1, -1, -1)
+    pesos = alfa * (1 - alfa) ** exponentes
+    pesos[0] = (1 - alfa) ** (n - 1)
+    suavizado = historia @ pesos
+
+    return {"promedio_movil": promedio, "suavizado": suavizado}
+
+
+def refrescar_demanda(hoy: Optional[date] = None):
+    """Re-agrega la demanda diaria y recalcula `pronostico_demanda`."""
+    hoy = hoy or date.today()
+    inicio = hoy - timedelta(days=HISTORIA_DIAS)
+
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute(AGREGAR_DEMANDA_SQL, {"desde": inicio})
+
+        cur.execute("SELECT id_producto FROM menu ORDER BY id_producto;")
+        productos = [row[0] for row in cur.fetchall()]
+        fila_de = {id_p: i for i, id_p in enumerate(productos)}
+
+        # Matriz productos x días con la historia (sólo días ya pasados)
+        historia = np.zeros((len(productos), HISTORIA_DIAS))
+        cur.execute(HISTORIA_SQL, (inicio, hoy))
+        for id_p, dia, cantidad in cur.fetchall():
+            if id_p in fila_de:
+                historia[fila_de[id_p], (dia - inicio).days] = cantidad
+
+        # Lo ya pedido para los próximos días (eventos agendados)
+        cur.execute(CONFIRMADO_SQL, (hoy, hoy + timedelta(days=HORIZONTE_DIAS)))
+        confirmado = np.zeros(len(productos))
+        for id_p, cantidad in cur.fetchall():
+            if id_p in fila_de:
+                confirmado[fila_de[id_p]] = cantidad
+
+        resultado = pronosticar(historia)
+        pronostico = resultado["suavizado"] * HORIZONTE_DIAS
+
+        cur.execute("DELETE FROM pronostico_demanda;")
+        cur.executemany(GUARDAR_PRONOSTICO_SQL, [
+            (
+                id_p,
+                round(float(resultado["promedio_movil"][i]), 2),
+                round(float(resultado["suavizado"][i]), 2),
+                round(float(pronostico[i]), 2),
+                int(confirmado[i]),
+            )
+            for id_p, i in fila_de.items()
+        ])
+
+        conn.commit()
+
+    except Exception as e:
+        print(f"Error refrescando la demanda de productos: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+
+def leer_pronostico(cur, limite: int = 8) -> List[Dict[str, Any]]:
+    """Productos con más demanda esperada para los próximos HORIZONTE_DIAS días."""
+    cur.execute(PRONOSTICO_QUERY, (limite,))
+    return [
+        {
+            "nombre": nombre,
+            "confirmado": int(confirmado),
+            "promedio": f"{float(promedio):.1f}",
+            "pronostico": f"{float(pronostico):.0f}",
+        }
+        for nombre, confirmado, promedio, pronostico in cur.fetchall()
+    ]
+
+
+async def refrescar_demanda_periodicamente():
+    """Tarea de fondo: refresca la demanda al arrancar y luego cada REFRESCO_SEGUNDOS."""
+    while True:
+        # psycopg2 bloquea: se corre en un hilo para no frenar el event loop.
+        # Con varios workers sólo lo corre el que tenga el lock (ver lider.py)
+        await asyncio.to_thread(lider.como_lider, "demanda", refrescar_demanda)
+        await asyncio.sleep(REFRESCO_SEGUNDOS)
+
+
+if __name__ == "__main__":
+    refrescar_demanda()
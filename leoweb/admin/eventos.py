@@ -1,24 +1,17 @@
 import reflex as rx
+import dataclasses
 from .adminsidebar import admin_sidebar, admin_sidebar_button
-from typing import Dict, Any, List, Tuple, TypedDict, Optional
+from typing import Dict, Any, List, TypedDict, Optional, Set
 from .aui_state import AUIState
-from datetime import datetime, timedelta # Importar para manejo de fechas
-from collections import defaultdict # Importar para agrupar eventos
+from .acceso import admin_requerido
+from datetime import datetime, date # Importar para manejo de fechas
 from ..auth_state import AuthState, get_connection # Asumo esta importación
+from . import lectura, live, segundo_plano, ventana
+from .agrupacion import agrupar_ids_por_fecha, clave_orden, fecha_corta, minuto_actual, orden_por_fecha_sql, reordenar_por_fecha
+from .exportar import crear_ticket
+from .cambios import ultimo_cambio, cambios_desde, leer_filas, aplicar_cambios_por_id
+from reflex.experimental.client_state import ClientStateVar
 
-# Traducción manual de días y meses (para replicar reservaciones.py)
-DIAS_ES = {
-    "Monday": "Lunes", "Tuesday": "Martes", "Wednesday": "Miércoles", 
-    "Thursday": "Jueves", "Friday": "Viernes", "Saturday": "Sábado", 
-    "Sunday": "Domingo",
-}
-
-MESES_ES = {
-    "January": "Enero", "February": "Febrero", "March": "Marzo", 
-    "April": "Abril", "May": "Mayo", "June": "Junio", "July": "Julio", 
-    "August": "Agosto", "September": "Septiembre", "October": "Octubre", 
-    "November": "Noviembre", "December": "Diciembre",
-}
 # Define los tipos para que Reflex entienda la estructura
 # Tipo para un solo evento
 
@@ -27,7 +20,22 @@ class MenuItem(TypedDict):
     nombre: str
     cantidad: int # O str, dependiendo de cómo lo devuelva tu backend
 
-# 2. Tipo para un solo evento, que ahora incluye una lista de MenuItems
+# 2. Fila compacta del almacén: sin __dict__ por fila y sin los textos ya
+# formateados (fecha, "es pasado"), que se arman sólo para la ventana visible
+# en formatear_evento.
+@dataclasses.dataclass(slots=True)
+class Evento:
+    id_evento: int
+    nombre_usuario: str
+    user_email: Optional[str]
+    user_phone: Optional[str]
+    cant_personas: int
+    descripcion: str
+    total: float
+    fecha_dt: datetime # Para ordenar/agrupar
+    menu_items: List[MenuItem] # Ya viene como [{"nombre":..., "cantidad":...}]
+
+# 3. Tipo para un solo evento como lo ve la UI, que incluye una lista de MenuItems
 class FullEvent(TypedDict): # Ya no es solo Dict[str, Any]
     id_evento: int
     nombre_usuario: str
@@ -35,254 +43,314 @@ class FullEvent(TypedDict): # Ya no es solo Dict[str, Any]
     fecha_evento_str: str
     total: float # O str, si lo manejas como string formateado
     menu_items: List[MenuItem] # <--- DEFINICIÓN EXPLÍCITA
-    # Puedes añadir aquí cualquier otra clave que uses: 'fecha_dt', etc.
     es_pasado: bool
     # 💡 AÑADIR NUEVOS CAMPOS 💡
     cant_personas: int
     user_email: Optional[str] # Asumimos que email puede ser nulo
     user_phone: Optional[str] # Asumimos que teléfono puede ser nulo
 
-class GroupedEventItem(TypedDict):
+# 4. Un día de la lista: sólo los ids, los eventos viven en AdminEventoState.eventos
+class GrupoEventos(TypedDict):
+    clave: str
     header: str
-    eventos: List[FullEvent]
-
-# Tipo para la variable computada final
-# El formato de filtered_events es: List[Tuple[str, GroupedEventItem]]
-FinalFilteredList = List[Tuple[str, GroupedEventItem]]
+    ids: List[int]
+
+
+def formatear_evento(ev: Evento, ahora: datetime) -> FullEvent:
+    """Arma el evento para la tarjeta (el texto de la fecha sale memoizado)."""
+    return {
+        "id_evento": ev.id_evento,
+        "nombre_usuario": ev.nombre_usuario,
+        "user_email": ev.user_email,
+        "user_phone": ev.user_phone,
+        "cant_personas": ev.cant_personas,
+        "descripcion": ev.descripcion,
+        "fecha_evento_str": fecha_corta(ev.fecha_dt.date()),
+        "total": ev.total,
+        "es_pasado": ev.fecha_dt < ahora,
+        "menu_items": ev.menu_items,
+    }
+
+
+# Consulta: Eventos + Usuario + Items de Menú ya agregados por evento.
+# El json_agg devuelve una sola fila por evento (en lugar de una fila por
+# ítem del menú repitiendo los datos del evento y del usuario) y psycopg2
+# decodifica el JSON directamente a una lista de dicts.
+EVENTS_QUERY = """
+    SELECT 
+        e.id_evento, e.fecha, e.hora, e.cant_personas, e.costo, e.ubicacion AS descripcion_evento,
+        u.nombre as nombre_usuario,
+        u.correo, u.telefono,
+        COALESCE(mi.menu_items, '[]'::json) AS menu_items
+    FROM eventos e
+    -- Las cuentas eliminadas (pendientes de purga) ya no cuentan
+    JOIN usuarios u ON e.id_usuario = u.id_usuario AND u.eliminado_en IS NULL
+    LEFT JOIN LATERAL (
+        SELECT json_agg(
+            json_build_object('nombre', m.nombre, 'cantidad', me.cantidad::int)
+            ORDER BY me.id_producto
+        ) AS menu_items
+        FROM menu_evento me
+        JOIN menu m ON me.id_producto = m.id_producto
+        WHERE me.id_evento = e.id_evento
+    ) mi ON TRUE
+    {where}
+    {order}; -- Futuros del más próximo al más lejano, luego pasados (ver agrupacion.py)
+"""
+
+def fetch_events(cur, ids: Optional[List[int]] = None) -> List[Evento]:
+    """Ejecuta EVENTS_QUERY (todos los eventos o sólo `ids`) y arma las filas."""
+    where, params = "", []
+    if ids is not None:
+        where, params = "WHERE e.id_evento = ANY(%s)", [list(ids)]
+
+    hoy = date.today()
+    params += [hoy, hoy] # Para el ORDER BY por cubetas
+
+    order_sql = orden_por_fecha_sql("e.fecha", "e.hora")
+    query = EVENTS_QUERY.format(where=where, order=order_sql)
+
+    # La carga completa va por lotes desde un cursor del lado del servidor (ver lectura.py)
+    return [
+        Evento(
+            id_evento=fila.id_evento,
+            nombre_usuario=fila.nombre_usuario,
+            user_email=fila.correo,
+            user_phone=fila.telefono,
+            cant_personas=int(fila.cant_personas),
+            descripcion=fila.descripcion_evento, # Usar ubicacion si no hay descripcion
+            total=float(fila.costo) if fila.costo is not None else 0.0, # Asegurar que es float
+            fecha_dt=datetime.combine(fila.fecha, fila.hora),
+            menu_items=fila.menu_items,
+        )
+        for fila in lectura.filas(cur, query, params, servidor=ids is None)
+    ]
+
+# Evento con el menú desplegado (-1 = ninguno). Vive en el navegador: abrir y
+# cerrar el desplegable no pasa por el backend.
+menu_abierto = ClientStateVar.create("admin_evento_menu_abierto", default=-1)
 
 # =========================================================
 # ===============  STATE DE EVENTOS COMPLETO  =============
 # =========================================================
 class AdminEventoState(rx.State):
     search_query: str = ""
-    menu_open_id: Optional[int] = None
-    all_events: List[FullEvent] = [] # Lista maestra sin filtrar
+    # Almacén maestro { id_evento: evento }, en el orden de la consulta. Es
+    # backend-only (prefijo _): al navegador sólo viaja la ventana visible
+    # (eventos) y los grupos por día con sus ids (grupos).
+    _eventos: Dict[int, Evento] = {}
+
+    # Cuántos eventos (ya filtrados) se muestran; crece con el scroll
+    visibles: int = ventana.VENTANA_PASO
+
+    # Selección múltiple para acciones en lote
+    selected_ids: List[int] = []
 
-    # Diccionario agrupado: { "2025-01-01": {header:"...", eventos:[...] } }
-    grouped_events: Dict[str, GroupedEventItem] = {} # Usar el tipo definido
+    # Filtros de la exportación a CSV
+    export_desde: str = ""
+    export_hasta: str = ""
+
+    # Marca del feed de cambios hasta la que ya se aplicó todo (ver sync_events y cambios.py)
+    last_change_id: int = 0
+
+    # Hay una carga completa en curso (muestra el esqueleto si aún no hay datos)
+    cargando: bool = False
+    # Generación de la última carga pedida: sólo ésa apaga `cargando`
+    _carga_actual: int = 0
+
+    # Reloj de las vistas: minuto actual y día (ordinal) con el que está
+    # ordenado el almacén (ver _al_dia)
+    _minuto: int = 0
+    _dia: int = 0
 
     # --------------------------------------------------
     # CICLO DE VIDA Y VALIDACIÓN
     # --------------------------------------------------
 
-    async def on_load(self):
-        """Validación de admin y carga inicial de datos."""
-        auth_state = await self.get_state(AuthState)
-        
-        # 1. Redireccionar si no está logueado
-        if not auth_state.logged_in:
-            return rx.redirect("/login")
-        
-        # 2. Redireccionar si no es admin
-        if auth_state.rol != "admin":
-            return [
-                rx.toast.error("Acceso denegado. Se requiere ser administrador."),
-                rx.redirect("/") 
-            ]
-        
-        # 3. Cargar datos
-        return self.load_all_events()
+    @admin_requerido
+    def on_load(self):
+        """Carga inicial de datos (la validación de admin la hace el decorador)."""
+        # Recibir en vivo los cambios de otros admins / usuarios
+        live.suscribir("eventos", self.router.session.client_token)
+
+        # Las vistas comparan contra "ahora": ponerlas al minuto aunque no haya cambios
+        self._al_dia()
+
+        # Si ya se habían cargado (regresó a la página), sólo aplicar lo que cambió
+        if self._eventos:
+            return self.sync_events()
+        return AdminEventoState.load_all_events
+
+    def al_salir(self):
+        """Al salir de la página: deja de recibir cambios en vivo y corta la carga completa si sigue en curso."""
+        client_token = self.router.session.client_token
+        live.desuscribir("eventos", client_token)
+        segundo_plano.cancelar((client_token, "eventos"))
+
+    def _al_dia(self):
+        """Avanza el reloj de las vistas y, si cambió el día, reordena el almacén por cubetas."""
+        minuto = minuto_actual()
+        if minuto != self._minuto:
+            self._minuto = minuto
+
+        hoy = date.today()
+        if hoy.toordinal() != self._dia:
+            # Lo que era hoy/futuro pudo pasar a la cubeta de pasados
+            if self._eventos:
+                self._eventos = reordenar_por_fecha(self._eventos, hoy)
+            self._dia = hoy.toordinal()
 
 
     def set_search(self, value: str):
         self.search_query = value
-        self.group_events_by_date() # Recalculamos la vista agrupada al buscar
+        self.visibles = ventana.VENTANA_PASO # Nueva búsqueda: volver a la primera ventana
 
-    def toggle_menu(self, id_evento: int):
-        self.menu_open_id = None if self.menu_open_id == id_evento else id_evento
+    def mostrar_mas(self, visible: bool):
+        """El centinela del final de la lista entró en pantalla: siguiente ventana."""
+        if visible and self.hay_mas:
+            self.visibles += ventana.VENTANA_PASO
 
     # --------------------------------------------------
     # LÓGICA DE DATOS Y AGRUPACIÓN
     # --------------------------------------------------
 
-    @rx.var
-    def filtered_events(self) -> FinalFilteredList:
-        data = self.grouped_events
+    # Vistas derivadas del almacén. Son computed vars cacheadas con sus
+    # dependencias explícitas: sólo se recalculan (y sólo se mandan) cuando
+    # cambia alguna de ellas, y cada evento viaja una sola vez (en eventos).
 
-        if self.search_query:
-            query = self.search_query.lower()
-            filtered = {}
-            
-            # El filtrado ahora opera sobre grouped_events, que ya es un dictionary agrupado
-            for k, group in data.items():
-                if k == "__PAST_HEADER__": continue # Omitir el separador
-                
-                eventos_filtrados = [
-                    ev for ev in group["eventos"]
-                    if query in ev["nombre_usuario"].lower()
-                    or query in ev["descripcion"].lower()
-                ]
-                
-                if eventos_filtrados:
-                    # Creamos un nuevo grupo con el encabezado original
-                    filtered[k] = {
-                        "header": group["header"],
-                        "eventos": eventos_filtrados
-                    }
-            data = filtered
-        # Retornamos la lista de tuplas (clave, valor) que el frontend necesita para foreach
-        return list(data.items())
+    @rx.var(deps=["_eventos", "search_query"], auto_deps=False)
+    def _coincidencias(self) -> List[int]:
+        """Ids de los eventos que pasan la búsqueda, en orden (sólo en el backend)."""
+        if not self.search_query:
+            return list(self._eventos)
+
+        query = self.search_query.lower()
+        return [
+            id_evento for id_evento, ev in self._eventos.items()
+            if query in ev.nombre_usuario.lower()
+            or query in ev.descripcion.lower()
+        ]
+
+    @rx.var(deps=["_coincidencias", "visibles"], auto_deps=False)
+    def _ventana(self) -> List[int]:
+        """Ids de la ventana visible (sólo en el backend)."""
+        return self._coincidencias[:self.visibles]
+
+    @rx.var(deps=["_ventana", "_eventos", "_minuto"], auto_deps=False)
+    def eventos(self) -> Dict[int, FullEvent]:
+        """Los eventos de la ventana visible, por id y ya formateados."""
+        ahora = datetime.now()
+        return {i: formatear_evento(self._eventos[i], ahora) for i in self._ventana}
+
+    @rx.var(deps=["_ventana", "_eventos", "_minuto"], auto_deps=False)
+    def grupos(self) -> List[GrupoEventos]:
+        """La ventana visible agrupada por fecha (Futuros, Hoy/Mañana, Pasados), sólo con ids."""
+        return agrupar_ids_por_fecha(
+            [self._eventos[i] for i in self._ventana], "id_evento", "EVENTOS PASADOS"
+        )
+
+    @rx.var(deps=["_coincidencias", "visibles"], auto_deps=False)
+    def hay_mas(self) -> bool:
+        """Quedan eventos filtrados fuera de la ventana."""
+        return len(self._coincidencias) > self.visibles
 
     # Nuevo método para cargar datos de la BD
-    def load_all_events(self):
-        """Carga todos los eventos junto con los datos del usuario y el menú."""
+    @rx.event(background=True)
+    async def load_all_events(self):
+        """
+        Carga todos los eventos junto con los datos del usuario y el menú.
+        Corre en segundo plano: la consulta no tiene el lock de la sesión.
+        """
+        async with self:
+            self._carga_actual += 1
+            generacion = self._carga_actual
+            self.cargando = True
+            clave = (self.router.session.client_token, "eventos")
+
+        try:
+            # Versión del feed de cambios ANTES de leer, para no perder nada
+            ultimo, eventos = await segundo_plano.consultar(
+                clave, lambda cur: (ultimo_cambio(cur), fetch_events(cur))
+            )
+        except segundo_plano.CargaCancelada:
+            async with self:
+                if self._carga_actual == generacion:
+                    self.cargando = False
+            return
+        except Exception as e:
+            print(f"Error cargando eventos de admin: {e}")
+            async with self:
+                if self._carga_actual == generacion:
+                    self.cargando = False
+            return rx.toast.error(f"Error al cargar eventos: {str(e)}")
+
+        async with self:
+            self.last_change_id = ultimo
+            self._eventos = {ev.id_evento: ev for ev in eventos}
+            # La consulta ordenó con la fecha de hoy
+            self._dia = date.today().toordinal()
+            self._minuto = minuto_actual()
+            if self._carga_actual == generacion:
+                self.cargando = False
+
+    def _aplicar_delta(self, nuevos: List[Evento], eliminados: Set[int], ultimo: Optional[int]):
+        """Parcha la lista con las filas cambiadas (lo usan sync y leoweb/admin/live.py)."""
+        self._al_dia()
+        hoy = date.today()
+        self._eventos = aplicar_cambios_por_id(
+            self._eventos, "id_evento", nuevos, eliminados,
+            orden=lambda ev: clave_orden(ev.fecha_dt, hoy), # Igual que el ORDER BY de la consulta
+        )
+        # En vivo (ultimo=None) la marca no avanza: el siguiente sync la pone al día
+        if ultimo is not None:
+            self.last_change_id = max(self.last_change_id, ultimo)
+
+    def sync_events(self):
+        """Aplica sólo los eventos que cambiaron desde la última sincronización."""
         conn = None
         try:
             conn = get_connection()
             cur = conn.cursor()
-            
-            # Consulta compleja: Eventos + Usuario + Items de Menú
-            # Usamos una subconsulta o agrupamos los resultados en Python
-            # Optaremos por cargar todo y agrupar los menú items en Python.
-            
-            # 💡 Consulta JOIN: eventos, usuarios, menu_evento, menu
-            # Nota: Agregué `descripcion` al SELECT, asumiendo que lo tienes en `eventos` o lo mapeas de `ubicacion`/`tipo`
-            cur.execute("""
-                SELECT 
-                    e.id_evento, e.fecha, e.hora, e.ubicacion, e.cant_personas, e.costo, e.ubicacion AS descripcion_evento,
-                    u.nombre as nombre_usuario,
-                    u.correo, u.telefono,
-                    me.cantidad,
-                    m.nombre as nombre_menu
-                FROM eventos e
-                JOIN usuarios u ON e.id_usuario = u.id_usuario
-                LEFT JOIN menu_evento me ON e.id_evento = me.id_evento
-                LEFT JOIN menu m ON me.id_producto = m.id_producto
-                ORDER BY e.fecha DESC, e.hora ASC;
-            """)
-            
-            rows = cur.fetchall()
-            
-            events_raw = defaultdict(lambda: {
-                "menu_items": []
-            })
-            
-            for row in rows:
-                (id_evento, event_date, event_time, ubicacion, cant_personas, costo, descripcion_evento,
-                 user_name, user_email, user_phone, menu_item_cantidad, menu_item_nombre) = row
-                
-                if id_evento not in events_raw:
-                    # Inicialización del evento
-                    event_dt = datetime.combine(event_date, event_time)
-                    events_raw[id_evento].update({
-                        "id_evento": id_evento,
-                        "nombre_usuario": user_name,
-                        "user_email": user_email,          # <--- AGREGAR AL DICCIONARIO
-                        "user_phone": user_phone,          # <--- AGREGAR AL DICCIONARIO
-                        "cant_personas": int(cant_personas), # <--- AGREGAR cant_personas
-                        "descripcion": descripcion_evento, # Usar ubicacion si no hay descripcion
-                        "fecha_evento_str": event_date.strftime("%d/%m/%Y"),
-                        "total": float(costo) if costo is not None else 0.0, # Asegurar que es float
-                        "fecha_dt": event_dt, # Para ordenar/agrupar
-                        "es_pasado": event_dt < datetime.now(),
-                    })
-                
-                # Agregar item del menú si existe
-                if menu_item_nombre:
-                    events_raw[id_evento]["menu_items"].append({
-                        "nombre": menu_item_nombre,
-                        "cantidad": int(menu_item_cantidad),
-                    })
-            
-            # Convertir el diccionario de eventos a una lista para el estado
-            self.all_events = list(events_raw.values())
-            
-            self.group_events_by_date() # Agrupar al cargar
-            
-            # En caso de éxito
-            rx.toast.success(f"Se cargaron {len(self.all_events)} eventos.")
+
+            cambios = cambios_desde(cur, "eventos", self.last_change_id)
+            if cambios is None:
+                # El feed fue purgado: no sabemos qué cambió, recargamos todo
+                return AdminEventoState.load_all_events
+
+            modificados, eliminados, ultimo = cambios
+            if not modificados and not eliminados:
+                self.last_change_id = max(self.last_change_id, ultimo)
+                return
+
+            nuevos, eliminados = leer_filas(cur, fetch_events, "id_evento", modificados, eliminados)
+            self._aplicar_delta(nuevos, eliminados, ultimo)
 
         except Exception as e:
-            print(f"Error cargando eventos de admin: {e}")
-            return rx.toast.error(f"Error al cargar eventos: {str(e)}")
-            
+            print(f"Error sincronizando eventos de admin: {e}")
+            return rx.toast.error(f"Error al actualizar eventos: {str(e)}")
+
         finally:
             if conn:
                 conn.close()
 
-    def group_events_by_date(self):
-        """Agrupa y ordena eventos por fecha (Futuros, Hoy/Mañana, Pasados)."""
-        
-        # Usamos self.all_events si no hay búsqueda activa, sino la lista que resulta del filtrado
-        source = self.all_events if not self.search_query else self.filtered_events_list_for_grouping
-        
-        today = datetime.now().date()
-        future_or_today = []
-        past = []
-
-        for ev in source:
-            if ev["fecha_dt"].date() >= today:
-                future_or_today.append(ev)
-            else:
-                past.append(ev)
-        
-        # Ordenamos los futuros del más cercano al más lejano, y los pasados del más reciente al más antiguo
-        future_or_today.sort(key=lambda x: x["fecha_dt"])
-        past.sort(key=lambda x: x["fecha_dt"], reverse=True)
-
-
-        def agrupar(lista):
-            grouped = defaultdict(lambda: {"header": "", "eventos": []})
-            for r in lista:
-                date_key = r["fecha_dt"].strftime("%Y-%m-%d")
-
-                if r["fecha_dt"].date() == today:
-                    header = "HOY"
-                elif r["fecha_dt"].date() == today + timedelta(days=1):
-                    header = "MAÑANA"
-                else:
-                    date_obj = r["fecha_dt"].date()
-                    day_name = date_obj.strftime("%A")
-                    month_name = date_obj.strftime("%B")
-                    day_es = DIAS_ES.get(day_name, day_name)
-                    month_es = MESES_ES.get(month_name, month_name)
-                    header = f"{day_es.upper()}, {date_obj.day:02d} DE {month_es.upper()} DE {date_obj.year}"
-
-                grouped[date_key]["header"] = header
-                grouped[date_key]["eventos"].append(r)
-
-            return grouped
-
-        grouped_future = agrupar(future_or_today)
-        grouped_past = agrupar(past)
-        
-        # Convertir a lista de tuplas y luego a diccionario para mantener el orden de inserción
-        future_keys = sorted(grouped_future.keys())
-        past_keys = sorted(grouped_past.keys(), reverse=True) # Pasados del más reciente al más antiguo
-        
-        final_ordered = {}
-
-        # FUTURO
-        for k in future_keys:
-            final_ordered[k] = grouped_future[k]
-        
-        # SEPARADOR ESPECIAL
-        if len(past_keys) > 0:
-            final_ordered["__PAST_HEADER__"] = {
-                "header": "EVENTOS PASADOS",
-                "eventos": []
-            }
-
-        # PASADO
-        for k in past_keys:
-            final_ordered[k] = grouped_past[k]
-
-        self.grouped_events = final_ordered
-
-    # Helper para obtener la lista plana de eventos filtrados (usada en group_events_by_date)
-    @rx.var
-    def filtered_events_list_for_grouping(self) -> List[FullEvent]:
-        """Devuelve la lista plana de eventos filtrados para ser agrupados."""
-        if not self.search_query:
-            return self.all_events
-        
-        query = self.search_query.lower()
-        
-        return [
-            ev for ev in self.all_events 
-            if query in ev["nombre_usuario"].lower()
-            or query in ev["descripcion"].lower()
-        ]
+    # --------------------------------------------------
+    # EXPORTACIÓN
+    # --------------------------------------------------
+
+    def set_export_desde(self, value: str):
+        self.export_desde = value
+
+    def set_export_hasta(self, value: str):
+        self.export_hasta = value
+
+    async def exportar_csv(self):
+        """Crea el ticket de descarga con los filtros y manda al navegador a descargarlo."""
+        auth_state = await self.get_state(AuthState)
+        if auth_state.rol != "admin":
+            return rx.toast.error("Acceso denegado.")
+
+        ticket = crear_ticket("eventos", self.export_desde, self.export_hasta)
+        return rx.download(url=f"{rx.config.get_config().api_url}/api/admin/exportar/{ticket}")
 
     # --------------------------------------------------
     # LÓGICA DE ELIMINACIÓN
@@ -313,15 +381,13 @@ class AdminEventoState(rx.State):
                 cur.execute("DELETE FROM eventos WHERE id_evento = %s;", (id_evento,))
                 conn.commit()
                 
-                # 4. Actualizar el estado en Reflex
-                self.all_events = [
-                    ev for ev in self.all_events 
-                    if ev["id_evento"] != id_evento
+                # 4. Actualizar el estado en Reflex (sólo lo que cambió). El sync
+                # va encadenado: si el feed se purgó, su recarga completa (o su
+                # toast de error) tiene que llegar al cliente
+                return [
+                    rx.toast.success("Evento eliminado correctamente. 🗑️"),
+                    AdminEventoState.sync_events,
                 ]
-                
-                self.group_events_by_date() # Recalcular la vista agrupada
-                
-                return rx.toast.success("Evento eliminado correctamente. 🗑️")
             else:
                 return rx.toast.error("Evento no encontrado.")
 
@@ -335,6 +401,68 @@ class AdminEventoState(rx.State):
                 conn.close()
 
 
+    # --------------------------------------------------
+    # ACCIONES EN LOTE
+    # --------------------------------------------------
+
+    def toggle_selected(self, id_evento: int):
+        """Agrega o quita un evento de la selección."""
+        if id_evento in self.selected_ids:
+            self.selected_ids = [i for i in self.selected_ids if i != id_evento]
+        else:
+            self.selected_ids = self.selected_ids + [id_evento]
+
+    def clear_selection(self):
+        self.selected_ids = []
+
+    def delete_selected(self):
+        """Elimina (cancela) todos los eventos seleccionados y su menú en una sola sentencia."""
+        if not self.selected_ids:
+            return
+
+        conn = None
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+
+            # Validación de "no pasado", borrado del menú y de los eventos en un solo statement
+            cur.execute("""
+                WITH borrables AS (
+                    SELECT id_evento FROM eventos
+                    WHERE id_evento = ANY(%s) AND (fecha + hora) >= %s
+                ), lineas AS (
+                    DELETE FROM menu_evento
+                    WHERE id_evento IN (SELECT id_evento FROM borrables)
+                )
+                DELETE FROM eventos
+                WHERE id_evento IN (SELECT id_evento FROM borrables)
+                RETURNING id_evento;
+            """, (self.selected_ids, datetime.now()))
+            borrados = len(cur.fetchall())
+            conn.commit()
+
+            omitidos = len(self.selected_ids) - borrados
+            self.selected_ids = []
+
+            if omitidos:
+                aviso = rx.toast.warning(f"Se eliminaron {borrados} eventos. {omitidos} ya habían pasado o no existían.")
+            else:
+                aviso = rx.toast.success(f"Se eliminaron {borrados} eventos. 🗑️")
+            return [aviso, AdminEventoState.sync_events] # Un solo delta para todo el lote
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            print(f"Error eliminando eventos en lote: {e}")
+            return rx.toast.error(f"Error al eliminar eventos: {str(e)}")
+        finally:
+            if conn:
+                conn.close()
+
+
+# Los cambios de `eventos` llegan en vivo a esta página (ver live.py)
+live.registrar_tabla("eventos", AdminEventoState, fetch_events, "id_evento")
+
 
 # =========================================================
 # =============== COMPONENTES VISUALES ====================
@@ -359,7 +487,9 @@ def evento_menu_dropdown(evento):
                 rx.text("Ver menú del evento", color="white", weight="bold"),
                 rx.icon("chevron-down", color="white", size=18),
                 cursor="pointer",
-                on_click=lambda: AdminEventoState.toggle_menu(evento["id_evento"]),
+                on_click=menu_abierto.set_value(
+                    rx.cond(menu_abierto.value == evento["id_evento"], -1, evento["id_evento"])
+                ),
                 width="100%",
                 justify="between",
             ),
@@ -372,7 +502,7 @@ def evento_menu_dropdown(evento):
 
         # Contenido expandido
         rx.cond(
-            AdminEventoState.menu_open_id == evento["id_evento"],
+            menu_abierto.value == evento["id_evento"],
             rx.vstack(
                 rx.foreach(evento["menu_items"].to(List[MenuItem]), menu_item_row),
                 padding="10px",
@@ -390,13 +520,56 @@ def evento_menu_dropdown(evento):
     )
 
 
+# ----- BARRA DE ACCIONES EN LOTE -----
+def bulk_action_bar_eventos():
+    """Barra visible sólo cuando hay eventos seleccionados."""
+    return rx.cond(
+        AdminEventoState.selected_ids.length() > 0,
+        rx.hstack(
+            rx.text(
+                f"{AdminEventoState.selected_ids.length()} seleccionados",
+                color="white",
+                font_weight="bold",
+            ),
+            rx.spacer(),
+            rx.button(
+                "Limpiar selección",
+                on_click=AdminEventoState.clear_selection,
+                variant="soft",
+                color_scheme="gray",
+                cursor="pointer",
+            ),
+            rx.button(
+                rx.icon(tag="trash"),
+                "Eliminar seleccionados",
+                on_click=AdminEventoState.delete_selected,
+                color_scheme="red",
+                cursor="pointer",
+            ),
+            width="100%",
+            align_items="center",
+            padding="12px",
+            background="#1a1a1c",
+            border="1px solid rgba(255,0,0,0.3)",
+            border_radius="10px",
+            margin_bottom="10px",
+        ),
+    )
+
+
 # ----- TARJETA DE EVENTO -----
 def evento_card(evento: FullEvent):
     is_disabled = evento.es_pasado
     return rx.box(
         rx.vstack(
-            # Encabezado principal
+            # Encabezado principal (con selección para acciones en lote)
             rx.hstack(
+                rx.checkbox(
+                    checked=AdminEventoState.selected_ids.contains(evento["id_evento"]),
+                    on_change=lambda _: AdminEventoState.toggle_selected(evento["id_evento"]),
+                    disabled=is_disabled,
+                    color_scheme="red",
+                ),
                 rx.text(evento["nombre_usuario"], weight="bold", color="white"),
                 rx.spacer(),
                 rx.text(evento["fecha_evento_str"], color="gray"),
@@ -448,7 +621,9 @@ def evento_card(evento: FullEvent):
         background=rx.cond(is_disabled, "#141414", "#1a1a1c"), # Color diferente si es pasado
         border_radius="12px",
         border="1px solid rgba(255,255,255,0.08)",
-        width="100%"
+        width="100%",
+        # No pintar las tarjetas fuera de pantalla
+        style=ventana.FUERA_DE_PANTALLA,
     )
 
 
@@ -459,10 +634,10 @@ def eventos_by_day():
     return rx.vstack(
 
         rx.foreach(
-            AdminEventoState.filtered_events,
-            lambda item: rx.vstack(
+            AdminEventoState.grupos,
+            lambda grupo: rx.vstack(
                 rx.heading(
-                    item[1]["header"],
+                    grupo["header"],
                     size="4",
                     color="red",
                     margin_top="35px",
@@ -473,11 +648,11 @@ def eventos_by_day():
                 ),
 
                 rx.cond(
-                    item[1]["eventos"].length() > 0,
+                    grupo["ids"].length() > 0,
                     rx.vstack(
                         rx.foreach(
-                            item[1]["eventos"].to(List[FullEvent]),
-                            lambda ev: evento_card(ev)
+                            grupo["ids"].to(List[int]),
+                            lambda id_evento: evento_card(AdminEventoState.eventos[id_evento])
                         ),
                         spacing="4",
                         width="100%"
@@ -495,11 +670,45 @@ def eventos_by_day():
             )
         ),
 
+        # Siguiente ventana al llegar al final
+        ventana.centinela(AdminEventoState.hay_mas, AdminEventoState.mostrar_mas, AdminEventoState.visibles),
+
         width="100%",
         spacing="4",
         align_items="stretch",
     )
 
+# ----- FILTROS Y BOTÓN DE EXPORTACIÓN -----
+def export_bar_eventos():
+    """Filtros de fecha y botón para exportar los eventos a CSV."""
+    date_style = dict(
+        type="date",
+        size="2",
+        background="#1a1a1c",
+        color="white",
+        border="1px solid rgba(255,255,255,0.1)",
+        style={"color-scheme": "dark"},
+    )
+    return rx.hstack(
+        rx.text("Desde", color="gray", font_size="sm"),
+        rx.input(value=AdminEventoState.export_desde, on_change=AdminEventoState.set_export_desde, **date_style),
+        rx.text("Hasta", color="gray", font_size="sm"),
+        rx.input(value=AdminEventoState.export_hasta, on_change=AdminEventoState.set_export_hasta, **date_style),
+        rx.button(
+            rx.icon("download", size=16),
+            "Exportar CSV",
+            on_click=AdminEventoState.exportar_csv,
+            variant="soft",
+            color_scheme="gray",
+            cursor="pointer",
+        ),
+        spacing="3",
+        align_items="center",
+        justify="end",
+        width="100%",
+        margin_bottom="10px",
+    )
+
 # ----- BARRA DE BÚSQUEDA ESTILIZADA -----
 def search_bar_eventos():
     """Barra de búsqueda para filtrar eventos por nombre de usuario o descripción."""
@@ -554,8 +763,18 @@ def adm_eventos_page():
                     margin_bottom="10px",
                 ),
 
+                # ====== Exportación ======
+                export_bar_eventos(),
+
+                # ====== Acciones en lote ======
+                bulk_action_bar_eventos(),
+
                 # ====== Contenido ======
-                eventos_by_day(),
+                rx.cond(
+                    AdminEventoState.cargando & (AdminEventoState.grupos.length() == 0),
+                    segundo_plano.esqueleto_tarjetas(),
+                    eventos_by_day(),
+                ),
 
                 width="100%",
                 max_width="1200px",
@@ -573,5 +792,6 @@ def adm_eventos_page():
 
         width="100%",
         background="#0d0d0f",
-        min_height="100vh"
+        min_height="100vh",
+        on_unmount=AdminEventoState.al_salir,
     )
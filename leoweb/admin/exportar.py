@@ -0,0 +1,198 @@
+# leoweb/admin/exportar.py
+# Exportación a CSV de reservaciones y eventos.
+#
+# Las filas salen de un cursor del lado del servidor (cursor con nombre) en
+# lotes y se van escribiendo a la respuesta HTTP conforme llegan, así que la
+# memoria se mantiene constante sin importar el tamaño de la tabla.
+#
+# El admin no descarga directamente con su sesión: el state crea un "ticket"
+# de un solo uso con los filtros y el navegador lo canjea en
+# /api/admin/exportar/{ticket}. Con varios workers (redis_url configurado) el
+# ticket se guarda en Redis, porque la descarga puede caer en otro proceso.
+import csv
+import io
+import json
+import secrets
+import time
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from reflex.utils.prerequisites import get_redis_sync
+
+from ..auth_state import get_connection
+
+# Filas por lote del cursor y por chunk de la respuesta
+EXPORT_BATCH = 5000
+# Vigencia de un ticket de descarga (segundos)
+TICKET_TTL = 60
+
+# ticket -> (expira_en, tipo, filtros)  (sólo sin Redis)
+_TICKETS: Dict[str, Tuple[float, str, Dict[str, Any]]] = {}
+# Cliente de Redis (None = sin redis_url); se abre en el primer uso, no al importar
+_redis: Any = None
+_redis_listo = False
+
+RESERVAS_EXPORT_QUERY = """
+    SELECT
+        r.id_reserva, r.fecha, r.hora, r.cant_personas, r.tipo_evento,
+        COALESCE(s.nombre, 'No especificada') AS sucursal,
+        u.nombre, u.correo, COALESCE(u.telefono, 'N/A')
+    FROM reserva r
+    JOIN usuarios u ON r.id_usuario = u.id_usuario AND u.eliminado_en IS NULL
+    LEFT JOIN sucursales s ON r.id_sucursal = s.id_sucursal
+    {where}
+    ORDER BY r.fecha, r.hora, r.id_reserva;
+"""
+RESERVAS_EXPORT_HEADER = [
+    "id_reserva", "fecha", "hora", "personas", "tipo_evento",
+    "sucursal", "usuario", "correo", "telefono",
+]
+
+EVENTOS_EXPORT_QUERY = """
+    SELECT
+        e.id_evento, e.fecha, e.hora, e.ubicacion, e.cant_personas, e.costo,
+        u.nombre, u.correo, COALESCE(u.telefono, 'N/A'),
+        (
+            SELECT string_agg(m.nombre || ' x' || me.cantidad, '; ' ORDER BY me.id_producto)
+            FROM menu_evento me
+            JOIN menu m ON me.id_producto = m.id_producto
+            WHERE me.id_evento = e.id_evento
+        ) AS menu
+    FROM eventos e
+    JOIN usuarios u ON e.id_usuario = u.id_usuario AND u.eliminado_en IS NULL
+    {where}
+    ORDER BY e.fecha, e.hora, e.id_evento;
+"""
+EVENTOS_EXPORT_HEADER = [
+    "id_evento", "fecha", "hora", "ubicacion", "personas", "costo",
+    "usuario", "correo", "telefono", "menu",
+]
+
+
+def _cliente_redis():
+    """Cliente de Redis compartido, o None si la app corre sin redis_url."""
+    global _redis, _redis_listo
+    if not _redis_listo:
+        _redis = get_redis_sync()
+        _redis_listo = True
+    return _redis
+
+
+def crear_ticket(tipo: str, desde: str = "", hasta: str = "", sucursal: str = "") -> str:
+    """Registra una descarga pendiente ("reservas" o "eventos") y devuelve su ticket."""
+    ticket = secrets.token_urlsafe(16)
+    filtros = {
+        "desde": desde or None,
+        "hasta": hasta or None,
+        "sucursal": sucursal or None,
+    }
+
+    redis = _cliente_redis()
+    if redis is not None:
+        redis.set(f"leoweb:export:{ticket}", json.dumps([tipo, filtros]), ex=TICKET_TTL)
+        return ticket
+
+    ahora = time.time()
+    # Limpiar tickets vencidos
+    for t in [t for t, (expira, _, _) in _TICKETS.items() if expira < ahora]:
+        _TICKETS.pop(t, None)
+
+    _TICKETS[ticket] = (ahora + TICKET_TTL, tipo, filtros)
+    return ticket
+
+
+def _canjear_ticket(ticket: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Consume el ticket (un solo uso). Regresa (tipo, filtros) o None si no vale."""
+    redis = _cliente_redis()
+    if redis is not None:
+        guardado = redis.getdel(f"leoweb:export:{ticket}")
+        if guardado is None:
+            return None
+        tipo, filtros = json.loads(guardado)
+        return tipo, filtros
+
+    entrada = _TICKETS.pop(ticket, None)
+    if entrada is None or entrada[0] < time.time():
+        return None
+    return entrada[1], entrada[2]
+
+
+def _filtros_sql(tipo: str, filtros: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Arma el WHERE (sólo con los filtros presentes) y sus parámetros."""
+    tabla = "r" if tipo == "reservas" else "e"
+    condiciones, params = [], []
+
+    if filtros["desde"]:
+        condiciones.append(f"{tabla}.fecha >= %s")
+        params.append(date.fromisoformat(filtros["desde"]))
+    if filtros["hasta"]:
+        condiciones.append(f"{tabla}.fecha <= %s")
+        params.append(date.fromisoformat(filtros["hasta"]))
+    if tipo == "reservas" and filtros["sucursal"]:
+        condiciones.append("s.nombre = %s")
+        params.append(filtros["sucursal"])
+
+    where = "WHERE " + " AND ".join(condiciones) if condiciones else ""
+    return where, params
+
+
+def _filas_csv(query: str, params: List[Any], encabezado: List[str], nombre_cursor: str) -> Iterator[bytes]:
+    """Generador: lee del cursor con nombre por lotes y va produciendo chunks CSV."""
+    conn = get_connection()
+    try:
+        # Cursor con nombre = cursor del lado del servidor (no trae todo a memoria)
+        cur = conn.cursor(name=nombre_cursor)
+        cur.itersize = EXPORT_BATCH
+        cur.execute(query, params)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # BOM para que Excel reconozca los acentos
+        buffer.write("\ufeff")
+        writer.writerow(encabezado)
+
+        for i, fila in enumerate(cur, start=1):
+            writer.writerow(fila)
+            if i % EXPORT_BATCH == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate(0)
+
+        yield buffer.getvalue().encode("utf-8")
+    finally:
+        conn.close()
+
+
+async def exportar_csv(request: Request):
+    """Endpoint /api/admin/exportar/{ticket}: canjea el ticket y transmite el CSV."""
+    entrada = _canjear_ticket(request.path_params["ticket"])
+    if entrada is None:
+        return PlainTextResponse("Enlace de descarga inválido o vencido.", status_code=404)
+
+    tipo, filtros = entrada
+    try:
+        where, params = _filtros_sql(tipo, filtros)
+    except ValueError:
+        return PlainTextResponse("Fecha inválida.", status_code=400)
+
+    if tipo == "reservas":
+        query, encabezado = RESERVAS_EXPORT_QUERY, RESERVAS_EXPORT_HEADER
+    else:
+        query, encabezado = EVENTOS_EXPORT_QUERY, EVENTOS_EXPORT_HEADER
+
+    nombre = f"{tipo}_{date.today().isoformat()}.csv"
+    # StreamingResponse recorre el generador en un threadpool: no bloquea el event loop
+    return StreamingResponse(
+        _filas_csv(query.format(where=where), params, encabezado, f"export_{tipo}"),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
+
+
+# Rutas extra del backend (se montan en leoweb.py vía api_transformer)
+EXPORT_ROUTES = [
+    Route("/api/admin/exportar/{ticket}", exportar_csv, methods=["GET"]),
+]
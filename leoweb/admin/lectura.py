@@ -0,0 +1,76 @@
+# leoweb/admin/lectura.py
+# Lectura de listas grandes del admin por lotes.
+#
+# cur.fetchall() trae todas las tuplas de golpe y después se arma otra lista
+# con las filas ya convertidas: el pico de memoria es el doble de la tabla.
+# Aquí la consulta corre en un cursor con nombre (del lado del servidor, igual
+# que la exportación a CSV): PostgreSQL se queda con el resultado y sólo llegan
+# LOTE filas por viaje. Cada fila llega como namedtuple (sin __dict__) y se
+# convierte al vuelo:
+#
+#     productos = [
+#         {"id": f.id_producto, "nombre": f.nombre}
+#         for f in lectura.filas(cur, "SELECT id_producto, nombre FROM menu;")
+#     ]
+#
+# Así el pico sólo suma un lote al resultado final (no baja de ahí: las cargas
+# completas del admin guardan igual toda la tabla en su almacén).
+#
+# El cursor con nombre cuesta viajes extra (DECLARE / FETCH / CLOSE), así que
+# sólo vale para lecturas sin tope. Las acotadas (por ids, páginas con LIMIT)
+# pasan servidor=False: una sola consulta normal, con las mismas namedtuples.
+import itertools
+from collections import namedtuple
+from functools import lru_cache
+from typing import Any, Iterator, Optional, Sequence, Tuple
+
+# Filas por viaje del cursor
+LOTE = 500
+
+# Nombres únicos para los cursores (deben ser distintos dentro de la conexión)
+_cursores = itertools.count()
+
+
+@lru_cache(maxsize=64)
+def _tipo_fila(columnas: Tuple[str, ...]):
+    """Namedtuple para un juego de columnas (se crea una vez por consulta distinta)."""
+    return namedtuple("Fila", columnas, rename=True)
+
+
+def filas(
+    cur,
+    consulta: str,
+    params: Optional[Sequence[Any]] = None,
+    lote: int = LOTE,
+    servidor: bool = True,
+) -> Iterator[tuple]:
+    """
+    Generador: corre `consulta` en un cursor con nombre sobre la conexión de
+    `cur` y entrega cada fila como namedtuple, pidiendo `lote` filas a la vez.
+    Con servidor=False la corre en `cur` mismo y trae todo de una vez.
+    """
+    if not servidor:
+        cur.execute(consulta, params)
+        tipo = _tipo_fila(tuple(col.name for col in cur.description))
+        for fila in cur.fetchall():
+            yield tipo._make(fila)
+        return
+
+    conn = cur.connection
+    # Fuera de una transacción (p. ej. la conexión en autocommit del listener
+    # de live.py) el cursor con nombre tiene que ser WITH HOLD
+    con_nombre = conn.cursor(name=f"lectura_{next(_cursores)}", withhold=conn.autocommit)
+    try:
+        con_nombre.execute(consulta, params)
+        tipo = None
+        while True:
+            bloque = con_nombre.fetchmany(lote)
+            if not bloque:
+                break
+            if tipo is None:
+                # En un cursor con nombre la descripción llega con el primer lote
+                tipo = _tipo_fila(tuple(col.name for col in con_nombre.description))
+            for fila in bloque:
+                yield tipo._make(fila)
+    finally:
+        con_nombre.close()
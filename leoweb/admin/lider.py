@@ -0,0 +1,42 @@
+# leoweb/admin/lider.py
+# Trabajos periódicos que sólo debe correr un worker a la vez.
+#
+# Con varios workers del backend cada proceso arranca las mismas tareas de
+# fondo (refresco de la demanda, purga de cuentas). Antes de cada corrida se
+# pide un advisory lock de PostgreSQL con el nombre del trabajo: el worker que
+# lo consigue corre, los demás se saltan esa vuelta. El lock es de sesión, así
+# que si el worker muere a media corrida PostgreSQL lo suelta solo.
+#
+#     await asyncio.to_thread(lider.como_lider, "demanda", refrescar_demanda)
+from typing import Callable, Optional, TypeVar
+
+from ..auth_state import get_connection
+
+T = TypeVar("T")
+
+
+def como_lider(nombre: str, trabajo: Callable[[], T]) -> Optional[T]:
+    """
+    Corre `trabajo()` sólo si este proceso consigue el lock de `nombre`.
+    Regresa su resultado, o None si otro worker lo tiene (o no hubo BD).
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        conn.autocommit = True # El lock vive en la sesión, sin transacción abierta
+        cur = conn.cursor()
+        cur.execute("SELECT pg_try_advisory_lock(hashtext(%s));", (nombre,))
+        if not cur.fetchone()[0]:
+            return None
+
+        try:
+            return trabajo()
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(hashtext(%s));", (nombre,))
+
+    except Exception as e:
+        print(f"Error corriendo el trabajo '{nombre}': {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
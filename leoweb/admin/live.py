@@ -0,0 +1,150 @@
+# leoweb/admin/live.py
+# Actualización en vivo de las páginas del admin.
+#
+# Una sola tarea del backend (registrada en leoweb.py con register_lifespan_task)
+# escucha los canales NOTIFY que disparan los triggers de leoweb/schema.py.
+# Usa una única conexión a la BD sin importar cuántos admins estén conectados:
+# lee una vez las filas que cambiaron y las reparte como delta a cada sesión
+# suscrita.
+import asyncio
+import json
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+import psycopg2.extensions
+from reflex.state import _substate_key
+
+from ..auth_state import get_connection
+from . import bus
+from .cambios import leer_filas
+from .dashboard import invalidar_snapshot
+
+# Espera tras la primera notificación para juntar ráfagas en un solo reparto
+AGRUPAR_SEGUNDOS = 0.25
+# Espera antes de reconectar si se cae la conexión
+REINTENTO_SEGUNDOS = 5
+
+# tabla -> (StateClass, fetch(cur, ids), clave primaria en los dicts)
+# Cada módulo del admin registra su tabla con registrar_tabla().
+TABLAS: Dict[str, Tuple[type, Callable, str]] = {}
+
+# tabla -> client tokens de las pestañas de admin que la están viendo
+SUSCRIPTORES: Dict[str, Set[str]] = {}
+
+
+def registrar_tabla(tabla: str, state_cls: type, fetch: Callable, clave: str):
+    """Declara qué state y qué consulta atienden los cambios de `tabla`."""
+    TABLAS[tabla] = (state_cls, fetch, clave)
+    SUSCRIPTORES.setdefault(tabla, set())
+
+
+def suscribir(tabla: str, client_token: str):
+    """Suscribe una pestaña (client token) a los cambios de `tabla`."""
+    SUSCRIPTORES.setdefault(tabla, set()).add(client_token)
+
+
+def desuscribir(tabla: str, client_token: str):
+    """Quita la pestaña de los suscriptores de `tabla` (al salir de la página)."""
+    SUSCRIPTORES.get(tabla, set()).discard(client_token)
+
+
+def _agrupar(notificaciones) -> Dict[str, Tuple[List[int], Set[int]]]:
+    """Resume las notificaciones por tabla: (modificados, eliminados)."""
+    ultima_op: Dict[str, Dict[int, str]] = {}
+
+    for n in notificaciones:
+        tabla = n.channel[len("cambios_"):]
+        datos = json.loads(n.payload)
+        # Las notificaciones llegan en orden: la última operación manda
+        ultima_op.setdefault(tabla, {})[datos["id"]] = datos["op"]
+
+    resumen = {}
+    for tabla, ops in ultima_op.items():
+        modificados = [i for i, op in ops.items() if op != "D"]
+        eliminados = {i for i, op in ops.items() if op == "D"}
+        resumen[tabla] = (modificados, eliminados)
+    return resumen
+
+
+async def _repartir(rx_app, cur, notificaciones):
+    """Lee una vez las filas cambiadas y manda el delta a cada sesión suscrita."""
+    # Cualquier cambio deja viejos los conteos del dashboard
+    invalidar_snapshot()
+
+    conectados = rx_app.event_namespace.token_to_sid if rx_app.event_namespace else {}
+
+    for tabla, (modificados, eliminados) in _agrupar(notificaciones).items():
+        if tabla not in TABLAS:
+            continue
+
+        # Olvidar las pestañas que ya se desconectaron (las que sólo salieron
+        # de la página se quitan solas con desuscribir())
+        tokens = SUSCRIPTORES.get(tabla, set())
+        tokens &= set(conectados)
+        SUSCRIPTORES[tabla] = tokens
+        if not tokens:
+            continue
+
+        state_cls, fetch, clave = TABLAS[tabla]
+        # psycopg2 es síncrono: la lectura va en un hilo para no frenar el event loop
+        filas, eliminados = await asyncio.to_thread(
+            leer_filas, cur, fetch, clave, modificados, eliminados
+        )
+
+        for token in list(tokens):
+            try:
+                async with rx_app.modify_state(_substate_key(token, state_cls)) as root:
+                    state = await root.get_state(state_cls)
+                    # El id de cambio de la notificación no sirve como marca (no
+                    # va en orden de commit): la marca sólo la avanza el sync
+                    state._aplicar_delta(filas, eliminados, None)
+            except Exception as e:
+                print(f"Error enviando cambios de {tabla} a {token}: {e}")
+                tokens.discard(token)
+
+
+async def escuchar_cambios(rx_app: Any):
+    """Tarea de fondo: LISTEN sobre los canales `cambios_<tabla>` y reparto de deltas."""
+    loop = asyncio.get_running_loop()
+
+    while True:
+        conn = None
+        try:
+            conn = get_connection()
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            cur = conn.cursor()
+            for tabla in TABLAS:
+                cur.execute(f"LISTEN cambios_{tabla};")
+            # Invalidaciones de caché publicadas por otros workers (ver bus.py)
+            cur.execute(f"LISTEN {bus.CANAL_BUS};")
+
+            hay_datos = asyncio.Event()
+            loop.add_reader(conn.fileno(), hay_datos.set)
+            try:
+                while True:
+                    await hay_datos.wait()
+                    await asyncio.sleep(AGRUPAR_SEGUNDOS)
+                    hay_datos.clear()
+
+                    conn.poll()
+                    pendientes = list(conn.notifies)
+                    conn.notifies.clear()
+
+                    cambios = []
+                    for n in pendientes:
+                        if n.channel == bus.CANAL_BUS:
+                            bus.aplicar(n.payload)
+                        else:
+                            cambios.append(n)
+                    if cambios:
+                        await _repartir(rx_app, cur, cambios)
+            finally:
+                loop.remove_reader(conn.fileno())
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error en el listener de cambios del admin: {e}")
+            await asyncio.sleep(REINTENTO_SEGUNDOS)
+        finally:
+            if conn:
+                conn.close()
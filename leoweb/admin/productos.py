@@ -1,22 +1,177 @@
 import reflex as rx
+import asyncio
+import dataclasses
 import os
 import shutil # Para borrar carpetas
 from .adminsidebar import admin_sidebar, admin_sidebar_button
 from .aui_state import AUIState
-from ..auth_state import AuthState, get_connection
-from typing import List, Dict, Any
+from .acceso import admin_requerido
+from ..auth_state import get_connection
+from . import lectura, live, segundo_plano, ventana
+from .cambios import ultimo_cambio, cambios_desde, leer_filas, aplicar_cambios
+from typing import List, Dict, Any, Optional, Set
 from pathlib import Path # Para manejar rutas de archivos
+from reflex.experimental.client_state import ClientStateVar
+
+# Seleccionamos también el ID para poder borrar
+PRODUCTS_QUERY = """
+    SELECT id_producto, nombre, descripcion, categoria, precio, img, estado
+    FROM menu
+    {where}
+    ORDER BY estado ASC, id_producto DESC;
+"""
+
+# Modal "Agregar producto": se abre/cierra en el navegador; el backend sólo lo
+# cierra (con push) cuando el producto se guardó.
+modal_agregar = ClientStateVar.create("modal_agregar_producto", default=False)
+
+# --------------------------------------------------
+# ESCRITURAS CON IMAGEN (bloqueantes: se corren en un hilo)
+# --------------------------------------------------
+# Reflex no permite handlers de subida en segundo plano, así que handle_upload /
+# handle_update siguen teniendo el lock de la sesión; lo que sí se evita es
+# bloquear el event loop (y con él a todas las demás sesiones) con la BD y el disco.
+
+def insertar_producto(nombre: str, descripcion: str, categoria: str, precio: float,
+                      filename: str, imagen: bytes) -> int:
+    """Inserta el producto y guarda su imagen en assets/imgs/{id}/. Regresa el id."""
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+
+        # Insertar en la BD primero (para obtener ID)
+        cur.execute("""
+            INSERT INTO menu (nombre, descripcion, categoria, precio, img, estado)
+            VALUES (%s, %s, %s, %s, %s, 'activo')
+            RETURNING id_producto;
+        """, (nombre, descripcion, categoria, precio, filename))
+        new_id = cur.fetchone()[0]
+        conn.commit()
+
+        # assets/ está en la raíz del proyecto
+        target_dir = Path(f"assets/imgs/{new_id}")
+        target_dir.mkdir(parents=True, exist_ok=True) # Crear carpeta si no existe
+        (target_dir / filename).write_bytes(imagen)
+        return new_id
+    except Exception:
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            conn.close()
+
+
+def actualizar_producto(id_producto: int, nombre: str, descripcion: str, categoria: str,
+                        precio: float, filename: str, imagen: Optional[bytes], img_anterior: str):
+    """Actualiza el producto; si viene `imagen` reemplaza el archivo anterior."""
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+
+        if imagen is not None:
+            target_dir = Path(f"assets/imgs/{id_producto}")
+            target_dir.mkdir(parents=True, exist_ok=True) # Asegura que el directorio exista
+
+            # Borrar el archivo anterior si existe (y si tiene un nombre)
+            if img_anterior:
+                (target_dir / img_anterior).unlink(missing_ok=True)
+            (target_dir / filename).write_bytes(imagen)
+
+        cur.execute("""
+            UPDATE menu 
+            SET nombre = %s, descripcion = %s, categoria = %s, precio = %s, img = %s
+            WHERE id_producto = %s;
+        """, (nombre, descripcion, categoria, precio, filename, id_producto))
+        conn.commit()
+    except Exception:
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            conn.close()
+
+
+# Fila compacta de la lista maestra (sin __dict__ por fila). La URL de la
+# imagen y el formato para la UI se arman sólo para la ventana visible.
+@dataclasses.dataclass(slots=True)
+class Producto:
+    id: int
+    nombre: str
+    descripcion: str
+    categoria: str
+    precio: float
+    img: Optional[str]
+    estado: str
+
+
+def formatear_producto(p: Producto) -> Dict[str, Any]:
+    """Arma el producto para la tarjeta."""
+    return {
+        "id": p.id,
+        "nombre": p.nombre,
+        "descripcion": p.descripcion,
+        "categoria": p.categoria,
+        "precio": p.precio,
+        # Ruta web para mostrar la imagen (/imgs/...)
+        # Si no hay imagen, usar placeholder
+        "img_url": f"/imgs/{p.id}/{p.img}" if p.img else "/favicon.ico",
+        "img_file": p.img, # Guardamos nombre archivo para referencia
+        "estado": p.estado,
+    }
+
+
+def fetch_products(cur, ids: Optional[List[int]] = None) -> List[Producto]:
+    """Ejecuta PRODUCTS_QUERY (todos o sólo `ids`) y arma las filas."""
+    if ids is None:
+        query, params = PRODUCTS_QUERY.format(where=""), None
+    else:
+        query, params = PRODUCTS_QUERY.format(where="WHERE id_producto = ANY(%s)"), (list(ids),)
+
+    # La carga completa va por lotes desde un cursor del lado del servidor (ver lectura.py)
+    return [
+        Producto(
+            id=fila.id_producto,
+            nombre=fila.nombre,
+            descripcion=fila.descripcion,
+            categoria=fila.categoria,
+            precio=float(fila.precio),
+            img=fila.img,
+            estado=fila.estado,
+        )
+        for fila in lectura.filas(cur, query, params, servidor=ids is None)
+    ]
 
 # ----------------------------------------------------------------------------
 # STATE: PRODUCTOS
 # ----------------------------------------------------------------------------
 class AdminProductState(rx.State):
-    all_products: List[Dict[str, Any]] = [] # Lista maestra
+    # Lista maestra. Es backend-only (prefijo _): al navegador sólo viaja la
+    # ventana visible en filtered_products.
+    _all_products: List[Producto] = []
     search_query: str = "" # Texto del buscador
 
+    # Cuántos productos (ya filtrados) se muestran; crece con el scroll
+    visibles: int = ventana.VENTANA_PASO
+
+    # Selección múltiple para acciones en lote
+    selected_ids: List[int] = []
+
+    # Marca del feed de cambios hasta la que ya se aplicó todo (ver sync_products y cambios.py)
+    last_change_id: int = 0
+
+    # Hay una carga completa en curso (muestra el esqueleto si aún no hay datos)
+    cargando: bool = False
+    # Generación de la última carga pedida: sólo ésa apaga `cargando`
+    _carga_actual: int = 0
+
+    # Hay una subida (alta o edición con imagen) escribiéndose
+    subiendo: bool = False
+
     # --- NUEVO PRODUCTO ---
-    show_add_modal: bool = False
-    
     # Campos del formulario
     new_name: str = ""
     new_category: str = "Hamburguesas" # Valor por defecto
@@ -94,64 +249,47 @@ class AdminProductState(rx.State):
         
         # 1. Validaciones básicas
         if not self.new_name or not self.new_desc or not self.new_price:
-            return rx.toast.error("Por favor completa todos los campos de texto.")
+            yield rx.toast.error("Por favor completa todos los campos de texto.")
+            return
         
         try:
             price_float = float(self.new_price)
         except ValueError:
-            return rx.toast.error("El precio debe ser un número válido.")
+            yield rx.toast.error("El precio debe ser un número válido.")
+            return
 
-        conn = None
-        try:
-            conn = get_connection()
-            cur = conn.cursor()
-            
-            new_filename = self.edit_original_img_file # Por defecto, usa el nombre de archivo existente
-            
-            # --- Lógica de la imagen ---
-            if files:
-                # Se subió una NUEVA imagen
-                file = files[0]
-                new_filename = file.filename
-                
-                # 2. Guardar el nuevo archivo físico en assets/imgs/{id}/
-                upload_data = await file.read()
-                target_dir = Path(f"assets/imgs/{self.edit_id}")
-                target_dir.mkdir(parents=True, exist_ok=True) # Asegura que el directorio exista
-                
-                # Opcional: Borrar el archivo anterior si existe (y si tiene un nombre)
-                if self.edit_original_img_file:
-                    old_path = target_dir / self.edit_original_img_file
-                    if old_path.exists():
-                        old_path.unlink() # Borra el archivo anterior
-                        
-                # Guardar la nueva imagen
-                target_path = target_dir / new_filename
-                with open(target_path, "wb") as f:
-                    f.write(upload_data)
-            
-            # 3. Actualizar el registro en la BD
-            cur.execute("""
-                UPDATE menu 
-                SET nombre = %s, descripcion = %s, categoria = %s, precio = %s, img = %s
-                WHERE id_producto = %s;
-            """, (self.new_name, self.new_desc, self.new_category, price_float, new_filename, self.edit_id))
-            
-            conn.commit()
+        new_filename = self.edit_original_img_file # Por defecto, usa el nombre de archivo existente
+        upload_data = None
+        if files:
+            # Se subió una NUEVA imagen (Reflex ya la tiene en memoria)
+            new_filename = files[0].filename
+            upload_data = await files[0].read()
 
-            # 4. Cerrar modal y recargar lista
-            self.toggle_edit_modal()
-            self.load_products()
-            return rx.toast.success(f"Producto '{self.new_name}' actualizado correctamente.")
+        # Mostrar el botón "guardando" antes de la escritura
+        self.subiendo = True
+        yield
 
+        try:
+            # 2. Imagen + registro en la BD, en un hilo
+            await asyncio.to_thread(
+                actualizar_producto,
+                self.edit_id, self.new_name, self.new_desc, self.new_category,
+                price_float, new_filename, upload_data, self.edit_original_img_file,
+            )
         except Exception as e:
-            if conn:
-                conn.rollback()
             print(f"Error actualizando producto: {e}")
-            return rx.toast.error(f"Error al actualizar: {str(e)}")
+            yield rx.toast.error(f"Error al actualizar: {str(e)}")
+            return
         finally:
-            if conn:
-                conn.close()
+            self.subiendo = False
+
+        # 3. Cerrar modal y aplicar sólo lo que cambió
+        nombre = self.new_name
+        self.toggle_edit_modal()
+        yield [
+            rx.toast.success(f"Producto '{nombre}' actualizado correctamente."),
+            AdminProductState.sync_products,
+        ]
 
     def start_delete(self, id_producto: int, nombre: str):
         """Prepara el modal de confirmación de borrado (soft delete)."""
@@ -173,14 +311,12 @@ class AdminProductState(rx.State):
             AdminProductState.cancel_delete
         ]
 
-    def toggle_add_modal(self):
-        self.show_add_modal = not self.show_add_modal
-        # Resetear campos al cerrar
-        if not self.show_add_modal:
-            self.new_name = ""
-            self.new_category = "Hamburguesas"
-            self.new_desc = ""
-            self.new_price = ""
+    def reset_new_fields(self):
+        """Limpia el formulario de nuevo producto (el modal lo cierra el cliente)."""
+        self.new_name = ""
+        self.new_category = "Hamburguesas"
+        self.new_desc = ""
+        self.new_price = ""
 
     # Setters para los campos
     def set_new_name(self, v): self.new_name = v
@@ -194,130 +330,182 @@ class AdminProductState(rx.State):
         
         # 1. Validaciones básicas
         if not self.new_name or not self.new_desc or not self.new_price:
-            return rx.toast.error("Por favor completa todos los campos de texto.")
+            yield rx.toast.error("Por favor completa todos los campos de texto.")
+            return
         
         if not files:
-            return rx.toast.error("Debes seleccionar una imagen.")
+            yield rx.toast.error("Debes seleccionar una imagen.")
+            return
 
         try:
             price_float = float(self.new_price)
         except ValueError:
-            return rx.toast.error("El precio debe ser un número válido.")
+            yield rx.toast.error("El precio debe ser un número válido.")
+            return
 
-        conn = None
-        try:
-            conn = get_connection()
-            cur = conn.cursor()
+        # 2. Obtener el archivo (solo el primero; Reflex ya lo tiene en memoria)
+        filename = files[0].filename
+        upload_data = await files[0].read()
 
-            # 2. Obtener el archivo (solo el primero)
-            file = files[0]
-            filename = file.filename
-
-            # 3. Insertar en la BD primero (para obtener ID)
-            # Guardamos el nombre del archivo temporalmente
-            cur.execute("""
-                INSERT INTO menu (nombre, descripcion, categoria, precio, img, estado)
-                VALUES (%s, %s, %s, %s, %s, 'activo')
-                RETURNING id_producto;
-            """, (self.new_name, self.new_desc, self.new_category, price_float, filename))
-            
-            new_id = cur.fetchone()[0]
-            conn.commit()
-
-            # 4. Guardar el archivo físico en assets/imgs/{id}/
-            upload_data = await file.read()
-            
-            # Definir ruta de destino
-            # assets/ está en la raíz del proyecto
-            target_dir = Path(f"assets/imgs/{new_id}")
-            target_dir.mkdir(parents=True, exist_ok=True) # Crear carpeta si no existe
-            
-            target_path = target_dir / filename
-            
-            with open(target_path, "wb") as f:
-                f.write(upload_data)
-
-            # 5. Cerrar modal y recargar lista
-            self.toggle_add_modal()
-            self.load_products()
-            return rx.toast.success("Producto agregado correctamente.")
+        # Mostrar el botón "guardando" antes de la escritura
+        self.subiendo = True
+        yield
 
+        try:
+            # 3. Registro en la BD + imagen en assets/imgs/{id}/, en un hilo
+            await asyncio.to_thread(
+                insertar_producto,
+                self.new_name, self.new_desc, self.new_category, price_float,
+                filename, upload_data,
+            )
         except Exception as e:
-            if conn:
-                conn.rollback()
             print(f"Error agregando producto: {e}")
-            return rx.toast.error(f"Error al agregar: {str(e)}")
+            yield rx.toast.error(f"Error al agregar: {str(e)}")
+            return
         finally:
-            if conn:
-                conn.close()
+            self.subiendo = False
+
+        # 4. Limpiar, aplicar sólo lo que cambió y cerrar el modal
+        self.reset_new_fields()
+        yield [
+            modal_agregar.push(False),
+            rx.toast.success("Producto agregado correctamente."),
+            AdminProductState.sync_products,
+        ]
 
     # --- CARGA Y SEGURIDAD ---
-    async def on_load(self):
-        auth_state = await self.get_state(AuthState)
-        
-        # 1. Seguridad
-        if not auth_state.logged_in:
-            return rx.redirect("/login")
-        if auth_state.rol != "admin":
-            return [
-                rx.toast.error("Acceso denegado."),
-                rx.redirect("/") 
-            ]
-        
-        # 2. Cargar datos
-        self.load_products()
+    @admin_requerido
+    def on_load(self):
+        # Recibir en vivo los cambios de otros admins / usuarios
+        live.suscribir("menu", self.router.session.client_token)
+
+        # Si ya se habían cargado (regresó a la página), sólo aplicar lo que cambió
+        if self._all_products:
+            return AdminProductState.sync_products
+        return AdminProductState.load_products
+
+    def al_salir(self):
+        """Al salir de la página: deja de recibir cambios en vivo y corta las cargas que sigan en curso."""
+        client_token = self.router.session.client_token
+        live.desuscribir("menu", client_token)
+        segundo_plano.cancelar((client_token, "productos"))
+        segundo_plano.cancelar((client_token, "productos_sync"))
+
+    @rx.event(background=True)
+    async def load_products(self):
+        """
+        Obtiene todos los productos de la BD.
+        Corre en segundo plano: la consulta no tiene el lock de la sesión.
+        """
+        async with self:
+            self._carga_actual += 1
+            generacion = self._carga_actual
+            self.cargando = True
+            clave = (self.router.session.client_token, "productos")
 
-    def load_products(self):
-        """Obtiene todos los productos de la BD."""
-        conn = None
         try:
-            conn = get_connection()
-            cur = conn.cursor()
-            # Seleccionamos también el ID para poder borrar
-            cur.execute("SELECT id_producto, nombre, descripcion, categoria, precio, img, estado FROM menu ORDER BY estado ASC, id_producto DESC;")
-            rows = cur.fetchall()
-            
-            products = []
-            for row in rows:
-                p_id, nombre, desc, cat, precio, img, estado = row
-                
-                # Ruta web para mostrar la imagen (/imgs/...)
-                # Si no hay imagen, usar placeholder
-                img_url = f"/imgs/{p_id}/{img}" if img else "/favicon.ico"
-
-                products.append({
-                    "id": p_id,
-                    "nombre": nombre,
-                    "descripcion": desc,
-                    "categoria": cat,
-                    "precio": float(precio),
-                    "img_url": img_url,
-                    "img_file": img, # Guardamos nombre archivo para referencia
-                    "estado": estado
-                })
-            
-            self.all_products = products
-            
+            # Versión del feed de cambios ANTES de leer, para no perder nada
+            ultimo, productos = await segundo_plano.consultar(
+                clave, lambda cur: (ultimo_cambio(cur), fetch_products(cur))
+            )
+        except segundo_plano.CargaCancelada:
+            async with self:
+                if self._carga_actual == generacion:
+                    self.cargando = False
+            return
         except Exception as e:
             print(f"Error cargando productos: {e}")
-        finally:
-            if conn:
-                conn.close()
+            async with self:
+                if self._carga_actual == generacion:
+                    self.cargando = False
+            return rx.toast.error(f"Error al cargar productos: {str(e)}")
+
+        async with self:
+            self.last_change_id = ultimo
+            self._all_products = productos
+            if self._carga_actual == generacion:
+                self.cargando = False
+
+    def _aplicar_delta(self, nuevos: List[Producto], eliminados: Set[int], ultimo: Optional[int]):
+        """Parcha la lista con las filas cambiadas (lo usan sync y leoweb/admin/live.py)."""
+        self._all_products = aplicar_cambios(
+            self._all_products, "id", nuevos, eliminados,
+            orden=lambda p: (p.estado, -p.id), # Igual que el ORDER BY de la consulta
+        )
+        # En vivo (ultimo=None) la marca no avanza: el siguiente sync la pone al día
+        if ultimo is not None:
+            self.last_change_id = max(self.last_change_id, ultimo)
+
+    @rx.event(background=True)
+    async def sync_products(self):
+        """
+        Aplica sólo los productos que cambiaron desde la última sincronización.
+        También en segundo plano: se encadena tras cada alta, edición y baja.
+        """
+        async with self:
+            desde = self.last_change_id
+            clave = (self.router.session.client_token, "productos_sync")
+
+        def leer(cur):
+            cambios = cambios_desde(cur, "menu", desde)
+            if cambios is None:
+                return None
+            modificados, eliminados, ultimo = cambios
+            if not modificados and not eliminados:
+                return [], set(), ultimo
+            nuevos, eliminados = leer_filas(cur, fetch_products, "id", modificados, eliminados)
+            return nuevos, eliminados, ultimo
+
+        try:
+            cambios = await segundo_plano.consultar(clave, leer)
+        except segundo_plano.CargaCancelada:
+            return
+        except Exception as e:
+            print(f"Error sincronizando productos: {e}")
+            return rx.toast.error(f"Error al actualizar productos: {str(e)}")
+
+        if cambios is None:
+            # El feed fue purgado: no sabemos qué cambió, recargamos todo
+            return AdminProductState.load_products
+
+        async with self:
+            # Mientras leíamos, una carga completa u otro sync ya avanzó la
+            # marca: este delta es viejo y podría regresar filas
+            if self.last_change_id != desde:
+                return
+            nuevos, eliminados, ultimo = cambios
+            if not nuevos and not eliminados:
+                self.last_change_id = max(self.last_change_id, ultimo)
+                return
+            self._aplicar_delta(nuevos, eliminados, ultimo)
 
     # --- BÚSQUEDA ---
     def set_search(self, query: str):
         self.search_query = query
+        self.visibles = ventana.VENTANA_PASO # Nueva búsqueda: volver a la primera ventana
+
+    def mostrar_mas(self, visible: bool):
+        """El centinela del final de la lista entró en pantalla: siguiente ventana."""
+        if visible:
+            self.visibles += ventana.VENTANA_PASO
+
+    def _coincidencias(self) -> List[Producto]:
+        """Lista maestra filtrada según el texto de búsqueda."""
+        if not self.search_query:
+            return self._all_products
+
+        query = self.search_query.lower()
+        return [p for p in self._all_products if query in p.nombre.lower()]
 
     @rx.var
     def filtered_products(self) -> List[Dict[str, Any]]:
-        """Filtra la lista maestra según el texto de búsqueda."""
-        if not self.search_query:
-            return self.all_products
-        
-        return [
-            p for p in self.all_products 
-            if self.search_query.lower() in p["nombre"].lower()
-        ]
+        """Ventana visible de la lista filtrada, ya formateada."""
+        return [formatear_producto(p) for p in self._coincidencias()[:self.visibles]]
+
+    @rx.var
+    def hay_mas(self) -> bool:
+        """Quedan productos filtrados fuera de la ventana."""
+        return len(self._coincidencias()) > self.visibles
 
     # --- SOFT DELETE (DESACTIVAR) ---
     def delete_product(self, id_producto: int):
@@ -333,10 +521,11 @@ class AdminProductState(rx.State):
             # Nota: No se borra la carpeta de imágenes (assets/imgs/{id})
             # para que el producto pueda ser restaurado.
 
-            # 2. Recargar lista
-            self.load_products()
-            
-            return rx.toast.success("Producto desactivado correctamente.")
+            # 2. Aplicar sólo lo que cambió
+            return [
+                rx.toast.success("Producto desactivado correctamente."),
+                AdminProductState.sync_products,
+            ]
 
         except Exception as e:
             if conn:
@@ -358,10 +547,11 @@ class AdminProductState(rx.State):
             cur.execute("UPDATE menu SET estado = 'activo' WHERE id_producto = %s;", (id_producto,))
             conn.commit()
             
-            # 2. Recargar lista
-            self.load_products()
-            
-            return rx.toast.success("Producto restablecido correctamente.")
+            # 2. Aplicar sólo lo que cambió
+            return [
+                rx.toast.success("Producto restablecido correctamente."),
+                AdminProductState.sync_products,
+            ]
                 
         except Exception as e:
             if conn:
@@ -372,6 +562,62 @@ class AdminProductState(rx.State):
             if conn:
                 conn.close()
 
+    # --- ACCIONES EN LOTE ---
+    def toggle_selected(self, id_producto: int):
+        """Agrega o quita un producto de la selección."""
+        if id_producto in self.selected_ids:
+            self.selected_ids = [i for i in self.selected_ids if i != id_producto]
+        else:
+            self.selected_ids = self.selected_ids + [id_producto]
+
+    def clear_selection(self):
+        self.selected_ids = []
+
+    def deactivate_selected(self):
+        return self._cambiar_estado_seleccion("inactivo")
+
+    def restore_selected(self):
+        return self._cambiar_estado_seleccion("activo")
+
+    def _cambiar_estado_seleccion(self, estado: str):
+        """Desactiva/restablece todos los productos seleccionados en una sola sentencia."""
+        if not self.selected_ids:
+            return
+
+        conn = None
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+
+            # Sólo se tocan los que realmente cambian de estado
+            cur.execute("""
+                UPDATE menu SET estado = %s
+                WHERE id_producto = ANY(%s) AND estado <> %s;
+            """, (estado, self.selected_ids, estado))
+            cambiados = cur.rowcount
+            conn.commit()
+
+            self.selected_ids = []
+
+            accion = "desactivaron" if estado == "inactivo" else "restablecieron"
+            return [
+                rx.toast.success(f"Se {accion} {cambiados} productos."),
+                AdminProductState.sync_products, # Un solo delta para todo el lote
+            ]
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            print(f"Error DB en acción en lote: {e}")
+            return rx.toast.error(f"No se pudo aplicar la acción: {str(e)}")
+        finally:
+            if conn:
+                conn.close()
+
+
+# Los cambios de `menu` llegan en vivo a esta página (ver live.py)
+live.registrar_tabla("menu", AdminProductState, fetch_products, "id")
+
 
 # ----------------------------------------------------------------------------
 # COMPONENTES UI
@@ -503,7 +749,7 @@ def add_product_modal():
                 rx.hstack(
                     rx.button(
                         "Cancelar", 
-                        on_click=AdminProductState.toggle_add_modal,
+                        on_click=modal_agregar.set_value(False),
                         variant="soft", 
                         color_scheme="gray"
                     ),
@@ -512,6 +758,7 @@ def add_product_modal():
                         on_click=lambda: AdminProductState.handle_upload(
                             rx.upload_files(upload_id="upload_product_img")
                         ),
+                        loading=AdminProductState.subiendo,
                         background="red", 
                         color="white",
                         _hover={"background": "#b30000"}
@@ -526,8 +773,8 @@ def add_product_modal():
             padding="30px",
             width="600px"
         ),
-        open=AdminProductState.show_add_modal,
-        on_open_change=AdminProductState.toggle_add_modal,
+        open=modal_agregar.value,
+        on_open_change=modal_agregar.set_value(),
     )
 
 # ----------------------------------------------------------------------------
@@ -740,6 +987,7 @@ def edit_product_modal():
                         on_click=lambda: AdminProductState.handle_update(
                             rx.upload_files(upload_id="upload_product_img")
                         ),
+                        loading=AdminProductState.subiendo,
                         background="orange", # Un color diferente para distinguirlo
                         color="white",
                         _hover={"background": "#cc8400"}
@@ -806,6 +1054,51 @@ def delete_confirm_modal():
         on_open_change=AdminProductState.cancel_delete,
     )
 
+# ----------------------------------------------------------------------------
+# COMPONENTE: BARRA DE ACCIONES EN LOTE
+# ----------------------------------------------------------------------------
+def bulk_action_bar():
+    """Barra visible sólo cuando hay productos seleccionados."""
+    return rx.cond(
+        AdminProductState.selected_ids.length() > 0,
+        rx.hstack(
+            rx.text(
+                f"{AdminProductState.selected_ids.length()} seleccionados",
+                color="white",
+                font_weight="bold",
+            ),
+            rx.spacer(),
+            rx.button(
+                "Limpiar selección",
+                on_click=AdminProductState.clear_selection,
+                variant="soft",
+                color_scheme="gray",
+                cursor="pointer",
+            ),
+            rx.button(
+                rx.icon("rotate-ccw", size=16),
+                "Reestablecer",
+                on_click=AdminProductState.restore_selected,
+                color_scheme="green",
+                cursor="pointer",
+            ),
+            rx.button(
+                rx.icon("trash-2", size=16),
+                "Desactivar",
+                on_click=AdminProductState.deactivate_selected,
+                color_scheme="red",
+                cursor="pointer",
+            ),
+            width="100%",
+            align_items="center",
+            padding="12px",
+            background="#1a1a1c",
+            border="1px solid rgba(255,0,0,0.3)",
+            border_radius="10px",
+            margin_bottom="20px",
+        ),
+    )
+
 # ----------------------------------------------------------------------------
 # COMPONENTE: CARD DEL PRODUCTO (CON LÓGICA DE ESTADO)
 # ----------------------------------------------------------------------------
@@ -829,8 +1122,13 @@ def admin_product_card(product: Dict[str, Any]):
             
             # 2. INFO (Derecha)
             rx.vstack(
-                # Encabezado: Nombre y Badge
+                # Encabezado: Selección, Nombre y Badge
                 rx.hstack(
+                    rx.checkbox(
+                        checked=AdminProductState.selected_ids.contains(product["id"]),
+                        on_change=lambda _: AdminProductState.toggle_selected(product["id"]),
+                        color_scheme="red",
+                    ),
                     rx.vstack(
                         rx.text(
                             product["nombre"], 
@@ -948,7 +1246,37 @@ def admin_product_card(product: Dict[str, Any]):
         border_radius="10px",
         border=rx.cond(is_inactive, "1px solid rgba(255,0,0,0.2)", "1px solid rgba(255,255,255,0.05)"),
         box_shadow="0 4px 6px rgba(0,0,0,0.2)",
-        _hover={"border_color": rx.cond(is_inactive, "rgba(255,0,0,0.5)", "rgba(255,255,255,0.2)")}
+        _hover={"border_color": rx.cond(is_inactive, "rgba(255,0,0,0.5)", "rgba(255,255,255,0.2)")},
+        # No pintar las tarjetas fuera de pantalla (su altura es fija)
+        style={**ventana.FUERA_DE_PANTALLA, "contain_intrinsic_size": "auto 150px"},
+    )
+
+# ----------------------------------------------------------------------------
+# LISTADO (VENTANA VISIBLE)
+# ----------------------------------------------------------------------------
+def productos_lista():
+    return rx.cond(
+        AdminProductState.filtered_products,
+        rx.vstack(
+            rx.grid(
+                rx.foreach(
+                    AdminProductState.filtered_products,
+                    admin_product_card
+                ),
+                columns="2", 
+                spacing="4",
+                width="100%"
+            ),
+            # Siguiente ventana al llegar al final
+            ventana.centinela(AdminProductState.hay_mas, AdminProductState.mostrar_mas, AdminProductState.visibles),
+            width="100%",
+        ),
+        # Estado vacío
+        rx.center(
+            rx.text("No se encontraron productos.", color="#666"),
+            width="100%",
+            padding="40px"
+        )
     )
 
 # ----------------------------------------------------------------------------
@@ -972,7 +1300,7 @@ def adm_productos_page():
                         color="white",
                         _hover={"background": "#b30000"},
                         cursor="pointer",
-                        on_click=AdminProductState.toggle_add_modal
+                        on_click=modal_agregar.set_value(True)
                     ),
                     # 🟢 Nueva implementación usando rx.input (o rx.input.text)
                     rx.box(
@@ -1005,24 +1333,14 @@ def adm_productos_page():
                     margin_bottom="30px"
                 ),
                 
+                # --- ACCIONES EN LOTE ---
+                bulk_action_bar(),
+
                 # --- LISTADO DE PRODUCTOS ---
                 rx.cond(
-                    AdminProductState.filtered_products,
-                    rx.grid(
-                        rx.foreach(
-                            AdminProductState.filtered_products,
-                            admin_product_card
-                        ),
-                        columns="2", 
-                        spacing="4",
-                        width="100%"
-                    ),
-                    # Estado vacío
-                    rx.center(
-                        rx.text("No se encontraron productos.", color="#666"),
-                        width="100%",
-                        padding="40px"
-                    )
+                    AdminProductState.cargando & (AdminProductState.filtered_products.length() == 0),
+                    segundo_plano.esqueleto_tarjetas(),
+                    productos_lista(),
                 ),
                 
                 align_items="start",
@@ -1046,5 +1364,6 @@ def adm_productos_page():
         
         width="100%",
         min_height="100vh",
-        background="#0d0d0f"
+        background="#0d0d0f",
+        on_unmount=AdminProductState.al_salir,
     )
\ No newline at end of file
@@ -0,0 +1,142 @@
+# leoweb/admin/purga.py
+# Eliminación de usuarios junto con todo lo que les pertenece.
+#
+# - Cuentas chicas: se borran en el momento con una sola sentencia (CTE).
+# - Cuentas grandes (más de UMBRAL_DIFERIDO reservas + eventos): sólo se marcan
+#   con `eliminado_en` y la tarea de fondo purgar_periodicamente() las borra por
+#   lotes, confirmando cada lote para no tener transacciones ni bloqueos largos.
+#   Mientras tanto la cuenta ya no existe para la app: no puede iniciar sesión
+#   ni reservar (auth_state.cuenta_activa) y sus reservas y eventos dejan de
+#   salir en las listas, conteos y exportaciones del admin (todas esas
+#   consultas filtran u.eliminado_en IS NULL).
+#
+# Los borrados van hijo -> padre en sentencias separadas: no se depende de
+# cuándo revisa PostgreSQL las FK (en un solo statement con CTEs sólo
+# funcionaría con FK NO ACTION no diferidas, no con RESTRICT).
+import asyncio
+from typing import List
+
+from ..auth_state import get_connection
+from . import lider
+
+# A partir de cuántas filas dependientes el borrado se hace en segundo plano
+UMBRAL_DIFERIDO = 1000
+# Filas por lote en la purga
+PURGA_LOTE = 500
+# Cada cuánto revisa la tarea de fondo si hay cuentas pendientes (segundos)
+PURGA_SEGUNDOS = 30
+
+# Borrado inmediato, en orden hijo -> padre (misma transacción)
+BORRAR_USUARIO_SQL = [
+    """
+    DELETE FROM menu_evento
+    WHERE id_evento IN (SELECT id_evento FROM eventos WHERE id_usuario = %(id)s);
+    """,
+    "DELETE FROM eventos WHERE id_usuario = %(id)s;",
+    "DELETE FROM reserva WHERE id_usuario = %(id)s;",
+    "DELETE FROM usuarios WHERE id_usuario = %(id)s;",
+]
+
+DEPENDIENTES_SQL = """
+    SELECT (SELECT COUNT(*) FROM reserva WHERE id_usuario = %(id)s)
+         + (SELECT COUNT(*) FROM eventos WHERE id_usuario = %(id)s);
+"""
+
+# Marca la cuenta y deja en el feed de cambios (ver cambios.py) sus reservas y
+# eventos como borrados: el siguiente sync de cada admin los quita de su lista
+MARCAR_ELIMINADO_SQL = """
+    WITH marcado AS (
+        UPDATE usuarios SET eliminado_en = now()
+        WHERE id_usuario = %(id)s
+        RETURNING id_usuario
+    ), res AS (
+        INSERT INTO cambios (tabla, id_registro, operacion)
+        SELECT 'reserva', id_reserva, 'D' FROM reserva
+        WHERE id_usuario IN (SELECT id_usuario FROM marcado)
+    )
+    INSERT INTO cambios (tabla, id_registro, operacion)
+    SELECT 'eventos', id_evento, 'D' FROM eventos
+    WHERE id_usuario IN (SELECT id_usuario FROM marcado);
+"""
+
+# Lotes de la purga (cada uno con su propio commit). Los eventos del lote se
+# eligen primero; su menú se borra antes que ellos.
+LOTE_EVENTOS_SQL = "SELECT id_evento FROM eventos WHERE id_usuario = %(id)s LIMIT %(lote)s;"
+PURGAR_MENU_LOTE_SQL = "DELETE FROM menu_evento WHERE id_evento = ANY(%s);"
+PURGAR_EVENTOS_LOTE_SQL = "DELETE FROM eventos WHERE id_evento = ANY(%s);"
+
+PURGAR_RESERVAS_SQL = """
+    DELETE FROM reserva
+    WHERE id_reserva IN (
+        SELECT id_reserva FROM reserva WHERE id_usuario = %(id)s LIMIT %(lote)s
+    );
+"""
+
+
+def eliminar_usuario(cur, id_usuario: int) -> bool:
+    """
+    Borra al usuario o lo marca para la purga en segundo plano.
+    Regresa True si quedó diferido. El commit lo hace quien llama.
+    """
+    cur.execute(DEPENDIENTES_SQL, {"id": id_usuario})
+    if cur.fetchone()[0] > UMBRAL_DIFERIDO:
+        cur.execute(MARCAR_ELIMINADO_SQL, {"id": id_usuario})
+        return True
+
+    for sql in BORRAR_USUARIO_SQL:
+        cur.execute(sql, {"id": id_usuario})
+    return False
+
+
+def purgar_eliminados() -> int:
+    """Borra por lotes las cuentas marcadas. Regresa cuántas terminó de borrar."""
+    conn = None
+    terminadas = 0
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+
+        cur.execute("SELECT id_usuario FROM usuarios WHERE eliminado_en IS NOT NULL;")
+        pendientes: List[int] = [row[0] for row in cur.fetchall()]
+
+        for id_usuario in pendientes:
+            params = {"id": id_usuario, "lote": PURGA_LOTE}
+            while True:
+                cur.execute(LOTE_EVENTOS_SQL, params)
+                ids = [row[0] for row in cur.fetchall()]
+                if ids:
+                    cur.execute(PURGAR_MENU_LOTE_SQL, (ids,))
+                    cur.execute(PURGAR_EVENTOS_LOTE_SQL, (ids,))
+                conn.commit()
+                if len(ids) < PURGA_LOTE:
+                    break
+
+            while True:
+                cur.execute(PURGAR_RESERVAS_SQL, params)
+                borradas = cur.rowcount
+                conn.commit()
+                if borradas < PURGA_LOTE:
+                    break
+
+            cur.execute("DELETE FROM usuarios WHERE id_usuario = %s;", (id_usuario,))
+            conn.commit()
+            terminadas += 1
+
+    except Exception as e:
+        print(f"Error purgando usuarios eliminados: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+    return terminadas
+
+
+async def purgar_periodicamente():
+    """Tarea de fondo: termina de borrar las cuentas marcadas con eliminado_en."""
+    while True:
+        # psycopg2 bloquea: se corre en un hilo para no frenar el event loop.
+        # Con varios workers sólo lo corre el que tenga el lock (ver lider.py)
+        await asyncio.to_thread(lider.como_lider, "purga", purgar_eliminados)
+        await asyncio.sleep(PURGA_SEGUNDOS)
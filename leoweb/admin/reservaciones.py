@@ -1,238 +1,442 @@
 import reflex as rx
-from typing import List, Dict, Any, TypedDict, Tuple
-from datetime import datetime, timedelta
-from collections import defaultdict # Para agrupar las reservas
+import dataclasses
+from itertools import islice
+from typing import List, Dict, Any, TypedDict, Optional, Set, Tuple
+from datetime import datetime, date
 from ..auth_state import AuthState, get_connection
 from .adminsidebar import admin_sidebar, admin_sidebar_button
 from .aui_state import AUIState
-
-# Traducción manual de días y meses (para evitar problemas de locale)
-DIAS_ES = {
-    "Monday": "Lunes",
-    "Tuesday": "Martes",
-    "Wednesday": "Miércoles",
-    "Thursday": "Jueves",
-    "Friday": "Viernes",
-    "Saturday": "Sábado",
-    "Sunday": "Domingo",
-}
-
-MESES_ES = {
-    "January": "Enero",
-    "February": "Febrero",
-    "March": "Marzo",
-    "April": "Abril",
-    "May": "Mayo",
-    "June": "Junio",
-    "July": "Julio",
-    "August": "Agosto",
-    "September": "Septiembre",
-    "October": "Octubre",
-    "November": "Noviembre",
-    "December": "Diciembre",
-}
-
-
-# Definición de un tipo para la reserva completa, incluyendo datos del usuario
+from .acceso import admin_requerido
+from . import lectura, live, segundo_plano, ventana
+from .agrupacion import (
+    PAST_HEADER_KEY, agrupar_ids_por_fecha, clave_keyset, clave_orden, clave_por_fecha_sql,
+    fecha_corta, hora_12, minuto_actual, orden_por_fecha_sql, reordenar_por_fecha,
+)
+from .exportar import crear_ticket
+from .cambios import ultimo_cambio, cambios_desde, leer_filas, aplicar_cambios_por_id
+
+# Fila compacta del almacén: sin __dict__ por fila y sin los textos ya
+# formateados (fecha, hora, "es pasada"), que se arman sólo para la ventana
+# visible en formatear_reserva.
+@dataclasses.dataclass(slots=True)
+class Reserva:
+    id_reserva: int
+    cant_personas: int
+    fecha_dt: datetime # Para ordenar/agrupar
+    tipo_evento: str
+    sucursal: Optional[str]
+    usuario_nombre: str
+    usuario_correo: str
+    usuario_telefono: Optional[str]
+
+# Definición de un tipo para la reserva como la ve la UI, incluyendo datos del usuario
 FullReservation = Dict[str, Any]
-# Definición de un tipo para las reservas agrupadas: {fecha: [reserva1, reserva2, ...]}
-class GroupedItem(TypedDict):
-    header: str
-    reservas: List[FullReservation]
 
-GroupedReservations = Dict[str, GroupedItem]
+def formatear_reserva(r: Reserva, ahora: datetime) -> FullReservation:
+    """Arma la reserva para la tarjeta (los textos de fecha y hora salen memoizados)."""
+    return {
+        "id_reserva": r.id_reserva,
+        "cant_personas": r.cant_personas,
+        "fecha": fecha_corta(r.fecha_dt.date()),
+        "hora": hora_12(r.fecha_dt.time()),
+        "tipo_evento": r.tipo_evento,
+        "sucursal": r.sucursal if r.sucursal else "No especificada",
+        "es_pasada": r.fecha_dt < ahora,
+        "usuario_nombre": r.usuario_nombre,
+        "usuario_correo": r.usuario_correo,
+        "usuario_telefono": r.usuario_telefono if r.usuario_telefono else "N/A",
+    }
+# Un día de la lista: sólo los ids, las reservas viven en AdminReservaState.reservas
+class GrupoReservas(TypedDict):
+    clave: str
+    header: str
+    ids: List[int]
+
+# 💡 Consulta JOIN para obtener: Reserva + Usuario + Sucursal (asumiendo que existe)
+RESERVATIONS_QUERY = """
+    SELECT 
+        r.id_reserva, r.cant_personas, r.fecha, r.hora, r.tipo_evento,
+        u.nombre, u.correo, u.telefono,
+        s.nombre as sucursal_nombre
+    FROM reserva r
+    -- Las cuentas eliminadas (pendientes de purga) ya no cuentan
+    JOIN usuarios u ON r.id_usuario = u.id_usuario AND u.eliminado_en IS NULL
+    -- Asume que la tabla 'reserva' tiene 'id_sucursal' y 'sucursales' existe
+    LEFT JOIN sucursales s ON r.id_sucursal = s.id_sucursal 
+    {where}
+    {order} -- Futuras de la más próxima a la más lejana, luego pasadas (ver agrupacion.py)
+    {limit};
+"""
+
+# Búsqueda en SQL: cada columna tiene un índice trigram (ver leoweb/schema.py),
+# así que el ILIKE '%texto%' no recorre toda la tabla.
+SEARCH_WHERE = """
+    WHERE (u.nombre ILIKE %s
+       OR u.correo ILIKE %s
+       OR u.telefono ILIKE %s
+       OR r.tipo_evento ILIKE %s)
+"""
+# Continúa después de la última reservación de la página anterior (keyset
+# sobre el orden por cubetas, ver agrupacion.CLAVE_POR_FECHA_SQL)
+SEARCH_KEYSET_WHERE = "AND {clave} > (%s, %s, %s, %s)"
+
+# Resultados de búsqueda por página
+SEARCH_PAGE_SIZE = 50
+
+def fetch_reservations(
+    cur,
+    ids: Optional[List[int]] = None,
+    search: Optional[str] = None,
+    despues: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None,
+) -> List[Reserva]:
+    """
+    Ejecuta RESERVATIONS_QUERY (todas, sólo `ids` o las que coinciden con
+    `search`) y arma las filas. La búsqueda se pagina por keyset: `despues` es
+    (fecha_dt, id_reserva) de la última fila de la página anterior.
+    """
+    hoy = date.today()
+    where, params = "", []
+    order_sql = orden_por_fecha_sql("r.fecha", "r.hora")
+    if ids is not None:
+        where, params = "WHERE r.id_reserva = ANY(%s)", [list(ids)]
+    elif search:
+        # Escapar los comodines de LIKE que vengan en el texto
+        texto = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        where, params = SEARCH_WHERE, [f"%{texto}%"] * 4
+
+        # Mismo orden por cubetas, con el id como desempate para el keyset
+        clave = clave_por_fecha_sql("r.fecha", "r.hora", "r.id_reserva")
+        if despues is not None:
+            where += SEARCH_KEYSET_WHERE.format(clave=clave)
+            params += [hoy, hoy, *clave_keyset(despues[0], despues[1], hoy)]
+        order_sql = f"ORDER BY {clave}"
+
+    params += [hoy, hoy] # Para el ORDER BY por cubetas
+
+    limit_sql = ""
+    if limit is not None:
+        limit_sql = "LIMIT %s"
+        params.append(limit)
+
+    query = RESERVATIONS_QUERY.format(where=where, order=order_sql, limit=limit_sql)
+
+    # La carga completa va por lotes desde un cursor del lado del servidor (ver lectura.py)
+    return [
+        Reserva(
+            id_reserva=fila.id_reserva,
+            cant_personas=fila.cant_personas,
+            fecha_dt=datetime.combine(fila.fecha, fila.hora),
+            tipo_evento=fila.tipo_evento,
+            sucursal=fila.sucursal_nombre,
+            usuario_nombre=fila.nombre,
+            usuario_correo=fila.correo,
+            usuario_telefono=fila.telefono,
+        )
+        for fila in lectura.filas(cur, query, params, servidor=ids is None and limit is None)
+    ]
 
 # --- STATE DE RESERVACIONES ---
 class AdminReservaState(rx.State):
     """Estado para la gestión de reservaciones en el panel de administrador."""
     
-    # Datos Maestros
-    all_reservations: List[FullReservation] = [] # Lista maestra sin filtrar
+    # Almacén maestro { id_reserva: reserva }, en el orden de la consulta.
+    # Backend-only (prefijo _): al navegador sólo viaja la ventana visible
+    # (reservas) y los grupos por día con sus ids (grupos).
+    _reservas: Dict[int, Reserva] = {}
     
-    # Búsqueda
-    search_query: str = "" # Texto del buscador (por nombre de usuario)
-
-    # Datos Agrupados (Variable computada para la UI)
-    grouped_reservations: GroupedReservations = {} 
+    # Búsqueda (se resuelve en SQL, ver run_search)
+    search_query: str = "" # Texto del buscador (nombre, correo, teléfono o tipo de evento)
+    # Resultados cargados hasta ahora, en orden. Van aparte del almacén maestro:
+    # si la carga completa se cancela, el maestro no queda con sólo estas filas
+    _resultados: Dict[int, Reserva] = {}
+    _search_despues: Optional[Tuple[datetime, int]] = None # (fecha_dt, id) del último resultado
+    search_cargados: int = 0 # Cuántos resultados hay (también re-monta el centinela)
+    _search_has_more: bool = False
+
+    # Ventana visible de la lista maestra (sin búsqueda); crece con el scroll
+    visibles: int = ventana.VENTANA_PASO
+
+    # Selección múltiple para acciones en lote
+    selected_ids: List[int] = []
+
+    # Filtros de la exportación a CSV
+    export_desde: str = ""
+    export_hasta: str = ""
+    export_sucursal: str = "Todas"
+    sucursales: List[str] = ["Todas"]
+
+    # Marca del feed de cambios hasta la que ya se aplicó todo (ver sync_reservations y cambios.py)
+    last_change_id: int = 0
+
+    # Hay una carga completa en curso (muestra el esqueleto si aún no hay datos)
+    cargando: bool = False
+    # Generación de la última carga pedida: sólo ésa apaga `cargando`
+    _carga_actual: int = 0
+
+    # Reloj de las vistas: minuto actual y día (ordinal) con el que está
+    # ordenado el almacén (ver _al_dia)
+    _minuto: int = 0
+    _dia: int = 0
 
     # --------------------------------------------------
     # CICLO DE VIDA Y VALIDACIÓN
     # --------------------------------------------------
 
-    async def on_load(self):
-        """Validación de admin y carga inicial de datos."""
-        auth_state = await self.get_state(AuthState)
-        
-        # 1. Redireccionar si no está logueado
-        if not auth_state.logged_in:
-            return rx.redirect("/login")
-        
-        # 2. Redireccionar si no es admin
-        if auth_state.rol != "admin":
-            return [
-                rx.toast.error("Acceso denegado. Se requiere ser administrador."),
-                rx.redirect("/") 
-            ]
-        
-        # 3. Cargar datos
-        return self.load_all_reservations()
+    @admin_requerido
+    def on_load(self):
+        """Carga inicial de datos (la validación de admin la hace el decorador)."""
+        # Recibir en vivo los cambios de otros admins / usuarios
+        live.suscribir("reserva", self.router.session.client_token)
+
+        # Las vistas comparan contra "ahora": ponerlas al minuto aunque no haya cambios
+        self._al_dia()
+
+        # Si ya se habían cargado (regresó a la página), sólo aplicar lo que cambió
+        if self._reservas:
+            return self.sync_reservations()
+        return AdminReservaState.load_all_reservations
+
+    def al_salir(self):
+        """Al salir de la página: deja de recibir cambios en vivo y corta la carga completa si sigue en curso."""
+        client_token = self.router.session.client_token
+        live.desuscribir("reserva", client_token)
+        segundo_plano.cancelar((client_token, "reservas"))
+
+    def _al_dia(self):
+        """Avanza el reloj de las vistas y, si cambió el día, reordena el almacén por cubetas."""
+        minuto = minuto_actual()
+        if minuto != self._minuto:
+            self._minuto = minuto
+
+        hoy = date.today()
+        if hoy.toordinal() != self._dia:
+            # Lo que era hoy/futuro pudo pasar a la cubeta de pasados
+            if self._reservas:
+                self._reservas = reordenar_por_fecha(self._reservas, hoy)
+            if self._resultados:
+                self._resultados = reordenar_por_fecha(self._resultados, hoy)
+            self._dia = hoy.toordinal()
 
     # --------------------------------------------------
     # LÓGICA DE DATOS
     # --------------------------------------------------
 
-    @rx.var
-    def grouped_reservations_list(self) -> List[GroupedItem]:
-        return [
-            {
-                "date_key": k,
-                "header": v["header"],
-                "reservas": v["reservas"]
-            }
-            for k, v in self.grouped_reservations.items()
-        ]
+    # Vistas derivadas del almacén. Son computed vars cacheadas con sus
+    # dependencias explícitas: sólo se recalculan (y sólo se mandan) cuando
+    # cambia alguna de ellas, y cada reserva viaja una sola vez (en reservas).
+
+    def _filas_visibles(self) -> Dict[int, Reserva]:
+        """De dónde salen las filas: los resultados de la búsqueda o el almacén maestro."""
+        return self._resultados if self.search_query.strip() else self._reservas
+
+    @rx.var(deps=["_reservas", "_resultados", "search_query", "visibles"], auto_deps=False)
+    def _ventana(self) -> List[int]:
+        """Ids visibles: la búsqueda (ya paginada desde SQL) o la ventana de la lista maestra (sólo en el backend)."""
+        if self.search_query.strip():
+            return list(self._resultados)
+        return list(islice(self._reservas, self.visibles))
+
+    @rx.var(deps=["_ventana", "_reservas", "_resultados", "_minuto"], auto_deps=False)
+    def reservas(self) -> Dict[int, FullReservation]:
+        """Las reservas de la ventana visible, por id y ya formateadas."""
+        ahora = datetime.now()
+        filas = self._filas_visibles()
+        return {i: formatear_reserva(filas[i], ahora) for i in self._ventana}
+
+    @rx.var(deps=["_ventana", "_reservas", "_resultados", "_minuto"], auto_deps=False)
+    def grupos(self) -> List[GrupoReservas]:
+        """La ventana agrupada por fecha: futuras arriba, luego una sección especial, y al final las pasadas."""
+        filas = self._filas_visibles()
+        return agrupar_ids_por_fecha(
+            [filas[i] for i in self._ventana], "id_reserva", "RESERVACIONES PASADAS"
+        )
+
+    @rx.var(deps=["_reservas", "_search_has_more", "search_query", "visibles"], auto_deps=False)
+    def hay_mas(self) -> bool:
+        """Quedan reservas (o páginas de la búsqueda) fuera de la ventana."""
+        if self.search_query.strip():
+            return self._search_has_more
+        return len(self._reservas) > self.visibles
+
+    @rx.event(background=True)
+    async def load_all_reservations(self):
+        """
+        Carga todas las reservaciones junto con los datos del usuario asociado.
+        Corre en segundo plano: la consulta no tiene el lock de la sesión.
+        """
+        async with self:
+            self._carga_actual += 1
+            generacion = self._carga_actual
+            self.cargando = True
+            clave = (self.router.session.client_token, "reservas")
+
+        def leer(cur):
+            # Versión del feed de cambios ANTES de leer, para no perder nada
+            ultimo = ultimo_cambio(cur)
+            reservas = fetch_reservations(cur)
+            # Sucursales para el filtro de exportación
+            cur.execute("SELECT nombre FROM sucursales ORDER BY nombre;")
+            return ultimo, reservas, [row[0] for row in cur.fetchall()]
 
-    
-    def load_all_reservations(self):
-        """Carga todas las reservaciones junto con los datos del usuario asociado."""
-        conn = None
         try:
-            conn = get_connection()
-            cur = conn.cursor()
-            
-            # 💡 Consulta JOIN para obtener: Reserva + Usuario + Sucursal (asumiendo que existe)
-            cur.execute("""
-                SELECT 
-                    r.id_reserva, r.cant_personas, r.fecha, r.hora, r.tipo_evento,
-                    u.nombre, u.correo, u.telefono,
-                    s.nombre as sucursal_nombre
-                FROM reserva r
-                JOIN usuarios u ON r.id_usuario = u.id_usuario
-                -- Asume que la tabla 'reserva' tiene 'id_sucursal' y 'sucursales' existe
-                LEFT JOIN sucursales s ON r.id_sucursal = s.id_sucursal 
-                ORDER BY r.fecha DESC, r.hora ASC; -- Ordenamos por fecha descendente (más próxima arriba)
-            """)
-            
-            rows = cur.fetchall()
-            reservations = []
-            now = datetime.now()
-            
-            for row in rows:
-                (id_reserva, cant_personas, res_date, res_time, tipo_evento,
-                 user_name, user_email, user_phone, sucursal) = row
-                
-                reservation_dt = datetime.combine(res_date, res_time)
-                
-                reservations.append({
-                    "id_reserva": id_reserva,
-                    "cant_personas": cant_personas,
-                    "fecha_dt": res_date, # Para ordenar/agrupar
-                    "fecha": res_date.strftime("%d/%m/%Y"), 
-                    "hora": res_time.strftime("%I:%M %p"), 
-                    "tipo_evento": tipo_evento,
-                    "sucursal": sucursal if sucursal else "No especificada",
-                    "es_pasada": reservation_dt < now,
-                    "usuario_nombre": user_name,
-                    "usuario_correo": user_email,
-                    "usuario_telefono": user_phone if user_phone else "N/A"
-                })
-            
-            self.all_reservations = reservations
-            self.group_reservations_by_date() # Agrupar al cargar
-            
+            ultimo, reservas, sucursales = await segundo_plano.consultar(clave, leer)
+        except segundo_plano.CargaCancelada:
+            async with self:
+                if self._carga_actual == generacion:
+                    self.cargando = False
+            return
         except Exception as e:
             print(f"Error cargando reservaciones de admin: {e}")
+            async with self:
+                if self._carga_actual == generacion:
+                    self.cargando = False
             return rx.toast.error(f"Error al cargar reservaciones: {str(e)}")
-            
-        finally:
-            if conn:
-                conn.close()
-
-    def group_reservations_by_date(self):
-        """Agrupa y ordena reservas por fecha, poniendo las futuras arriba, luego una sección especial, y al final las pasadas."""
-        
-        source = self.filtered_reservations
-        today = datetime.now().date()
-
-        future_or_today = []
-        past = []
 
-        for res in source:
-            if res["fecha_dt"] >= today:
-                future_or_today.append(res)
-            else:
-                past.append(res)
+        async with self:
+            self.last_change_id = ultimo
+            self._reservas = {r.id_reserva: r for r in reservas}
+            # La consulta ordenó con la fecha de hoy
+            self._dia = date.today().toordinal()
+            self._minuto = minuto_actual()
+            self.sucursales = ["Todas"] + sucursales
+            if self._carga_actual == generacion:
+                self.cargando = False
+
+    def _aplicar_delta(self, nuevas: List[Reserva], eliminados: Set[int], ultimo: Optional[int]):
+        """Parcha el almacén con las filas cambiadas (lo usan sync y leoweb/admin/live.py)."""
+        self._al_dia()
+        self._reservas = self._guardar_filas(self._reservas, nuevas, eliminados)
+        # Los resultados de la búsqueda sólo se refrescan: no se les agregan filas
+        if self._resultados:
+            self._resultados = self._guardar_filas(
+                self._resultados, [r for r in nuevas if r.id_reserva in self._resultados], eliminados
+            )
+        # En vivo (ultimo=None) la marca no avanza: el siguiente sync la pone al día
+        if ultimo is not None:
+            self.last_change_id = max(self.last_change_id, ultimo)
+
+    @staticmethod
+    def _guardar_filas(almacen: Dict[int, Reserva], nuevas: List[Reserva], eliminados: Set[int]) -> Dict[int, Reserva]:
+        """Reemplaza/agrega filas en un almacén, respetando el orden por cubetas."""
+        hoy = date.today()
+        return aplicar_cambios_por_id(
+            almacen, "id_reserva", nuevas, eliminados,
+            orden=lambda r: clave_orden(r.fecha_dt, hoy), # Igual que el ORDER BY de la consulta
+        )
 
-        def agrupar(lista):
-            grouped = defaultdict(lambda: {"header": "", "reservas": []})
-            for r in lista:
-                date_key = r["fecha_dt"].strftime("%Y-%m-%d")
+    def sync_reservations(self):
+        """Aplica sólo las reservaciones que cambiaron desde la última sincronización."""
+        conn = None
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
 
-                if r["fecha_dt"] == today:
-                    header = "HOY"
-                elif r["fecha_dt"] == today + timedelta(days=1):
-                    header = "MAÑANA"
-                else:
-                    day_name = r["fecha_dt"].strftime("%A")
-                    month_name = r["fecha_dt"].strftime("%B")
-                    day_es = DIAS_ES.get(day_name, day_name)
-                    month_es = MESES_ES.get(month_name, month_name)
-                    header = f"{day_es.upper()}, {r['fecha_dt'].day:02d} DE {month_es.upper()} DE {r['fecha_dt'].year}"
+            cambios = cambios_desde(cur, "reserva", self.last_change_id)
+            if cambios is None:
+                # El feed fue purgado: no sabemos qué cambió, recargamos todo
+                return AdminReservaState.load_all_reservations
 
-                grouped[date_key]["header"] = header
-                grouped[date_key]["reservas"].append(r)
+            modificados, eliminados, ultimo = cambios
+            if not modificados and not eliminados:
+                self.last_change_id = max(self.last_change_id, ultimo)
+                return
 
-            return grouped
+            nuevas, eliminados = leer_filas(cur, fetch_reservations, "id_reserva", modificados, eliminados)
+            self._aplicar_delta(nuevas, eliminados, ultimo)
 
-        grouped_future = agrupar(future_or_today)
-        grouped_past = agrupar(past)
+        except Exception as e:
+            print(f"Error sincronizando reservaciones de admin: {e}")
+            return rx.toast.error(f"Error al actualizar reservaciones: {str(e)}")
 
-        future_keys = sorted(grouped_future.keys()) 
-        past_keys = sorted(grouped_past.keys())
+        finally:
+            if conn:
+                conn.close()
 
-        final_ordered = {}
+    def mostrar_mas(self, visible: bool):
+        """El centinela del final de la lista entró en pantalla: siguiente ventana."""
+        if not visible or not self.hay_mas:
+            return
+        if self.search_query.strip():
+            return self.load_more_results()
+        self.visibles += ventana.VENTANA_PASO
 
-        # FUTURO
-        for k in future_keys:
-            final_ordered[k] = grouped_future[k]
+        
+    # --------------------------------------------------
+    # LÓGICA DE BÚSQUEDA Y FILTRO
+    # --------------------------------------------------
 
-        # SEPARADOR ESPECIAL
-        if len(past_keys) > 0:
-            final_ordered["__PAST_HEADER__"] = {
-                "header": "RESERVACIONES PASADAS",
-                "reservas": []
-            }
+    def set_search_query(self, query: str):
+        """Actualiza la consulta de búsqueda (ya llega con debounce) y busca en la BD."""
+        self.search_query = query
+        self.visibles = ventana.VENTANA_PASO
+        return self.run_search()
+
+    def load_more_results(self):
+        """Pide la siguiente página de resultados, después del último ya cargado."""
+        return self._buscar_pagina()
+
+    def run_search(self):
+        """Busca en la BD la primera página de reservaciones que coinciden."""
+        self._resultados = {}
+        self._search_despues = None
+        self.search_cargados = 0
+        self._search_has_more = False
+        if not self.search_query.strip():
+            return
+        return self._buscar_pagina()
+
+    def _buscar_pagina(self):
+        """Trae la siguiente página de la búsqueda (keyset sobre el orden por cubetas)."""
 
-        # PASADO
-        for k in past_keys:
-            final_ordered[k] = grouped_past[k]
+        conn = None
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
 
-        self.grouped_reservations = final_ordered
+            # Pedimos una fila extra para saber si hay más páginas
+            rows = fetch_reservations(
+                cur, search=self.search_query.strip(),
+                despues=self._search_despues, limit=SEARCH_PAGE_SIZE + 1,
+            )
+            self._search_has_more = len(rows) > SEARCH_PAGE_SIZE
+            rows = rows[:SEARCH_PAGE_SIZE]
+            if rows:
+                self._search_despues = (rows[-1].fecha_dt, rows[-1].id_reserva)
+            # Las páginas llegan en orden: se agregan al final
+            self._resultados = {**self._resultados, **{r.id_reserva: r for r in rows}}
+            self.search_cargados = len(self._resultados)
 
+        except Exception as e:
+            print(f"Error buscando reservaciones: {e}")
+            return rx.toast.error(f"Error al buscar reservaciones: {str(e)}")
+        finally:
+            if conn:
+                conn.close()
 
-        
     # --------------------------------------------------
-    # LÓGICA DE BÚSQUEDA Y FILTRO
+    # EXPORTACIÓN
     # --------------------------------------------------
 
-    def set_search_query(self, query: str):
-        """Actualiza la consulta de búsqueda y recalcula la agrupación."""
-        self.search_query = query
-        self.group_reservations_by_date() # Volvemos a agrupar con el nuevo filtro
+    def set_export_desde(self, value: str):
+        self.export_desde = value
+
+    def set_export_hasta(self, value: str):
+        self.export_hasta = value
+
+    def set_export_sucursal(self, value: str):
+        self.export_sucursal = value
+
+    async def exportar_csv(self):
+        """Crea el ticket de descarga con los filtros y manda al navegador a descargarlo."""
+        auth_state = await self.get_state(AuthState)
+        if auth_state.rol != "admin":
+            return rx.toast.error("Acceso denegado.")
+
+        sucursal = "" if self.export_sucursal == "Todas" else self.export_sucursal
+        ticket = crear_ticket("reservas", self.export_desde, self.export_hasta, sucursal)
+        return rx.download(url=f"{rx.config.get_config().api_url}/api/admin/exportar/{ticket}")
 
-    @rx.var
-    def filtered_reservations(self) -> List[FullReservation]:
-        """Filtra la lista maestra de reservas por nombre de usuario."""
-        if not self.search_query:
-            return self.all_reservations
-        
-        query = self.search_query.lower()
-        
-        return [
-            r for r in self.all_reservations 
-            if query in r["usuario_nombre"].lower()
-        ]
-        
     # --------------------------------------------------
     # LÓGICA DE ELIMINACIÓN
     # --------------------------------------------------
@@ -258,15 +462,13 @@ class AdminReservaState(rx.State):
                 cur.execute("DELETE FROM reserva WHERE id_reserva = %s;", (id_reserva,))
                 conn.commit()
                 
-                # 3. Actualizar la lista de reservaciones en el estado
-                self.all_reservations = [
-                    res for res in self.all_reservations 
-                    if res["id_reserva"] != id_reserva
+                # 3. Actualizar la lista de reservaciones en el estado (sólo lo que
+                # cambió). El sync va encadenado: si el feed se purgó, su recarga
+                # completa (o su toast de error) tiene que llegar al cliente
+                return [
+                    rx.toast.success("Reservación eliminada correctamente. 🗑️"),
+                    AdminReservaState.sync_reservations,
                 ]
-                
-                self.group_reservations_by_date() # Recalcular la vista agrupada
-                
-                return rx.toast.success("Reservación eliminada correctamente. 🗑️")
             else:
                 return rx.toast.error("Reservación no encontrada.")
 
@@ -279,6 +481,60 @@ class AdminReservaState(rx.State):
             if conn:
                 conn.close()
 
+    # --------------------------------------------------
+    # ACCIONES EN LOTE
+    # --------------------------------------------------
+
+    def toggle_selected(self, id_reserva: int):
+        """Agrega o quita una reservación de la selección."""
+        if id_reserva in self.selected_ids:
+            self.selected_ids = [i for i in self.selected_ids if i != id_reserva]
+        else:
+            self.selected_ids = self.selected_ids + [id_reserva]
+
+    def clear_selection(self):
+        self.selected_ids = []
+
+    def delete_selected(self):
+        """Elimina (cancela) todas las reservaciones seleccionadas en una sola sentencia."""
+        if not self.selected_ids:
+            return
+
+        conn = None
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+
+            # La validación de "no pasada" va dentro del mismo DELETE
+            cur.execute("""
+                DELETE FROM reserva
+                WHERE id_reserva = ANY(%s) AND (fecha + hora) >= %s
+                RETURNING id_reserva;
+            """, (self.selected_ids, datetime.now()))
+            borradas = len(cur.fetchall())
+            conn.commit()
+
+            omitidas = len(self.selected_ids) - borradas
+            self.selected_ids = []
+
+            if omitidas:
+                aviso = rx.toast.warning(f"Se eliminaron {borradas} reservaciones. {omitidas} ya habían pasado o no existían.")
+            else:
+                aviso = rx.toast.success(f"Se eliminaron {borradas} reservaciones. 🗑️")
+            return [aviso, AdminReservaState.sync_reservations] # Un solo delta para todo el lote
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            print(f"Error eliminando reservaciones en lote: {e}")
+            return rx.toast.error(f"Error al eliminar reservaciones: {str(e)}")
+        finally:
+            if conn:
+                conn.close()
+
+# Los cambios de `reserva` llegan en vivo a esta página (ver live.py)
+live.registrar_tabla("reserva", AdminReservaState, fetch_reservations, "id_reserva")
+
 # --- COMPONENTES DE LA UI ---
 
 def search_bar():
@@ -287,9 +543,10 @@ def search_bar():
         rx.hstack(
             rx.icon("search", size=16, color="#666", margin_left="10px"),
             rx.input(
-                placeholder="Buscar por nombre de usuario...",
+                placeholder="Buscar por nombre, correo, teléfono o tipo...",
                 value=AdminReservaState.search_query,
                 on_change=AdminReservaState.set_search_query,
+                debounce_timeout=300, # Sólo busca cuando el admin deja de teclear
                 width="100%",
                 background="transparent",
                 color="white",
@@ -310,12 +567,91 @@ def search_bar():
         margin_top="30px"
     )
 
+def export_bar():
+    """Filtros (fechas y sucursal) y botón para exportar las reservaciones a CSV."""
+    date_style = dict(
+        type="date",
+        size="2",
+        background="#1a1a1c",
+        color="white",
+        border="1px solid rgba(255,255,255,0.1)",
+        style={"color-scheme": "dark"},
+    )
+    return rx.hstack(
+        rx.text("Desde", color="gray", font_size="sm"),
+        rx.input(value=AdminReservaState.export_desde, on_change=AdminReservaState.set_export_desde, **date_style),
+        rx.text("Hasta", color="gray", font_size="sm"),
+        rx.input(value=AdminReservaState.export_hasta, on_change=AdminReservaState.set_export_hasta, **date_style),
+        rx.select(
+            AdminReservaState.sucursales,
+            value=AdminReservaState.export_sucursal,
+            on_change=AdminReservaState.set_export_sucursal,
+            size="2",
+        ),
+        rx.button(
+            rx.icon("download", size=16),
+            "Exportar CSV",
+            on_click=AdminReservaState.exportar_csv,
+            variant="soft",
+            color_scheme="gray",
+            cursor="pointer",
+        ),
+        spacing="3",
+        align_items="center",
+        justify="end",
+        width="100%",
+        margin_bottom="10px",
+    )
+
+def bulk_action_bar():
+    """Barra visible sólo cuando hay reservaciones seleccionadas."""
+    return rx.cond(
+        AdminReservaState.selected_ids.length() > 0,
+        rx.hstack(
+            rx.text(
+                f"{AdminReservaState.selected_ids.length()} seleccionadas",
+                color="white",
+                font_weight="bold",
+            ),
+            rx.spacer(),
+            rx.button(
+                "Limpiar selección",
+                on_click=AdminReservaState.clear_selection,
+                variant="soft",
+                color_scheme="gray",
+                cursor="pointer",
+            ),
+            rx.button(
+                rx.icon(tag="trash"),
+                "Eliminar seleccionadas",
+                on_click=AdminReservaState.delete_selected,
+                color_scheme="red",
+                cursor="pointer",
+            ),
+            width="100%",
+            align_items="center",
+            padding="12px",
+            background="#1a1a1c",
+            border="1px solid rgba(255,0,0,0.3)",
+            border_radius="10px",
+            margin_bottom="10px",
+        ),
+    )
+
 def reservation_card(reserva: FullReservation):
     """Muestra una sola reservación con la información de usuario completa."""
     is_disabled = reserva["es_pasada"]
     
     return rx.box(
         rx.hstack(
+            # SELECCIÓN PARA ACCIONES EN LOTE
+            rx.checkbox(
+                checked=AdminReservaState.selected_ids.contains(reserva["id_reserva"]),
+                on_change=lambda _: AdminReservaState.toggle_selected(reserva["id_reserva"]),
+                disabled=is_disabled,
+                color_scheme="red",
+            ),
+
             # INFORMACIÓN DE RESERVA Y USUARIO
             rx.vstack(
                 # Reserva (Hora, Personas, Tipo, Sucursal)
@@ -370,22 +706,23 @@ def reservation_card(reserva: FullReservation):
         _hover={
             "background": rx.cond(is_disabled, "#141414", "#222224")
         },
+        # No pintar las tarjetas fuera de pantalla
+        style=ventana.FUERA_DE_PANTALLA,
     )
 
 def reservations_by_day():
     return rx.vstack(
         rx.foreach(
-            AdminReservaState.grouped_reservations.items(),
-            lambda item: (
-                # item = (key, group)
+            AdminReservaState.grupos,
+            lambda grupo: (
                 rx.cond(
-                    item[0] == "__PAST_HEADER__",
+                    grupo["clave"] == PAST_HEADER_KEY,
 
                     # Separador de reservaciones pasadas
                     rx.vstack(
                         rx.box(
                             rx.text(
-                                item[1]["header"],
+                                grupo["header"],
                                 font_size="1.2rem",
                                 color="white",
                                 font_weight="bold",
@@ -403,7 +740,7 @@ def reservations_by_day():
                     # Bloque normal: encabezado + tarjetas
                     rx.vstack(
                         rx.heading(
-                            item[1]["header"],
+                            grupo["header"],
                             size="4",
                             color="red",
                             margin_top="30px",
@@ -413,11 +750,11 @@ def reservations_by_day():
                         ),
 
                         rx.cond(
-                            item[1]["reservas"].length() > 0,
+                            grupo["ids"].length() > 0,
                             rx.vstack(
                                 rx.foreach(
-                                    item[1]["reservas"],
-                                    lambda res: reservation_card(res)
+                                    grupo["ids"].to(List[int]),
+                                    lambda id_reserva: reservation_card(AdminReservaState.reservas[id_reserva])
                                 ),
                                 spacing="4",
                                 width="100%",
@@ -456,8 +793,25 @@ def adm_reservas_page():
                     margin_bottom="10px",
                 ),
                 
+                # Exportación
+                export_bar(),
+
+                # Acciones en lote
+                bulk_action_bar(),
+
                 # Contenido principal: Reservaciones Agrupadas
-                reservations_by_day(),
+                rx.cond(
+                    AdminReservaState.cargando & (AdminReservaState.grupos.length() == 0),
+                    segundo_plano.esqueleto_tarjetas(),
+                    reservations_by_day(),
+                ),
+
+                # Siguiente ventana (o página de la búsqueda) al llegar al final
+                ventana.centinela(
+                    AdminReservaState.hay_mas,
+                    AdminReservaState.mostrar_mas,
+                    AdminReservaState.visibles + AdminReservaState.search_cargados,
+                ),
                 
                 align_items="stretch",
                 width="100%",
@@ -475,5 +829,6 @@ def adm_reservas_page():
         
         width="100%",
         min_height="100vh",
-        background="#0d0d0f"
+        background="#0d0d0f",
+        on_unmount=AdminReservaState.al_salir,
     )
\ No newline at end of file
@@ -0,0 +1,118 @@
+# leoweb/admin/segundo_plano.py
+# Cargas largas del admin fuera del lock de la sesión.
+#
+# Un handler normal tiene el lock del state de su sesión mientras corre: si la
+# consulta tarda, la pestaña se congela y cualquier otro evento espera detrás.
+# Las cargas grandes son background events que sólo toman el lock para
+# escribir el resultado:
+#
+#     @rx.event(background=True)
+#     async def load_all_events(self):
+#         async with self:
+#             self._carga_actual += 1
+#             generacion = self._carga_actual
+#             self.cargando = True
+#             clave = (self.router.session.client_token, "eventos")
+#         eventos = await segundo_plano.consultar(clave, fetch_events)
+#         async with self:
+#             self._all_events = eventos
+#             if self._carga_actual == generacion:
+#                 self.cargando = False
+#
+# La consulta corre en un hilo (no bloquea el event loop) con su propia
+# conexión. cancelar(clave) la corta en PostgreSQL; se llama al salir de la
+# página (on_unmount) y al empezar otra carga con la misma clave. La carga
+# cancelada termina con CargaCancelada mientras la nueva sigue corriendo: por
+# eso sólo la carga vigente (la última generación) apaga `cargando`.
+import asyncio
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+import psycopg2
+import reflex as rx
+from psycopg2.extensions import QueryCanceledError
+
+from ..auth_state import get_connection
+
+T = TypeVar("T")
+
+class _Carga:
+    """Una carga en curso: su conexión (cuando ya la tiene) y si la cancelaron."""
+    __slots__ = ("conn", "cancelada")
+
+    def __init__(self):
+        self.conn: Optional[Any] = None
+        self.cancelada = False
+
+
+# (client_token, nombre de la carga) -> carga en curso. Se registra antes de
+# abrir la conexión, así un cancelar() que llegue mientras conecta no se pierde.
+_activas: Dict[Tuple[str, str], _Carga] = {}
+
+
+class CargaCancelada(Exception):
+    """La carga se canceló (navegación o una carga más nueva con la misma clave)."""
+
+
+def _correr(clave: Tuple[str, str], carga: _Carga, funcion: Callable[[Any], T]) -> T:
+    conn = None
+    try:
+        conn = carga.conn = get_connection()
+        # Cancelada mientras conectaba (cancelar() no tenía conexión que cortar)
+        if carga.cancelada:
+            raise CargaCancelada()
+        resultado = funcion(conn.cursor())
+    except QueryCanceledError as e:
+        raise CargaCancelada() from e
+    finally:
+        if _activas.get(clave) is carga:
+            del _activas[clave]
+        if conn:
+            conn.close()
+    # Cancelada entre consultas: el resultado ya no sirve
+    if carga.cancelada:
+        raise CargaCancelada()
+    return resultado
+
+
+async def consultar(clave: Tuple[str, str], funcion: Callable[[Any], T]) -> T:
+    """
+    Corre `funcion(cur)` en un hilo con una conexión propia y regresa su
+    resultado. Una carga nueva con la misma clave cancela la anterior.
+    """
+    cancelar(clave)
+    carga = _activas[clave] = _Carga()
+    return await asyncio.to_thread(_correr, clave, carga, funcion)
+
+
+def cancelar(clave: Tuple[str, str]):
+    """Cancela la carga en curso con esa clave (si hay)."""
+    carga = _activas.pop(clave, None)
+    if carga is None:
+        return
+    carga.cancelada = True
+    if carga.conn is not None:
+        try:
+            carga.conn.cancel()
+        except psycopg2.Error:
+            pass
+
+
+# --------------------------------------------------
+# UI: ESQUELETO MIENTRAS CARGA
+# --------------------------------------------------
+def esqueleto_tarjetas(cantidad: int = 3) -> rx.Component:
+    """Encabezado y tarjetas de relleno para mostrar mientras llega la primera carga."""
+    return rx.vstack(
+        rx.skeleton(rx.box(height="28px", width="240px"), loading=True),
+        *[
+            rx.skeleton(
+                rx.box(height="140px", width="100%"),
+                loading=True,
+                width="100%",
+            )
+            for _ in range(cantidad)
+        ],
+        spacing="4",
+        width="100%",
+        margin_top="20px",
+    )
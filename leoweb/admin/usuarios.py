@@ -1,13 +1,28 @@
 import reflex as rx
-from typing import List, Dict, Any, TypedDict, Optional
-from ..auth_state import AuthState, get_connection
+import dataclasses
+from typing import List, Dict, Any, TypedDict, Optional, Tuple
+from ..auth_state import get_connection
 from .adminsidebar import admin_sidebar, admin_sidebar_button
 from .aui_state import AUIState
+from .acceso import admin_requerido
+from . import bus, lectura, ventana
+from .purga import eliminar_usuario
 
 # =========================================================
 # ==================== DEFINICIÓN DE TIPOS ================
 # =========================================================
 
+# Fila compacta de las páginas cargadas (sin __dict__ por fila)
+@dataclasses.dataclass(slots=True)
+class Usuario:
+    id_usuario: int
+    nombre: str
+    correo: str
+    telefono: Optional[str]
+    total_reservas: int
+    total_eventos: int
+
+# El usuario como lo ve la UI
 class UserDict(TypedDict):
     id_usuario: int
     nombre: str
@@ -16,67 +31,142 @@ class UserDict(TypedDict):
     total_reservas: int
     total_eventos: int
 
+def formatear_usuario(u: Usuario) -> UserDict:
+    """Arma el usuario para la tarjeta."""
+    return {
+        "id_usuario": u.id_usuario,
+        "nombre": u.nombre,
+        "correo": u.correo,
+        "telefono": u.telefono if u.telefono else "Sin teléfono",
+        "total_reservas": u.total_reservas,
+        "total_eventos": u.total_eventos,
+    }
+
+# =========================================================
+# ==================== CONSULTAS ==========================
+# =========================================================
+
+# Usuarios por página (paginación por llave: nombre, id_usuario)
+USERS_PAGE_SIZE = 50
+
+# Primero se elige la página de usuarios (índice idx_usuarios_rol_nombre) y
+# sólo para esos ids se cuentan reservas y eventos con GROUP BY, en lugar de
+# dos COUNT(*) correlacionados por cada usuario de la tabla.
+USERS_QUERY = """
+    WITH pagina AS (
+        SELECT u.id_usuario, u.nombre, u.correo, u.telefono
+        FROM usuarios u
+        WHERE u.rol = 'usuario'
+          AND u.eliminado_en IS NULL
+        {where}
+        ORDER BY u.nombre, u.id_usuario
+        LIMIT %s
+    )
+    SELECT
+        p.id_usuario,
+        p.nombre,
+        p.correo,
+        p.telefono,
+        COALESCE(r.total, 0) AS total_reservas,
+        COALESCE(e.total, 0) AS total_eventos
+    FROM pagina p
+    LEFT JOIN (
+        SELECT id_usuario, COUNT(*) AS total
+        FROM reserva
+        WHERE id_usuario IN (SELECT id_usuario FROM pagina)
+        GROUP BY id_usuario
+    ) r ON r.id_usuario = p.id_usuario
+    LEFT JOIN (
+        SELECT id_usuario, COUNT(*) AS total
+        FROM eventos
+        WHERE id_usuario IN (SELECT id_usuario FROM pagina)
+        GROUP BY id_usuario
+    ) e ON e.id_usuario = p.id_usuario
+    ORDER BY p.nombre, p.id_usuario;
+"""
+
+# Servida por los índices trigram de nombre/correo (ver leoweb/schema.py)
+USERS_SEARCH_WHERE = "AND (u.nombre ILIKE %s OR u.correo ILIKE %s)"
+# Continúa después del último usuario de la página anterior
+USERS_KEYSET_WHERE = "AND (u.nombre, u.id_usuario) > (%s, %s)"
+
+def fetch_users(cur, search: str = "", despues: Optional[Tuple[str, int]] = None, limit: int = USERS_PAGE_SIZE) -> List[Usuario]:
+    """Trae una página de usuarios (opcionalmente filtrada) a partir de `despues`."""
+    condiciones, params = [], []
+    if search:
+        # Escapar los comodines de LIKE que vengan en el texto
+        texto = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        condiciones.append(USERS_SEARCH_WHERE)
+        params += [f"%{texto}%"] * 2
+    if despues is not None:
+        condiciones.append(USERS_KEYSET_WHERE)
+        params += list(despues)
+    params.append(limit)
+
+    query = USERS_QUERY.format(where=" ".join(condiciones))
+
+    # Página acotada por LIMIT: consulta normal, sin cursor del lado del servidor
+    # Las columnas de USERS_QUERY vienen en el orden de los campos de Usuario
+    return [Usuario(*fila) for fila in lectura.filas(cur, query, params, servidor=False)]
+
 # =========================================================
 # ==================== STATE DE USUARIOS ==================
 # =========================================================
 
 class AdminUsuarioState(rx.State):
     search_query: str = ""
-    all_users: List[UserDict] = [] # Lista maestra
+    _usuarios: List[Usuario] = [] # Páginas cargadas hasta ahora (backend-only)
+    has_more: bool = False
 
     # --- VARIABLES PARA EL MODAL DE CONFIRMACIÓN ---
     show_confirm_modal: bool = False
     user_to_delete_id: int = -1
     user_to_delete_name: str = ""
 
+    @rx.var(deps=["_usuarios"], auto_deps=False)
+    def users(self) -> List[UserDict]:
+        """Las páginas cargadas, formateadas para las tarjetas."""
+        return [formatear_usuario(u) for u in self._usuarios]
+
     # --------------------------------------------------
     # CICLO DE VIDA Y SEGURIDAD
     # --------------------------------------------------
-    async def on_load(self):
-        auth_state = await self.get_state(AuthState)
-        if not auth_state.logged_in:
-            return rx.redirect("/login")
-        if auth_state.rol != "admin":
-            return [rx.toast.error("Acceso denegado."), rx.redirect("/")]
-        
+    @admin_requerido
+    def on_load(self):
         return self.load_users()
 
     # --------------------------------------------------
-    # CARGA DE DATOS
+    # CARGA DE DATOS (paginada)
     # --------------------------------------------------
     def load_users(self):
+        """Carga la primera página (respetando la búsqueda actual)."""
+        self._usuarios = []
+        return self._cargar_pagina()
+
+    def load_more_users(self):
+        """Agrega la siguiente página a la lista."""
+        return self._cargar_pagina()
+
+    def mostrar_mas(self, visible: bool):
+        """El centinela del final de la lista entró en pantalla: siguiente página."""
+        if visible and self.has_more:
+            return self._cargar_pagina()
+
+    def _cargar_pagina(self):
         conn = None
         try:
             conn = get_connection()
             cur = conn.cursor()
 
-            query = """
-                SELECT 
-                    u.id_usuario, 
-                    u.nombre, 
-                    u.correo, 
-                    u.telefono,
-                    (SELECT COUNT(*) FROM reserva r WHERE r.id_usuario = u.id_usuario) as total_reservas,
-                    (SELECT COUNT(*) FROM eventos e WHERE e.id_usuario = u.id_usuario) as total_eventos
-                FROM usuarios u
-                WHERE u.rol = 'usuario'
-                ORDER BY u.nombre ASC;
-            """
-            cur.execute(query)
-            rows = cur.fetchall()
-
-            users_formatted = []
-            for row in rows:
-                users_formatted.append({
-                    "id_usuario": row[0],
-                    "nombre": row[1],
-                    "correo": row[2],
-                    "telefono": row[3] if row[3] else "Sin teléfono",
-                    "total_reservas": row[4],
-                    "total_eventos": row[5]
-                })
-
-            self.all_users = users_formatted
+            despues = None
+            if self._usuarios:
+                ultimo = self._usuarios[-1]
+                despues = (ultimo.nombre, ultimo.id_usuario)
+
+            # Se pide uno de más para saber si hay otra página
+            pagina = fetch_users(cur, self.search_query.strip(), despues, USERS_PAGE_SIZE + 1)
+            self.has_more = len(pagina) > USERS_PAGE_SIZE
+            self._usuarios = self._usuarios + pagina[:USERS_PAGE_SIZE]
 
         except Exception as e:
             print(f"Error cargando usuarios: {e}")
@@ -85,21 +175,11 @@ class AdminUsuarioState(rx.State):
             if conn: conn.close()
 
     # --------------------------------------------------
-    # BÚSQUEDA
+    # BÚSQUEDA (en la BD, ya llega con debounce)
     # --------------------------------------------------
     def set_search(self, value: str):
         self.search_query = value
-
-    @rx.var
-    def filtered_users(self) -> List[UserDict]:
-        if not self.search_query:
-            return self.all_users
-        
-        q = self.search_query.lower()
-        return [
-            u for u in self.all_users 
-            if q in u["nombre"].lower() or q in u["correo"].lower()
-        ]
+        return self.load_users()
 
     # --------------------------------------------------
     # GESTIÓN DEL MODAL DE ELIMINACIÓN
@@ -126,31 +206,24 @@ class AdminUsuarioState(rx.State):
             
             id_usuario = self.user_to_delete_id
 
-            # 1. Borrar items de menú de eventos del usuario
-            cur.execute("SELECT id_evento FROM eventos WHERE id_usuario = %s", (id_usuario,))
-            eventos_ids = [row[0] for row in cur.fetchall()]
-            
-            if eventos_ids:
-                ids_tuple = tuple(eventos_ids)
-                # Sintaxis SQL segura para tuplas en IN
-                cur.execute(f"DELETE FROM menu_evento WHERE id_evento IN {ids_tuple}")
-
-            # 2. Eliminar eventos
-            cur.execute("DELETE FROM eventos WHERE id_usuario = %s", (id_usuario,))
-
-            # 3. Eliminar reservaciones
-            cur.execute("DELETE FROM reserva WHERE id_usuario = %s", (id_usuario,))
+            # Borra usuario, eventos (con su menú) y reservaciones en una sola
+            # sentencia; las cuentas muy grandes sólo se marcan y las termina
+            # de borrar la purga en segundo plano (ver purga.py)
+            diferido = eliminar_usuario(cur, id_usuario)
 
-            # 4. Eliminar usuario
-            cur.execute("DELETE FROM usuarios WHERE id_usuario = %s", (id_usuario,))
+            # Avisar a todos los workers (se entrega con el commit)
+            bus.publicar(cur, "dashboard") # Los conteos del dashboard cambiaron
+            bus.publicar(cur, "roles", id_usuario) # Cerrar el acceso de sus sesiones abiertas
             
             conn.commit()
 
             # Actualizar lista localmente
-            self.all_users = [u for u in self.all_users if u["id_usuario"] != id_usuario]
+            self._usuarios = [u for u in self._usuarios if u.id_usuario != id_usuario]
             
             # Cerrar modal
             self.cancel_delete()
+            if diferido:
+                return rx.toast.success("Usuario eliminado. Sus datos se terminarán de borrar en segundo plano.")
             return rx.toast.success("Usuario eliminado correctamente.")
 
         except Exception as e:
@@ -173,6 +246,7 @@ def search_bar_usuarios():
                 placeholder="Buscar usuario por nombre o correo...",
                 value=AdminUsuarioState.search_query,
                 on_change=AdminUsuarioState.set_search,
+                debounce_timeout=300,
                 width="100%",
                 background="transparent",
                 color="white",
@@ -277,18 +351,26 @@ def user_card(user: UserDict):
         border_radius="12px",
         border="1px solid rgba(255,255,255,0.05)",
         width="100%",
-        _hover={"border_color": "rgba(255,255,255,0.2)"}
+        _hover={"border_color": "rgba(255,255,255,0.2)"},
+        # No pintar las tarjetas fuera de pantalla
+        style=ventana.FUERA_DE_PANTALLA,
     )
 
 def users_grid():
     return rx.vstack(
         rx.cond(
-            AdminUsuarioState.filtered_users.length() > 0,
+            AdminUsuarioState.users.length() > 0,
             rx.vstack(
                 rx.foreach(
-                    AdminUsuarioState.filtered_users,
+                    AdminUsuarioState.users,
                     user_card
                 ),
+                # Siguiente página al llegar al final
+                ventana.centinela(
+                    AdminUsuarioState.has_more,
+                    AdminUsuarioState.mostrar_mas,
+                    AdminUsuarioState.users.length(),
+                ),
                 width="100%",
                 spacing="4"
             ),
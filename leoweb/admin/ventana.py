@@ -0,0 +1,61 @@
+# leoweb/admin/ventana.py
+# Listas largas del admin por ventanas (scroll infinito).
+#
+# Al navegador sólo se manda, y sólo se pinta, una ventana de la lista: las
+# primeras VENTANA_PASO tarjetas. Al final va un centinela que, cuando entra
+# en pantalla, le pide al backend la siguiente ventana. Así el primer render y
+# la memoria del navegador no crecen con la tabla.
+#
+# El centinela usa <InView> de react-intersection-observer (EnVista): es una
+# dependencia npm del frontend, fijada en 9.13.1, que Reflex instala solo al
+# compilar (no va en requirements.txt).
+#
+# Además, las tarjetas llevan FUERA_DE_PANTALLA (`content-visibility: auto`):
+# el navegador no calcula layout ni pinta las que ya quedaron fuera de vista.
+#
+#     ventana.centinela(State.hay_mas, State.mostrar_mas, State.visibles)
+#
+#     def mostrar_mas(self, visible: bool):
+#         if visible:
+#             self.visibles += ventana.VENTANA_PASO
+import reflex as rx
+from reflex.event import passthrough_event_spec
+
+# Tarjetas por ventana
+VENTANA_PASO = 30
+
+# Estilo para cada tarjeta de las listas largas (la altura es una estimación
+# para reservar espacio mientras no se ha pintado)
+FUERA_DE_PANTALLA = {
+    "content_visibility": "auto",
+    "contain_intrinsic_size": "auto 180px",
+}
+
+
+class EnVista(rx.Component):
+    """<InView> de react-intersection-observer: avisa al entrar/salir de pantalla."""
+
+    library = "react-intersection-observer@9.13.1"
+    tag = "InView"
+
+    # Margen alrededor de la pantalla para pedir la ventana antes de llegar al final
+    root_margin: rx.Var[str]
+
+    on_change: rx.EventHandler[passthrough_event_spec(bool)]
+
+
+def centinela(hay_mas, cargar_mas, version) -> rx.Component:
+    """
+    Marcador al final de la lista: llama a `cargar_mas(visible)` al verse.
+    `version` (p. ej. cuántas filas hay visibles) lo re-monta tras cada ventana,
+    para que vuelva a avisar si sigue en pantalla.
+    """
+    return rx.cond(
+        hay_mas,
+        EnVista.create(
+            rx.center(rx.spinner(size="3"), width="100%", padding="20px"),
+            root_margin="600px",
+            on_change=cargar_mas,
+            key=version,
+        ),
+    )
@@ -1,8 +1,9 @@
 import reflex as rx
 import psycopg2
-# 🟢 Añadir la importación del hash
-from passlib.hash import pbkdf2_sha256 # <-- AGREGAR ESTA LÍNEA
 from typing import ClassVar
+# 🟢 El hash de contraseñas corre en un pool aparte (ver hashing.py)
+from .hashing import HashSaturado, hash_password, verify_password
+from .throttle import permitir_login
 
 def get_connection():
     return psycopg2.connect(
@@ -13,62 +14,76 @@ def get_connection():
         port="5432"
     )
 
+def cuenta_activa(cur, id_usuario) -> bool:
+    """
+    True si la cuenta existe y no está eliminada (pendiente de purga). Toma un
+    FOR SHARE sobre el usuario: dentro de la transacción de quien escribe, la
+    cuenta no se puede marcar como eliminada hasta que termine.
+    """
+    cur.execute(
+        "SELECT 1 FROM usuarios WHERE id_usuario = %s AND eliminado_en IS NULL FOR SHARE;",
+        (id_usuario,),
+    )
+    return cur.fetchone() is not None
+
+# Identidad de la sesión. Es lo único que cargan las páginas (y la guardia del
+# admin) con get_state(AuthState), así que se mantiene mínima y sin substates:
+# cargar un state también carga sus substates, por eso los formularios viven en
+# LoginState y RegisterState, hermanos bajo rx.State que sólo se cargan cuando
+# se envía su formulario (y ellos piden AuthState para iniciar la sesión).
 class AuthState(rx.State):
-    email: str = ""
-    password: str = ""
-
-    # 🟢 Variables para el Registro
-    register_name: str = ""
-    register_phone: str = ""
-    register_email: str = ""
-    register_password: str = ""
-    register_confirm_password: str = ""
-
-    # Variables de Sesión
-    error: str = ""
     logged_in: bool = False
     current_user: int | None = None
     rol: str = ""
 
-    # 🟢 Setters para Registro (NUEVOS)
-    def set_register_name(self, value: str):
-        self.register_name = value
+    def logout(self):
+        self.logged_in = False
+        self.current_user = None
+        self.rol = ""
 
-    def set_register_phone(self, value: str):
-        self.register_phone = value
+        # Redirección sin return
+        return rx.redirect("/login")
 
-    def set_register_email(self, value: str):
-        self.register_email = value
 
-    def set_register_password(self, value: str):
-        self.register_password = value
+# ----------------------------------------------------
+# 🟢 FORMULARIO DE REGISTRO
+# ----------------------------------------------------
+class RegisterState(rx.State):
+    # Formulario no controlado: los inputs no mandan nada mientras se escribe,
+    # todos los campos llegan juntos en `register` al enviar.
 
-    def set_register_confirm_password(self, value: str):
-        self.register_confirm_password = value
-    
     # ----------------------------------------------------
     # 🟢 FUNCIÓN DE REGISTRO (NUEVA)
     # ----------------------------------------------------
-    def register(self):
+    async def register(self, form_data: dict):
+        nombre = form_data.get("register_name", "").strip()
+        correo = form_data.get("register_email", "").strip()
+        telefono = form_data.get("register_phone", "").strip()
+        password = form_data.get("register_password", "")
+        confirmacion = form_data.get("register_confirm_password", "")
+
         # 1. Validación de campos
-        if not all([self.register_name, self.register_email, self.register_phone, self.register_password, self.register_confirm_password]):
+        if not all([nombre, correo, telefono, password, confirmacion]):
             return rx.toast.error("Todos los campos son obligatorios.")
 
-        if self.register_password != self.register_confirm_password:
+        if "@" not in correo:
+            return rx.toast.error("El correo no es válido.")
+
+        if password != confirmacion:
             return rx.toast.error("Las contraseñas no coinciden.")
         
-        # 2. Hashing de contraseña
-        hashed_password = pbkdf2_sha256.hash(self.register_password)
-        
         conn = None
         try:
             conn = get_connection()
             cur = conn.cursor()
 
             # 3. Verificar si el correo ya existe
-            cur.execute("SELECT id_usuario FROM usuarios WHERE correo = %s", (self.register_email,))
+            cur.execute("SELECT id_usuario FROM usuarios WHERE correo = %s", (correo,))
             if cur.fetchone():
                 return rx.toast.error("Este correo ya está registrado.")
+
+            # Hashing de contraseña (sólo si de verdad se va a registrar)
+            hashed_password = await hash_password(password)
             
             # 4. Inserción del nuevo usuario
             insert_query = """
@@ -77,39 +92,53 @@ class AuthState(rx.State):
                 RETURNING id_usuario;
             """
             # El rol siempre será 'usuario' para esta pantalla
-            cur.execute(insert_query, (self.register_name, self.register_email, self.register_phone, "usuario", hashed_password))
+            cur.execute(insert_query, (nombre, correo, telefono, "usuario", hashed_password))
             
             new_user_id = cur.fetchone()[0]
             conn.commit()
 
             # 5. Iniciar Sesión automáticamente
-            self.logged_in = True
-            self.current_user = new_user_id
-            self.rol = "usuario"
+            auth_state = await self.get_state(AuthState)
+            auth_state.logged_in = True
+            auth_state.current_user = new_user_id
+            auth_state.rol = "usuario"
             
-            # 6. Limpiar campos de registro
-            self.register_name = ""
-            self.register_phone = ""
-            self.register_email = ""
-            self.register_password = ""
-            self.register_confirm_password = ""
-            
-            rx.toast.success("Registro exitoso. ¡Bienvenido!")
-            
-            # 7. Redirigir a la página principal
-            return rx.redirect("/")
-
+            # 6. Avisar y redirigir a la página principal
+            return [
+                rx.toast.success("Registro exitoso. ¡Bienvenido!"),
+                rx.redirect("/"),
+            ]
+
+        except HashSaturado:
+            return rx.toast.error("El servidor está ocupado, intenta de nuevo en unos segundos.")
         except Exception as e:
             if conn:
                 conn.rollback()
-            self.error = f"Error: {str(e)}"
             return rx.toast.error(f"Error de base de datos al registrar: {str(e)}")
 
         finally:
             if conn:
                 conn.close()
 
-    def login(self):
+
+# ----------------------------------------------------
+# 🟢 FORMULARIO DE LOGIN
+# ----------------------------------------------------
+class LoginState(rx.State):
+    # Formulario no controlado: correo y contraseña llegan sólo al enviar y la
+    # contraseña nunca se guarda en el state.
+
+    async def login(self, form_data: dict):
+        email = form_data.get("email", "").strip()
+        password = form_data.get("password", "")
+        if not email or not password:
+            return rx.toast.error("Escribe tu correo y tu contraseña.")
+
+        # Rechazar los excesos antes de gastar en la BD o en el hash
+        if not await permitir_login(email, self.router.session.client_ip):
+            return rx.toast.error("Demasiados intentos. Espera un momento antes de volver a intentar.")
+
+        conn = None
         try:
             conn = get_connection()
             cur = conn.cursor()
@@ -118,8 +147,9 @@ class AuthState(rx.State):
                 SELECT id_usuario, rol, contrasena 
                 FROM usuarios 
                 WHERE correo = %s
+                  AND eliminado_en IS NULL -- Cuentas eliminadas pendientes de purga
             """
-            cur.execute(query, (self.email,))
+            cur.execute(query, (email,))
             result = cur.fetchone()
 
             if not result:
@@ -128,14 +158,21 @@ class AuthState(rx.State):
 
             user_id, rol, stored_password = result
 
-            if not pbkdf2_sha256.verify(self.password, stored_password):
+            correcta, nuevo_hash = await verify_password(password, stored_password)
+            if not correcta:
                 return rx.toast.error("Contraseña incorrecta")
+
+            # Hash con iteraciones viejas: se reemplaza de forma transparente
+            if nuevo_hash:
+                cur.execute("UPDATE usuarios SET contrasena = %s WHERE id_usuario = %s;", (nuevo_hash, user_id))
+                conn.commit()
                 
             
-            # Guardar sesión
-            self.logged_in = True
-            self.current_user = user_id
-            self.rol = rol
+            # Guardar sesión (en AuthState)
+            auth_state = await self.get_state(AuthState)
+            auth_state.logged_in = True
+            auth_state.current_user = user_id
+            auth_state.rol = rol
 
             # ESTO ES IMPORTANTE:
             # ---- RETURN -------
@@ -144,19 +181,12 @@ class AuthState(rx.State):
             else:
                 return rx.redirect("/dashboard")
 
+        except HashSaturado:
+            return rx.toast.error("El servidor está ocupado, intenta de nuevo en unos segundos.")
         except Exception as e:
-            self.error = f"Error: {str(e)}"
             # 🟢 MOSTRAR EL ERROR DE LA DB AL USUARIO
             return rx.toast.error(f"Error de conexión o consulta: {str(e)}")
 
         finally:
-            conn.close()
-
-
-    def logout(self):
-        self.logged_in = False
-        self.current_user = None
-        self.rol = ""
-
-        # Redirección sin return
-        return rx.redirect("/login")
+            if conn:
+                conn.close()
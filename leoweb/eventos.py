@@ -1,9 +1,13 @@
 import reflex as rx
-from .auth_state import AuthState, get_connection
+from .auth_state import AuthState, cuenta_activa, get_connection
 from .sidebar import sidebar, sidebar_button
-from .ui_state import UIState
+from .ui_state import UIState, alternar
+from reflex.experimental.client_state import ClientStateVar
 import datetime
 
+# Modal "Arma tu menú": se abre/cierra en el navegador, sin ir al backend
+menu_modal = ClientStateVar.create("menu_modal_open", default=False)
+
 # --------------------------------------------------------
 # OBTENER PRODUCTOS DESDE BD
 # --------------------------------------------------------
@@ -44,12 +48,10 @@ def fetch_products():
 class EventState(rx.State):
     products: list[dict] = []
 
-    fecha: str = ""
-    hora: str = ""
-    ubicacion: str = ""
-    cant_personas: int = 1
+    # Fecha, hora, ubicación y personas son inputs no controlados: llegan juntos
+    # en submit_event. Esto se incrementa para re-montar (limpiar) el formulario.
+    form_version: int = 0
 
-    menu_modal_open: bool = False
     productos_seleccionados: list[dict] = []
     total: float = 0.0
 
@@ -137,33 +139,9 @@ class EventState(rx.State):
         """Devuelve la fecha actual en formato YYYY-MM-DD para bloquear el calendario."""
         return datetime.date.today().strftime("%Y-%m-%d")
 
-    # ---------------------------------------
-    # SETTERS
-    # ---------------------------------------
-    def set_fecha(self, v):
-        self.fecha = v
-
-    def set_hora(self, v):
-        self.hora = v
-
-    def set_ubicacion(self, v):
-        self.ubicacion = v
-
-    def set_cant_personas(self, v):
-        try:
-            n = int(v) if v else 1
-            if n < 1:
-                n = 1
-            self.cant_personas = n
-        except:
-            self.cant_personas = 1
-
     # ---------------------------------------
     # MENÚ
     # ---------------------------------------
-    def toggle_menu_modal(self):
-        self.menu_modal_open = not self.menu_modal_open
-
     def add_producto(self, pid, name, price):
         for p in self.productos_seleccionados:
             if p["id"] == pid:
@@ -218,8 +196,10 @@ class EventState(rx.State):
                         "precio": l["precio"]
                     })
 
-        self.menu_modal_open = False
-        rx.toast.success("Menú guardado!")
+        return [
+            menu_modal.push(False),
+            rx.toast.success("Menú guardado!"),
+        ]
 
     @rx.var
     def lineas_subtotales(self) -> list[str]:
@@ -235,31 +215,43 @@ class EventState(rx.State):
     # ---------------------------------------
     # BD: Guardar Evento
     # ---------------------------------------
-    def submit_event(self, current_user):
+    async def submit_event(self, form_data: dict):
+        # El usuario sale de la sesión, no del cliente
+        auth_state = await self.get_state(AuthState)
+        current_user = auth_state.current_user
+
          # ⚠ Validar usuario
         if not current_user:
             return rx.toast.error("Debes iniciar sesión.", position="bottom-right")
 
+        fecha = form_data.get("fecha", "")
+        hora = form_data.get("hora", "")
+        ubicacion = form_data.get("ubicacion", "").strip()
+        try:
+            cant_personas = int(form_data.get("cant_personas", ""))
+        except ValueError:
+            cant_personas = 0
+
         # ⚠ Validar campos obligatorios
-        if not self.fecha:
+        if not fecha:
             return rx.toast.warning("Selecciona una fecha para el evento.", position="bottom-right")
 
-        if not self.hora:
+        if not hora:
             return rx.toast.warning("Selecciona una hora para el evento.", position="bottom-right")
 
-        if not self.ubicacion.strip():
+        if not ubicacion:
             return rx.toast.warning("Escribe la ubicación del evento.", position="bottom-right")
         
         # 🟢 VALIDACIÓN NUEVA: Fecha pasada
         try:
-            fecha_seleccionada = datetime.datetime.strptime(self.fecha, "%Y-%m-%d").date()
+            fecha_seleccionada = datetime.datetime.strptime(fecha, "%Y-%m-%d").date()
             if fecha_seleccionada < datetime.date.today():
                 return rx.toast.error("No puedes solicitar un evento en una fecha pasada.", position="bottom-right")
         except ValueError:
             return rx.toast.error("Formato de fecha inválido.", position="bottom-right")
 
         # ⚠ Validar número de personas
-        if self.cant_personas < 1:
+        if cant_personas < 1:
             return rx.toast.error("La cantidad mínima es 1 persona.", position="bottom-right")
 
         # ⚠ Validar menú
@@ -270,13 +262,19 @@ class EventState(rx.State):
         if self.total <= 0:
             return rx.toast.error("El costo del menú debe ser mayor a 0.", position="bottom-right")
 
-        if not self.fecha or not self.hora or not self.ubicacion:
-            return rx.toast.error("Completa todos los campos")
-
+        conn = None
         try:
             conn = get_connection()
             cur = conn.cursor()
 
+            # La sesión sigue abierta pero la cuenta ya fue eliminada
+            if not cuenta_activa(cur, current_user):
+                conn.rollback()
+                return [
+                    rx.toast.error("Tu cuenta ya no está activa.", position="bottom-right"),
+                    auth_state.logout(),
+                ]
+
             # Guardar evento
             cur.execute("""
                 INSERT INTO eventos (id_usuario, fecha, hora, ubicacion, cant_personas, costo)
@@ -284,10 +282,10 @@ class EventState(rx.State):
                 RETURNING id_evento;
             """, (
                 current_user,
-                self.fecha,
-                self.hora,
-                self.ubicacion,
-                self.cant_personas,
+                fecha,
+                hora,
+                ubicacion,
+                cant_personas,
                 self.total
             ))
 
@@ -305,10 +303,7 @@ class EventState(rx.State):
             conn.commit()
 
             # Reset
-            self.fecha = ""
-            self.hora = ""
-            self.ubicacion = ""
-            self.cant_personas = 1
+            self.form_version += 1
             self.productos_seleccionados = []
             self.total = 0.0
             return rx.toast.success("Evento guardado correctamente!")
@@ -317,7 +312,8 @@ class EventState(rx.State):
             print(f"Error al guardar evento: {e}")
             return rx.toast.error("Error al guardar evento")
         finally:
-            conn.close()
+            if conn:
+                conn.close()
 
 def glass_card(*children):
     return rx.box(
@@ -341,237 +337,240 @@ def eventos_page():
         sidebar_button(),
 
         rx.center(
-            glass_card(
-
-                rx.heading(
-                    "Solicita un evento a domicilio",
-                    color="white",
-                    size="6",
-                    margin_bottom="25px",
-                    text_align="center"
-                ),
+            # 🟢 Formulario no controlado: los campos se envían juntos al solicitar
+            rx.form(
+                glass_card(
+
+                    rx.heading(
+                        "Solicita un evento a domicilio",
+                        color="white",
+                        size="6",
+                        margin_bottom="25px",
+                        text_align="center"
+                    ),
 
-                # ----------------------
-                # FILA 1: FECHA + HORA
-                # ----------------------
-                rx.hstack(
-                    rx.vstack(
-                        rx.text("Fecha", color="white", margin_bottom="5px"),
-                        rx.input(
-                            type="date",
-                            value=EventState.fecha,
-                            on_change=EventState.set_fecha,
-                            min=EventState.fecha_minima,
-                            size="3",
-                            width="100%",
-                            background="rgba(255,255,255,0.08)",
-                            color="white",
-                            border_radius="10px",
-                            padding_left="10px",
-                            style={"color-scheme": "dark"},
+                    # ----------------------
+                    # FILA 1: FECHA + HORA
+                    # ----------------------
+                    rx.hstack(
+                        rx.vstack(
+                            rx.text("Fecha", color="white", margin_bottom="5px"),
+                            rx.input(
+                                type="date",
+                                name="fecha",
+                                min=EventState.fecha_minima,
+                                size="3",
+                                width="100%",
+                                background="rgba(255,255,255,0.08)",
+                                color="white",
+                                border_radius="10px",
+                                padding_left="10px",
+                                style={"color-scheme": "dark"},
+                            ),
+                            spacing="1",
+                            width="50%"
                         ),
-                        spacing="1",
-                        width="50%"
-                    ),
 
-                    rx.vstack(
-                        rx.text("Hora", color="white", margin_bottom="5px"),
-                        rx.input(
-                            type="time",
-                            value=EventState.hora,
-                            on_change=EventState.set_hora,
-                            size="3",
-                            width="100%",
-                            background="rgba(255,255,255,0.08)",
-                            color="white",
-                            border_radius="10px",
-                            padding_left="10px",
-                            style={"color-scheme": "dark"},
+                        rx.vstack(
+                            rx.text("Hora", color="white", margin_bottom="5px"),
+                            rx.input(
+                                type="time",
+                                name="hora",
+                                size="3",
+                                width="100%",
+                                background="rgba(255,255,255,0.08)",
+                                color="white",
+                                border_radius="10px",
+                                padding_left="10px",
+                                style={"color-scheme": "dark"},
+                            ),
+                            spacing="1",
+                            width="50%"
                         ),
-                        spacing="1",
-                        width="50%"
-                    ),
 
-                    spacing="4",
-                    margin_bottom="20px"
-                ),
+                        spacing="4",
+                        margin_bottom="20px"
+                    ),
 
-                # ----------------------
-                # FILA 2: UBICACIÓN + PERSONAS
-                # ----------------------
-                rx.hstack(
-                    rx.vstack(
-                        rx.text("Ubicación", color="white", margin_bottom="5px"),
-                        rx.input(
-                            placeholder="Dirección del evento",
-                            value=EventState.ubicacion,
-                            on_change=EventState.set_ubicacion,
-                            size="3",
-                            width="100%",
-                            background="rgba(255,255,255,0.08)",
-                            color="white",
-                            border_radius="10px",
-                            padding_left="10px",
+                    # ----------------------
+                    # FILA 2: UBICACIÓN + PERSONAS
+                    # ----------------------
+                    rx.hstack(
+                        rx.vstack(
+                            rx.text("Ubicación", color="white", margin_bottom="5px"),
+                            rx.input(
+                                placeholder="Dirección del evento",
+                                name="ubicacion",
+                                size="3",
+                                width="100%",
+                                background="rgba(255,255,255,0.08)",
+                                color="white",
+                                border_radius="10px",
+                                padding_left="10px",
+                            ),
+                            spacing="1",
+                            width="70%"
                         ),
-                        spacing="1",
-                        width="70%"
-                    ),
 
-                    rx.vstack(
-                        rx.text("Personas", color="white", margin_bottom="5px"),
-                        rx.input(
-                            type="number",
-                            min=1,
-                            value=EventState.cant_personas,
-                            on_change=EventState.set_cant_personas,
-                            size="3",
-                            width="100%",
-                            background="rgba(255,255,255,0.08)",
-                            color="white",
-                            border_radius="10px",
-                            padding_left="10px",
+                        rx.vstack(
+                            rx.text("Personas", color="white", margin_bottom="5px"),
+                            rx.input(
+                                type="number",
+                                min=1,
+                                name="cant_personas",
+                                default_value="1",
+                                size="3",
+                                width="100%",
+                                background="rgba(255,255,255,0.08)",
+                                color="white",
+                                border_radius="10px",
+                                padding_left="10px",
+                            ),
+                            spacing="1",
+                            width="30%"
                         ),
-                        spacing="1",
-                        width="30%"
-                    ),
 
-                    spacing="4",
-                    margin_bottom="25px"
-                ),
+                        spacing="4",
+                        margin_bottom="25px"
+                    ),
 
-                # ----------------------
-                # BOTÓN ABRIR MODAL MENÚ
-                # ----------------------
-                rx.button(
-                    rx.hstack(
-                        rx.text("Arma tu menú"),
-                        rx.text(f"(${EventState.total:.2f})", opacity="0.8"),
-                        spacing="2"
+                    # ----------------------
+                    # BOTÓN ABRIR MODAL MENÚ
+                    # ----------------------
+                    rx.button(
+                        rx.hstack(
+                            rx.text("Arma tu menú"),
+                            rx.text(f"(${EventState.total:.2f})", opacity="0.8"),
+                            spacing="2"
+                        ),
+                        type="button", # No enviar el formulario
+                        on_click=alternar(menu_modal),
+                        background_color="#047e00",
+                        _hover={"background_color": "#006605"},
+                        width="100%",
+                        cursor="pointer",
+                        margin_top="20px",
+                        size="2",
+                        border_radius="10px",
+                        padding="10px",
+                        margin_bottom="16px"
                     ),
-                    on_click=EventState.toggle_menu_modal,
-                    background_color="#047e00",
-                    _hover={"background_color": "#006605"},
-                    width="100%",
-                    cursor="pointer",
-                    margin_top="20px",
-                    size="2",
-                    border_radius="10px",
-                    padding="10px",
-                    margin_bottom="16px"
-                ),
 
-                # ----------------------
-                # MODAL MENÚ (reemplazar)
-                # ----------------------
-                rx.dialog.root(
-                    rx.dialog.content(
-                        rx.vstack(
+                    # ----------------------
+                    # MODAL MENÚ (reemplazar)
+                    # ----------------------
+                    rx.dialog.root(
+                        rx.dialog.content(
+                            rx.vstack(
+
+                                # HEADER
+                                rx.hstack(
+                                    rx.dialog.title(
+                                        rx.heading("Arma tu menú", size="6", color="white")
+                                    ),
+                                    rx.text(EventState.total_str, color="white", margin_left="auto"),
+                                    width="100%",
+                                    margin_bottom="20px"
+                                ),
 
-                            # HEADER
-                            rx.hstack(
-                                rx.dialog.title(
-                                    rx.heading("Arma tu menú", size="6", color="white")
+                                # BOTÓN AGREGAR PRODUCTO
+                                rx.button(
+                                    "+ Agregar producto",
+                                    on_click=EventState.nueva_linea_menu,
+                                    color_scheme="blue",
+                                    width="100%",
+                                    cursor="pointer",
+                                    margin_bottom="15px"
                                 ),
-                                rx.text(EventState.total_str, color="white", margin_left="auto"),
-                                width="100%",
-                                margin_bottom="20px"
-                            ),
 
-                            # BOTÓN AGREGAR PRODUCTO
-                            rx.button(
-                                "+ Agregar producto",
-                                on_click=EventState.nueva_linea_menu,
-                                color_scheme="blue",
-                                width="100%",
-                                cursor="pointer",
-                                margin_bottom="15px"
-                            ),
+                                # LISTA DE LÍNEAS
+                                rx.foreach(
+                                    EventState.lineas_menu,
+                                    lambda linea, i:
+                                        rx.hstack(
+                                            # SELECT PRODUCTOS: pasar la lista POSICIONALMENTE
+                                            rx.select(
+                                                EventState.product_names,            # <- items como primer arg
+                                                value=linea["producto"],
+                                                on_change=lambda v, idx=i: EventState.set_linea_producto(idx, v),
+                                                placeholder="Selecciona platillo",
+                                                width="45%",
+                                            ),
+
+                                            # CANTIDAD
+                                            rx.input(
+                                                type="number",
+                                                min=1,
+                                                value=linea["cantidad"],
+                                                on_change=lambda v, idx=i: EventState.set_linea_cantidad(idx, v),
+                                                width="80px",
+                                            ),
+
+                                            # SUBTOTAL (var que ya calculas)
+                                            rx.text(
+                                                EventState.lineas_subtotales[i],
+                                                color="white",
+                                                width="90px",
+                                            ),
+
+                                            # BORRAR (usa lambda con payload)
+                                            rx.button(
+                                                "Borrar",
+                                                on_click=lambda _, idx=i: EventState.eliminar_linea(idx),
+                                                background_color="#d00000",
+                                                _hover={"background_color": "#b00000"},
+                                                cursor="pointer",
+                                            ),
+
+                                            width="100%",
+                                            spacing="3",
+                                            margin_bottom="12px"
+                                        )
+                                ),
 
-                            # LISTA DE LÍNEAS
-                            rx.foreach(
-                                EventState.lineas_menu,
-                                lambda linea, i:
-                                    rx.hstack(
-                                        # SELECT PRODUCTOS: pasar la lista POSICIONALMENTE
-                                        rx.select(
-                                            EventState.product_names,            # <- items como primer arg
-                                            value=linea["producto"],
-                                            on_change=lambda v, idx=i: EventState.set_linea_producto(idx, v),
-                                            placeholder="Selecciona platillo",
-                                            width="45%",
-                                        ),
-
-                                        # CANTIDAD
-                                        rx.input(
-                                            type="number",
-                                            min=1,
-                                            value=linea["cantidad"],
-                                            on_change=lambda v, idx=i: EventState.set_linea_cantidad(idx, v),
-                                            width="80px",
-                                        ),
-
-                                        # SUBTOTAL (var que ya calculas)
-                                        rx.text(
-                                            EventState.lineas_subtotales[i],
-                                            color="white",
-                                            width="90px",
-                                        ),
-
-                                        # BORRAR (usa lambda con payload)
-                                        rx.button(
-                                            "Borrar",
-                                            on_click=lambda _, idx=i: EventState.eliminar_linea(idx),
-                                            background_color="#d00000",
-                                            _hover={"background_color": "#b00000"},
-                                            cursor="pointer",
-                                        ),
-
-                                        width="100%",
-                                        spacing="3",
-                                        margin_bottom="12px"
-                                    )
-                            ),
+                                # GUARDAR
+                                rx.button(
+                                    "Guardar menú",
+                                    on_click=EventState.save_menu,
+                                    background_color="#047e00",
+                                    _hover={"background_color": "#006605"},
+                                    cursor="pointer",
+                                    width="100%",
+                                    margin_top="15px"
+                                ),
 
-                            # GUARDAR
-                            rx.button(
-                                "Guardar menú",
-                                on_click=EventState.save_menu,
-                                background_color="#047e00",
-                                _hover={"background_color": "#006605"},
-                                cursor="pointer",
-                                width="100%",
-                                margin_top="15px"
                             ),
 
+                            background="#1a1a1c",
+                            border_radius="15px",
+                            width="650px",
+                            padding="30px",
                         ),
 
-                        background="#1a1a1c",
-                        border_radius="15px",
-                        width="650px",
-                        padding="30px",
+                        open=menu_modal.value,
+                        on_open_change=menu_modal.set_value(),
                     ),
 
-                    open=EventState.menu_modal_open,
-                    on_open_change=EventState.toggle_menu_modal,
-                ),
-
 
-                # ----------------------
-                # BOTÓN FINAL
-                # ----------------------
-                rx.button(
-                    "Solicitar evento",
-                    on_click=lambda: EventState.submit_event(AuthState.current_user),
-                    background_color="#ff0000",
-                    _hover={"background_color": "#b00000"},
-                    cursor="pointer",
-                    border_radius="10px",
-                    padding="10px",
-                    transition= "all 0.2s ease-in-out",
-                    width="100%",
-                    size="3",
-                    margin_top="20px"
+                    # ----------------------
+                    # BOTÓN FINAL
+                    # ----------------------
+                    rx.button(
+                        "Solicitar evento",
+                        type="submit",
+                        background_color="#ff0000",
+                        _hover={"background_color": "#b00000"},
+                        cursor="pointer",
+                        border_radius="10px",
+                        padding="10px",
+                        transition= "all 0.2s ease-in-out",
+                        width="100%",
+                        size="3",
+                        margin_top="20px"
+                    ),
                 ),
+                on_submit=EventState.submit_event,
+                key=EventState.form_version,
             ),
             
             margin_left=rx.cond(UIState.sidebar_open, "260px", "0px"),
@@ -0,0 +1,109 @@
+# hashing.py
+# Hash y verificación de contraseñas (PBKDF2) fuera del event loop.
+#
+# PBKDF2 es caro a propósito. Si se corre dentro del handler, una ráfaga de
+# logins bloquea el event loop y con él todos los websockets. Aquí se manda a
+# un pool de hilos acotado (hashlib suelta el GIL mientras calcula, así que los
+# hilos sí corren en paralelo) y se limita cuántos pueden esperar en cola.
+#
+# Las iteraciones salen de la variable de entorno LEOWEB_PBKDF2_ROUNDS. Para
+# elegir un valor según el hardware del servidor:
+#
+#     python -m leoweb.hashing 250      # ms objetivo por hash
+#
+# Los hashes con otras iteraciones se rehacen solos en el siguiente login.
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from passlib.hash import pbkdf2_sha256
+
+# Iteraciones de PBKDF2 (el default de passlib si no se configuró)
+HASH_ROUNDS = int(os.environ.get("LEOWEB_PBKDF2_ROUNDS", pbkdf2_sha256.default_rounds))
+# Hilos que calculan hashes a la vez
+HASH_WORKERS = int(os.environ.get("LEOWEB_HASH_WORKERS", os.cpu_count() or 2))
+# Máximo de hashes pendientes (en cálculo + en cola) antes de rechazar
+HASH_MAX_PENDIENTES = HASH_WORKERS * 8
+
+_hasher = pbkdf2_sha256.using(rounds=HASH_ROUNDS)
+_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="pbkdf2")
+
+# Métricas simples del pool (las muestra el dashboard del admin)
+_metricas: Dict[str, float] = {
+    "pendientes": 0,         # en cálculo + en cola ahora mismo
+    "max_pendientes": 0,     # pico observado
+    "total": 0,              # hashes/verificaciones completados
+    "rechazados": 0,         # rechazados por cola llena
+    "segundos_total": 0.0,   # tiempo acumulado (espera + cálculo)
+}
+
+
+class HashSaturado(Exception):
+    """El pool de hashing tiene la cola llena; conviene reintentar en un momento."""
+
+
+def metricas_hash() -> Dict[str, float]:
+    """Copia de las métricas del pool de hashing."""
+    return dict(_metricas)
+
+
+async def _en_pool(funcion, *args):
+    """Corre `funcion` en el pool respetando el límite de pendientes."""
+    if _metricas["pendientes"] >= HASH_MAX_PENDIENTES:
+        _metricas["rechazados"] += 1
+        raise HashSaturado()
+
+    _metricas["pendientes"] += 1
+    _metricas["max_pendientes"] = max(_metricas["max_pendientes"], _metricas["pendientes"])
+    inicio = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_pool, funcion, *args)
+    finally:
+        _metricas["pendientes"] -= 1
+        _metricas["total"] += 1
+        _metricas["segundos_total"] += time.perf_counter() - inicio
+
+
+async def hash_password(password: str) -> str:
+    """Hash PBKDF2 con las iteraciones configuradas."""
+    return await _en_pool(_hasher.hash, password)
+
+
+def _verificar(password: str, guardado: str) -> Tuple[bool, Optional[str]]:
+    if not _hasher.verify(password, guardado):
+        return False, None
+    # Contraseña correcta pero con parámetros viejos: aprovechar para rehacerlo
+    if _hasher.needs_update(guardado):
+        return True, _hasher.hash(password)
+    return True, None
+
+
+async def verify_password(password: str, guardado: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica la contraseña. Regresa (correcta, nuevo_hash); `nuevo_hash` viene
+    sólo si el hash guardado usa otras iteraciones y hay que reemplazarlo.
+    """
+    return await _en_pool(_verificar, password, guardado)
+
+
+def calibrar(objetivo_ms: float) -> int:
+    """Iteraciones para que un hash tarde aproximadamente `objetivo_ms` en este equipo."""
+    rondas = 10000
+    while True:
+        inicio = time.perf_counter()
+        pbkdf2_sha256.using(rounds=rondas).hash("calibracion")
+        ms = (time.perf_counter() - inicio) * 1000
+        # Medir con al menos ~50 ms para que la extrapolación sea confiable
+        if ms >= 50:
+            return max(1000, int(rondas * objetivo_ms / ms))
+        rondas *= 2
+
+
+if __name__ == "__main__":
+    objetivo = float(sys.argv[1]) if len(sys.argv) > 1 else 250
+    rondas = calibrar(objetivo)
+    print(f"✅ {rondas} iteraciones ≈ {objetivo:.0f} ms por hash en este equipo.")
+    print(f"   export LEOWEB_PBKDF2_ROUNDS={rondas}")
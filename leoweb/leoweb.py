@@ -14,6 +14,13 @@ from .admin.productos import adm_productos_page
 from .admin.reservaciones import adm_reservas_page
 from .admin.eventos import adm_eventos_page
 from .admin.usuarios import adm_usuarios_page
+from .admin.live import escuchar_cambios
+from .admin.exportar import EXPORT_ROUTES
+from .admin.demanda import refrescar_demanda_periodicamente
+from .admin.purga import purgar_periodicamente
+from .admin.cambios import purgar_cambios_periodicamente
+from .sesiones import usar_almacen_acotado
+from starlette.applications import Starlette
 
 # --------------------------
 # COMPONENTE DE SERVICIO REUTILIZABLE
@@ -323,7 +330,22 @@ app = rx.App(stylesheets=[],
         "html": {
             "scrollBehavior": "smooth"
         }
-    })
+    },
+    # Rutas HTTP extra del backend (descarga de exportaciones del admin)
+    api_transformer=Starlette(routes=EXPORT_ROUTES),
+)
+# Sesiones con TTL, tope de tamaño y archivos comprimidos (ver sesiones.py)
+usar_almacen_acotado(app)
+
+# Listener único de cambios para las páginas del admin (LISTEN/NOTIFY)
+app.register_lifespan_task(escuchar_cambios, rx_app=app)
+# Refresco periódico de la demanda/pronóstico de productos
+app.register_lifespan_task(refrescar_demanda_periodicamente)
+# Purga por lotes de las cuentas de usuario eliminadas
+app.register_lifespan_task(purgar_periodicamente)
+# Purga del feed de cambios (la tabla `cambios` crece con cada escritura)
+app.register_lifespan_task(purgar_cambios_periodicamente)
+
 app.add_page(index, title="Leoweb Restaurant")
 app.add_page(login_page, route="/login", title="Iniciar sesión")
 app.add_page(register_page, route="/register", title="Regístrate")
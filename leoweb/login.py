@@ -1,5 +1,5 @@
 import reflex as rx
-from .auth_state import AuthState
+from .auth_state import LoginState
 
 # --------------------------
 # ESTILO DE GLASSMORPHISM
@@ -64,7 +64,7 @@ def login_page():
                         rx.icon("mail", color="white", size=20),
                         rx.input(
                             placeholder="Correo electrónico",
-                            on_change=AuthState.set_email,
+                            name="email",
                             type="email",
                             size="3",
                             background="rgba(255,255,255,0.08)",
@@ -86,7 +86,7 @@ def login_page():
                         rx.icon("lock", color="white", size=20),
                         rx.input(
                             placeholder="Contraseña",
-                            on_change=AuthState.set_password,
+                            name="password",
                             type="password",
                             size="3",
                             background="rgba(255,255,255,0.08)",
@@ -139,7 +139,8 @@ def login_page():
                     ),
                 ), # Cierre de glass_card
                 # 🟢 2. ASIGNAMOS EL EVENTO DE LOGIN AL on_submit DEL FORMULARIO
-                on_submit=AuthState.login,
+                # (inputs sin on_change: los campos sólo viajan al enviar)
+                on_submit=LoginState.login,
                 width="380px", # Aseguramos el ancho para el formulario
             ) # Cierre de rx.form
         ), # Cierre de rx.center
@@ -2,14 +2,20 @@ import reflex as rx
 from .auth_state import AuthState, get_connection
 from .sidebar import sidebar, sidebar_button
 from .ui_state import UIState
-from passlib.hash import pbkdf2_sha256
+from .hashing import HashSaturado, hash_password, verify_password
 from datetime import datetime, date
 from typing import List, Dict, Any
+from reflex.experimental.client_state import ClientStateVar
 
 Reservation = Dict[str, Any]
 HomeEvent = Dict[str, Any]
 EventDetail = Dict[str, List[Dict[str, Any]]]
 
+# Modales del perfil: abrir/cerrar es del navegador; al abrir sólo se pide al
+# backend la lista que muestran.
+modal_reservaciones = ClientStateVar.create("modal_reservaciones", default=False)
+modal_eventos = ClientStateVar.create("modal_eventos_domicilio", default=False)
+
 # Definición de la estructura de un ítem de menú (ejemplo)
 class MenuItem(rx.Base):
     cantidad: int
@@ -51,35 +57,29 @@ class ProfileState(rx.State):
     nombre: str = ""
     correo: str = ""
     telefono: str = ""
-    contrasena_actual: str = ""
-    nueva_contrasena: str = ""
-    confirmar_contrasena: str = ""
 
     edit_mode: bool = False
+    # Se incrementa para re-montar el formulario (inputs no controlados) con los
+    # valores guardados; las contraseñas nunca se guardan en el state
+    form_version: int = 0
 
-    show_reservations_modal: bool = False # 👈 Variable para abrir/cerrar modal
     user_reservations: List[Reservation] = [] # 👈 Lista de reservaciones
 
-    show_home_events_modal: bool = False # 👈 Variable para abrir/cerrar modal de eventos
     user_home_events: List[HomeEvent] = [] # 👈 Lista de eventos
     # {id_evento: [{"nombre_producto": "...", "cantidad": X, "costo_unitario": Y}]}
     event_details: EventDetail = {} # 👈 Diccionario para guardar el detalle del menú (desplegable)
 
     # --------------------------------------------------------
-    # ---- TOGGLE MODAL EVENTOS A DOMICILIO ----
+    # ---- ABRIR MODAL EVENTOS A DOMICILIO ----
     @rx.event
-    async def toggle_home_events_modal(self, is_open: bool):
-        """Abre y cierra el modal de eventos a domicilio y carga los datos."""
-        self.show_home_events_modal = is_open
-        
-        # Cargar datos al abrir
-        if is_open:
-            auth_state = await self.get_state(AuthState)
-            current_user_id = auth_state.current_user
-            # Limpiamos los detalles al abrir
-            self.event_details = {} 
-            # Es importante usar `yield` ya que `load_home_events_data` puede devolver un Toast
-            yield self.load_home_events_data(current_user_id)
+    async def open_home_events_modal(self):
+        """Carga los datos del modal de eventos a domicilio (el modal lo abre el cliente)."""
+        auth_state = await self.get_state(AuthState)
+        current_user_id = auth_state.current_user
+        # Limpiamos los detalles al abrir
+        self.event_details = {} 
+        # Es importante usar `yield` ya que `load_home_events_data` puede devolver un Toast
+        yield self.load_home_events_data(current_user_id)
 
     # ---- CARGAR DATOS DE EVENTOS A DOMICILIO ----
     def load_home_events_data(self, current_user_id: int):
@@ -237,21 +237,16 @@ class ProfileState(rx.State):
             if conn:
                 conn.close()
 
-    # ---- TOGGLE MODAL RESERVACIONES ----
-    async def toggle_reservations_modal(self):
-        """Abre y cierra el modal de reservaciones."""
-        self.show_reservations_modal = not self.show_reservations_modal
+    # ---- ABRIR MODAL RESERVACIONES ----
+    async def open_reservations_modal(self):
+        """Carga las reservaciones del modal (el modal lo abre/cierra el cliente)."""
+        # Al cerrar no pasa nada: los datos persisten hasta que se vuelva a abrir el modal.
+        auth_state = await self.get_state(AuthState)
+        current_user_id = auth_state.current_user
         
-        # Al abrir, si la lista está vacía, cargarla.
-        # Al cerrar, no pasa nada, los datos persisten hasta que se recargue la página/vuelva a abrir el modal.
-        if self.show_reservations_modal:
-            auth_state = await self.get_state(AuthState)
-            current_user_id = auth_state.current_user
-            
-            # Llama a load_reservations_data con el ID, y usa yield para devolver
-            # el resultado del toast o la actualización de estado.
-            # Convertimos load_reservations_data en una función normal que recibe el ID
-            yield self.load_reservations_data(current_user_id) # 👈 PASA EL ID
+        # Llama a load_reservations_data con el ID, y usa yield para devolver
+        # el resultado del toast o la actualización de estado.
+        yield self.load_reservations_data(current_user_id) # 👈 PASA EL ID
 
     # ---- CARGAR DATOS DE RESERVACIONES ----
     def load_reservations_data(self, current_user_id: int):
@@ -362,25 +357,6 @@ class ProfileState(rx.State):
             if conn:
                 conn.close()
 
-    # ---- SETTERS ----
-    def set_nombre(self, value: str):
-        self.nombre = value
-
-    def set_correo(self, value: str):
-        self.correo = value
-
-    def set_telefono(self, value: str):
-        self.telefono = value
-
-    def set_contra_actual(self, value: str):
-        self.contrasena_actual = value
-
-    def set_contra_nueva(self, value: str):
-        self.nueva_contrasena = value
-
-    def set_contra_confirm(self, value: str):
-        self.confirmar_contrasena = value
-
     # --------------------------------------------------------
     # CARGAR DATOS DEL USUARIO DESDE LA DB
     # --------------------------------------------------------
@@ -397,6 +373,7 @@ class ProfileState(rx.State):
             row = cur.fetchone()
             if row:
                 self.nombre, self.correo, self.telefono = row
+                self.form_version += 1
         except Exception as e:
             print("Error cargando datos de usuario:", e)
         finally:
@@ -423,16 +400,14 @@ class ProfileState(rx.State):
     # --------------------------------------------------------
     def toggle_edit(self):
         self.edit_mode = not self.edit_mode
-        # Opcional: limpiar campos de contraseña al salir de edición
-        if not self.edit_mode:
-            self.contrasena_actual = ""
-            self.nueva_contrasena = ""
-            self.confirmar_contrasena = ""
+        # Re-montar el formulario: al salir de edición se descarta lo tecleado
+        # (también las contraseñas) y vuelven los valores guardados
+        self.form_version += 1
 
     # --------------------------------------------------------
     # GUARDAR CAMBIOS
     # --------------------------------------------------------
-    async def save_profile(self):
+    async def save_profile(self, form_data: dict):
         # 🟢 CÓDIGO CORREGIDO: Esperar el objeto de estado y luego acceder al atributo
         auth_state = await self.get_state(AuthState)
         user = auth_state.current_user # <-- ACCEDER AQUÍ
@@ -440,35 +415,49 @@ class ProfileState(rx.State):
         if user is None:
             return rx.toast.error("Debes iniciar sesión.")
 
+        # Todos los campos llegan juntos al enviar el formulario
+        nombre = form_data.get("nombre", "").strip()
+        correo = form_data.get("correo", "").strip()
+        telefono = form_data.get("telefono", "").strip()
+        contrasena_actual = form_data.get("contrasena_actual", "")
+        nueva_contrasena = form_data.get("nueva_contrasena", "")
+        confirmar_contrasena = form_data.get("confirmar_contrasena", "")
+
+        if not nombre or not correo or not telefono:
+            return rx.toast.error("Nombre, correo y teléfono son obligatorios.")
+
+        if "@" not in correo:
+            return rx.toast.error("El correo no es válido.")
+
         conn = None 
         try:
             conn = get_connection()
             cur = conn.cursor()
             
             # --- Lógica de Cambio de Contraseña ---
-            if self.nueva_contrasena or self.confirmar_contrasena:
-                if self.nueva_contrasena != self.confirmar_contrasena:
+            if nueva_contrasena or confirmar_contrasena:
+                if nueva_contrasena != confirmar_contrasena:
                     return rx.toast.error("Las contraseñas no coinciden.")
 
-                if not self.contrasena_actual:
+                if not contrasena_actual:
                     return rx.toast.error("Debes escribir tu contraseña actual.")
 
                 # 1. Verificar Contraseña Actual
                 cur.execute("SELECT contrasena FROM usuarios WHERE id_usuario = %s;", (user,))
                 row = cur.fetchone()
 
-                if not row or not pbkdf2_sha256.verify(self.contrasena_actual, row[0]):
+                if not row or not (await verify_password(contrasena_actual, row[0]))[0]:
                     return rx.toast.error("Tu contraseña actual es incorrecta.")
 
-                # 2. Hashear Nueva Contraseña
-                hashed_password = pbkdf2_sha256.hash(self.nueva_contrasena)
+                # 2. Hashear Nueva Contraseña (en el pool de hashing)
+                hashed_password = await hash_password(nueva_contrasena)
 
                 # 3. Actualizar datos Y contraseña
                 cur.execute("""
                     UPDATE usuarios 
                     SET nombre = %s, correo = %s, telefono = %s, contrasena = %s
                     WHERE id_usuario = %s;
-                """, (self.nombre, self.correo, self.telefono, hashed_password, user))
+                """, (nombre, correo, telefono, hashed_password, user))
 
             else:
                 # --- Lógica de Solo Actualizar Datos ---
@@ -477,10 +466,12 @@ class ProfileState(rx.State):
                     UPDATE usuarios 
                     SET nombre = %s, correo = %s, telefono = %s
                     WHERE id_usuario = %s;
-                """, (self.nombre, self.correo, self.telefono, user))
+                """, (nombre, correo, telefono, user))
 
             conn.commit()
 
+        except HashSaturado:
+            return rx.toast.error("El servidor está ocupado, intenta de nuevo en unos segundos.")
         except Exception as e:
             # Importante hacer rollback si algo falla
             if conn:
@@ -492,11 +483,11 @@ class ProfileState(rx.State):
             if conn:
                 conn.close()
 
-        # Resetear edición y campos de contraseña
+        # Guardar los valores nuevos y resetear edición (el formulario se re-monta
+        # con ellos y con las contraseñas vacías)
+        self.nombre, self.correo, self.telefono = nombre, correo, telefono
         self.edit_mode = False
-        self.contrasena_actual = ""
-        self.nueva_contrasena = ""
-        self.confirmar_contrasena = ""
+        self.form_version += 1
 
         return rx.toast.success("Perfil actualizado correctamente. 👍")
     
@@ -603,8 +594,8 @@ def reservations_modal():
             padding="30px",
         ),
 
-        open=ProfileState.show_reservations_modal,
-        on_open_change=ProfileState.toggle_reservations_modal,
+        open=modal_reservaciones.value,
+        on_open_change=modal_reservaciones.set_value(),
     )
 
 # 🟢 FUNCIÓN PARA MOSTRAR LOS DETALLES DEL MENÚ (CORRECCIÓN DEFINITIVA V2)
@@ -738,7 +729,6 @@ def home_events_modal():
                             color="white", 
                             size=20, 
                             cursor="pointer",
-                            on_click=ProfileState.toggle_home_events_modal(False),
                             _hover={"color": "#ff0000"}
                         )
                     ),
@@ -778,8 +768,8 @@ def home_events_modal():
             padding="30px",
         ),
         # Conexión al estado del modal
-        open=ProfileState.show_home_events_modal,
-        on_open_change=ProfileState.toggle_home_events_modal,
+        open=modal_eventos.value,
+        on_open_change=modal_eventos.set_value(),
     )
 
 # ----------------------------------------------------------------------
@@ -790,7 +780,9 @@ def profile_card():
         rx.hstack(
 
             # INFORMACIÓN + CAMPOS
-            rx.box(
+            # 🟢 Formulario no controlado: nada viaja al backend mientras se
+            # escribe; todos los campos se envían juntos al guardar
+            rx.form(
                 # ICONO EDITAR
                 rx.icon(
                     # 🟢 CAMBIO DE ÍCONO: pencil (inactivo) o x (activo)
@@ -812,8 +804,8 @@ def profile_card():
                 # NOMBRE
                 rx.text("Nombre", color="white", margin_top="10px"),
                 rx.input(
-                    value=ProfileState.nombre,
-                    on_change=ProfileState.set_nombre,
+                    name="nombre",
+                    default_value=ProfileState.nombre,
                     disabled=~ProfileState.edit_mode,
                     width="100%",
                     background="rgba(255,255,255,0.08)",
@@ -826,8 +818,8 @@ def profile_card():
                 # CORREO
                 rx.text("Correo", color="white", margin_top="15px"),
                 rx.input(
-                    value=ProfileState.correo,
-                    on_change=ProfileState.set_correo,
+                    name="correo",
+                    default_value=ProfileState.correo,
                     disabled=~ProfileState.edit_mode,
                     width="100%",
                     background="rgba(255,255,255,0.08)",
@@ -840,8 +832,8 @@ def profile_card():
                 # TELÉFONO
                 rx.text("Teléfono", color="white", margin_top="15px"),
                 rx.input(
-                    value=ProfileState.telefono,
-                    on_change=ProfileState.set_telefono,
+                    name="telefono",
+                    default_value=ProfileState.telefono,
                     disabled=~ProfileState.edit_mode,
                     width="100%",
                     background="rgba(255,255,255,0.08)",
@@ -860,8 +852,7 @@ def profile_card():
                 rx.input(
                     placeholder="Contraseña actual",
                     type="password",
-                    value=ProfileState.contrasena_actual,
-                    on_change=ProfileState.set_contra_actual,
+                    name="contrasena_actual",
                     disabled=~ProfileState.edit_mode,
                     width="100%",
                     size="3",
@@ -876,8 +867,7 @@ def profile_card():
                     rx.input(
                         placeholder="Nueva contraseña",
                         type="password",
-                        value=ProfileState.nueva_contrasena,
-                        on_change=ProfileState.set_contra_nueva,
+                        name="nueva_contrasena",
                         disabled=~ProfileState.edit_mode,
                         width="100%",
                         size="3",
@@ -889,8 +879,7 @@ def profile_card():
                     rx.input(
                         placeholder="Confirmar contraseña",
                         type="password",
-                        value=ProfileState.confirmar_contrasena,
-                        on_change=ProfileState.set_contra_confirm,
+                        name="confirmar_contrasena",
                         disabled=~ProfileState.edit_mode,
                         width="100%",
                         size="3",
@@ -908,7 +897,7 @@ def profile_card():
                     # 1. BOTÓN GUARDAR (visible/invisible con layout fijo)
                     rx.button(
                         "Guardar",
-                        on_click=ProfileState.save_profile,
+                        type="submit",
                         background_color="#ff0000",
                         _hover={"background_color": "#b00000"},
                         cursor=rx.cond(ProfileState.edit_mode, "pointer", "default"), 
@@ -933,7 +922,8 @@ def profile_card():
                                 cursor="pointer",
                                 _hover={"color": "#ff0000"},
                                 transition="color 0.3s ease",
-                                on_click=ProfileState.toggle_reservations_modal,
+                                # Abrir en el cliente al instante y pedir los datos
+                                on_click=[modal_reservaciones.push(True), ProfileState.open_reservations_modal],
                             ),
                             # El label debe ser una cadena de texto (str) o un Var, no un componente
                             content="Mis reservaciones", 
@@ -950,7 +940,7 @@ def profile_card():
                                 _hover={"color": "#ff0000"},
                                 transition="color 0.3s ease",
                                 margin_left="15px",
-                                on_click=ProfileState.toggle_home_events_modal(True),
+                                on_click=[modal_eventos.push(True), ProfileState.open_home_events_modal],
                             ),
                             content="Mis eventos a domicilio", 
                             color_scheme="red",
@@ -962,6 +952,9 @@ def profile_card():
                     margin_top="25px",
                 ),
 
+                on_submit=ProfileState.save_profile,
+                # Cambia al cargar/guardar/cancelar para re-montar con los valores del state
+                key=ProfileState.form_version,
                 width="100%",
             ),
 
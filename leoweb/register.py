@@ -1,5 +1,5 @@
 import reflex as rx
-from .auth_state import AuthState
+from .auth_state import RegisterState
 
 # --------------------------
 # ESTILO DE GLASSMORPHISM (Mantenemos la función)
@@ -48,153 +48,153 @@ def register_page():
         back_button(),
 
         rx.center(
-            glass_card(
-                # TÍTULO
-                rx.heading(
-                    "Regístrate", color="white", size="6", margin_bottom="30px", text_align="center"
-                ),
+            # 🟢 Formulario no controlado: todo se envía junto en on_submit
+            rx.form(
+                glass_card(
+                    # TÍTULO
+                    rx.heading(
+                        "Regístrate", color="white", size="6", margin_bottom="30px", text_align="center"
+                    ),
 
-                # INPUT NOMBRE (NUEVO)
-                rx.hstack(
-                    rx.icon("user", color="white", size=20),
-                    rx.input(
-                        placeholder="Nombre completo",
-                        on_change=AuthState.set_register_name,
-                        value=AuthState.register_name, # Para mantener el valor si hay error
-                        type="text",
-                        size="3",
-                        background="rgba(255,255,255,0.08)",
-                        color="white",
-                        border_radius="10px",
-                        _placeholder={"color": "rgba(255,255,255,0.5)"},
-                        _focus={"border": "1px solid red"},
-                        width="100%"
+                    # INPUT NOMBRE (NUEVO)
+                    rx.hstack(
+                        rx.icon("user", color="white", size=20),
+                        rx.input(
+                            placeholder="Nombre completo",
+                            name="register_name",
+                            type="text",
+                            size="3",
+                            background="rgba(255,255,255,0.08)",
+                            color="white",
+                            border_radius="10px",
+                            _placeholder={"color": "rgba(255,255,255,0.5)"},
+                            _focus={"border": "1px solid red"},
+                            width="100%"
+                        ),
+                        spacing="3",
+                        width="100%",
+                        margin_bottom="15px",
+                        align_items="center"
                     ),
-                    spacing="3",
-                    width="100%",
-                    margin_bottom="15px",
-                    align_items="center"
-                ),
                 
-                # INPUT CORREO
-                rx.hstack(
-                    rx.icon("mail", color="white", size=20),
-                    rx.input(
-                        placeholder="Correo electrónico",
-                        on_change=AuthState.set_register_email,
-                        value=AuthState.register_email, # Para mantener el valor
-                        type="email",
-                        size="3",
-                        background="rgba(255,255,255,0.08)",
-                        color="white",
-                        border_radius="10px",
-                        _placeholder={"color": "rgba(255,255,255,0.5)"},
-                        _focus={"border": "1px solid red"},
-                        width="100%"
+                    # INPUT CORREO
+                    rx.hstack(
+                        rx.icon("mail", color="white", size=20),
+                        rx.input(
+                            placeholder="Correo electrónico",
+                            name="register_email",
+                            type="email",
+                            size="3",
+                            background="rgba(255,255,255,0.08)",
+                            color="white",
+                            border_radius="10px",
+                            _placeholder={"color": "rgba(255,255,255,0.5)"},
+                            _focus={"border": "1px solid red"},
+                            width="100%"
+                        ),
+                        spacing="3",
+                        width="100%",
+                        margin_bottom="15px",
+                        align_items="center"
                     ),
-                    spacing="3",
-                    width="100%",
-                    margin_bottom="15px",
-                    align_items="center"
-                ),
                 
-                # INPUT TELÉFONO (NUEVO)
-                rx.hstack(
-                    rx.icon("phone", color="white", size=20),
-                    rx.input(
-                        placeholder="Teléfono",
-                        on_change=AuthState.set_register_phone,
-                        value=AuthState.register_phone, # Para mantener el valor
-                        type="tel",
-                        size="3",
-                        background="rgba(255,255,255,0.08)",
-                        color="white",
-                        border_radius="10px",
-                        _placeholder={"color": "rgba(255,255,255,0.5)"},
-                        _focus={"border": "1px solid red"},
-                        width="100%"
+                    # INPUT TELÉFONO (NUEVO)
+                    rx.hstack(
+                        rx.icon("phone", color="white", size=20),
+                        rx.input(
+                            placeholder="Teléfono",
+                            name="register_phone",
+                            type="tel",
+                            size="3",
+                            background="rgba(255,255,255,0.08)",
+                            color="white",
+                            border_radius="10px",
+                            _placeholder={"color": "rgba(255,255,255,0.5)"},
+                            _focus={"border": "1px solid red"},
+                            width="100%"
+                        ),
+                        spacing="3",
+                        width="100%",
+                        margin_bottom="15px",
+                        align_items="center"
                     ),
-                    spacing="3",
-                    width="100%",
-                    margin_bottom="15px",
-                    align_items="center"
-                ),
 
-                # INPUT CONTRASEÑA
-                rx.hstack(
-                    rx.icon("lock", color="white", size=20),
-                    rx.input(
-                        placeholder="Contraseña",
-                        on_change=AuthState.set_register_password,
-                        value=AuthState.register_password, # Para limpiar después del registro
-                        type="password",
-                        size="3",
-                        background="rgba(255,255,255,0.08)",
-                        color="white",
-                        border_radius="10px",
-                        _placeholder={"color": "rgba(255,255,255,0.5)"},
-                        _focus={"border": "1px solid red"},
-                        width="100%"
+                    # INPUT CONTRASEÑA
+                    rx.hstack(
+                        rx.icon("lock", color="white", size=20),
+                        rx.input(
+                            placeholder="Contraseña",
+                            name="register_password",
+                            type="password",
+                            size="3",
+                            background="rgba(255,255,255,0.08)",
+                            color="white",
+                            border_radius="10px",
+                            _placeholder={"color": "rgba(255,255,255,0.5)"},
+                            _focus={"border": "1px solid red"},
+                            width="100%"
+                        ),
+                        spacing="3",
+                        width="100%",
+                        margin_bottom="15px",
+                        align_items="center"
                     ),
-                    spacing="3",
-                    width="100%",
-                    margin_bottom="15px",
-                    align_items="center"
-                ),
                 
-                # INPUT CONFIRMAR CONTRASEÑA (NUEVO)
-                rx.hstack(
-                    rx.icon("lock", color="white", size=20),
-                    rx.input(
-                        placeholder="Confirmar Contraseña",
-                        on_change=AuthState.set_register_confirm_password,
-                        value=AuthState.register_confirm_password, # Para limpiar después del registro
-                        type="password",
+                    # INPUT CONFIRMAR CONTRASEÑA (NUEVO)
+                    rx.hstack(
+                        rx.icon("lock", color="white", size=20),
+                        rx.input(
+                            placeholder="Confirmar Contraseña",
+                            name="register_confirm_password",
+                            type="password",
+                            size="3",
+                            background="rgba(255,255,255,0.08)",
+                            color="white",
+                            border_radius="10px",
+                            _placeholder={"color": "rgba(255,255,255,0.5)"},
+                            _focus={"border": "1px solid red"},
+                            width="100%"
+                        ),
+                        spacing="3",
+                        width="100%",
+                        margin_bottom="25px",
+                        align_items="center"
+                    ),
+
+                    # BOTÓN REGISTRARSE
+                    rx.button(
+                        "Registrarse",
+                        type="submit", # 🟢 Envía el formulario a RegisterState.register
+                        width="100%",
                         size="3",
-                        background="rgba(255,255,255,0.08)",
+                        background="red",
                         color="white",
                         border_radius="10px",
-                        _placeholder={"color": "rgba(255,255,255,0.5)"},
-                        _focus={"border": "1px solid red"},
-                        width="100%"
+                        margin_bottom="20px",
+                        cursor="pointer",
+                        transition="background 0.3s ease-in-out",
+                        _hover={"background": "#b30000"},
                     ),
-                    spacing="3",
-                    width="100%",
-                    margin_bottom="25px",
-                    align_items="center"
-                ),
-
-                # BOTÓN REGISTRARSE
-                rx.button(
-                    "Registrarse",
-                    on_click=AuthState.register, # 🟢 Llama a la función de registro
-                    width="100%",
-                    size="3",
-                    background="red",
-                    color="white",
-                    border_radius="10px",
-                    margin_bottom="20px",
-                    cursor="pointer",
-                    transition="background 0.3s ease-in-out",
-                    _hover={"background": "#b30000"},
-                ),
 
-                rx.divider(
-                    border_color="rgba(255,255,255,0.2)", margin_y="10px"
-                ),
+                    rx.divider(
+                        border_color="rgba(255,255,255,0.2)", margin_y="10px"
+                    ),
 
-                # LINK DE INICIO DE SESIÓN
-                rx.text(
-                    "¿Ya tienes cuenta? ",
-                    rx.link(
-                        "Inicia sesión aquí",
-                        href="/login", # 🟢 Redirige a /login
-                        font_weight="bold",
-                        color="#ff4747",
-                        _hover={"color": "#ff0000"},
+                    # LINK DE INICIO DE SESIÓN
+                    rx.text(
+                        "¿Ya tienes cuenta? ",
+                        rx.link(
+                            "Inicia sesión aquí",
+                            href="/login", # 🟢 Redirige a /login
+                            font_weight="bold",
+                            color="#ff4747",
+                            _hover={"color": "#ff0000"},
+                        ),
+                        color="white",
                     ),
-                    color="white",
                 ),
+                on_submit=RegisterState.register,
+                width="380px",
             )
         ),
 
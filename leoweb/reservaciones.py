@@ -1,18 +1,36 @@
 import reflex as rx
 import datetime # ⬅️ Necesario para manejar horas
 from .sidebar import sidebar, sidebar_button
-from .auth_state import get_connection, AuthState
+from .auth_state import get_connection, cuenta_activa, AuthState
 from .ui_state import UIState
 
+# 🟢 Reserva sólo si la hora sigue libre en esa sucursal (mismo criterio de
+# solapamiento con búfer que cargar_horas_disponibles). El chequeo va dentro
+# del INSERT y bajo un lock por sucursal y fecha, así que dos clicks al mismo
+# tiempo no pueden quedarse con la misma hora: el segundo espera al primero y
+# ya ve su reserva.
+BLOQUEAR_DIA_SQL = "SELECT pg_advisory_xact_lock(hashtext(%s));"
+RESERVAR_SQL = """
+    INSERT INTO reserva (id_usuario, cant_personas, fecha, hora, tipo_evento, id_sucursal)
+    SELECT %(usuario)s, %(personas)s, %(fecha)s::date, %(hora)s::time, %(tipo)s, %(sucursal)s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM reserva
+        WHERE fecha = %(fecha)s::date AND id_sucursal = %(sucursal)s
+          -- Se solapa si empiezan a menos de duración + búfer una de la otra
+          AND abs(extract(epoch FROM hora - %(hora)s::time)) < %(minutos)s * 60
+    );
+"""
+
 # --------------------------
 # STATE PARA RESERVACIONES
 # --------------------------
 class ReservaState(rx.State):
+    # Sólo la fecha vive en el state (de ella dependen las horas disponibles);
+    # hora, tipo y personas son inputs no controlados que llegan en `reservar`.
     fecha: str = ""
-    tipo_evento: str = ""
-    hora: str = ""
-    cant_personas: int = 1
     id_sucursal: int = 1
+    # Se incrementa para re-montar (limpiar) el formulario tras reservar
+    form_version: int = 0
 
     DURACION_RESERVA_MINUTOS: int = 120
     BUFFER_ENTRE_EVENTOS_MINUTOS: int = 120
@@ -34,8 +52,7 @@ class ReservaState(rx.State):
 
     # 3. Disparador: Se ejecuta cuando cambian la fecha
     async def set_fecha_y_buscar_horas(self, fecha: str):
-        self.fecha = fecha
-        self.hora = "" # Reseteamos la hora seleccionada previa
+        self.fecha = fecha # El select de hora se re-monta (vacío) al cambiar la fecha
 
          # Si el usuario todavía no seleccionó fecha (campo vacío) mostramos aviso
         if not self.fecha:
@@ -134,24 +151,24 @@ class ReservaState(rx.State):
                 position="bottom-right"
             )
 
-    def set_cant_personas(self, value: str):
-        try:
-            n = int(value)
-            self.cant_personas = n
-        except:
-            self.cant_personas = 0
-
-    async def reservar(self):
+    async def reservar(self, form_data: dict):
         auth = await self.get_state(AuthState)
 
         if not auth.logged_in:
             return rx.toast.error("Debes iniciar sesión primero.", position="bottom-right")
-        
+
+        hora = form_data.get("hora", "")
+        tipo_evento = form_data.get("tipo_evento", "").strip()
+        try:
+            cant_personas = int(form_data.get("cant_personas", ""))
+        except ValueError:
+            cant_personas = 0
+
          # 🔴 VALIDACIÓN NUEVA: cantidad de personas
-        if self.cant_personas < 1:
+        if cant_personas < 1:
             return rx.toast.error("La cantidad mínima es 1 persona.", position="bottom-right")
 
-        if not self.fecha or not self.hora or not self.tipo_evento:
+        if not self.fecha or not hora or not tipo_evento:
             return rx.toast.warning("Por favor completa todos los campos.", position="bottom-right")
         
         # 🟢 VALIDACIÓN NUEVA: Fecha pasada
@@ -167,49 +184,47 @@ class ReservaState(rx.State):
         try:
             conn = get_connection()
             cur = conn.cursor()
+
+            # La sesión sigue abierta pero la cuenta ya fue eliminada
+            if not cuenta_activa(cur, auth.current_user):
+                conn.rollback()
+                return [
+                    rx.toast.error("Tu cuenta ya no está activa.", position="bottom-right"),
+                    auth.logout(),
+                ]
             
-            # (Opcional) Doble verificación por seguridad 
-            # por si dos usuarios dieron click al mismo milisegundo
-            check_query = "SELECT id_reserva FROM reserva WHERE fecha=%s AND hora=%s"
-            cur.execute(check_query, (self.fecha, self.hora))
-            if cur.fetchone():
+            # Un solo lock por sucursal y día: se suelta con el commit/rollback
+            cur.execute(BLOQUEAR_DIA_SQL, (f"reserva:{self.id_sucursal}:{self.fecha}",))
+            cur.execute(RESERVAR_SQL, {
+                "usuario": auth.current_user,
+                "personas": cant_personas,
+                "fecha": self.fecha,
+                "hora": hora,
+                "tipo": tipo_evento,
+                "sucursal": self.id_sucursal,
+                "minutos": self.DURACION_RESERVA_MINUTOS + self.BUFFER_ENTRE_EVENTOS_MINUTOS,
+            })
+            if cur.rowcount == 0:
+                # Alguien reservó una hora que choca con ésta mientras llenaba el formulario
+                conn.rollback()
+                await self.cargar_horas_disponibles()
                 return rx.toast.error("¡Ups! Alguien te ganó la hora hace un instante.", position="bottom-right")
 
-            query = """
-                INSERT INTO reserva (id_usuario, cant_personas, fecha, hora, tipo_evento, id_sucursal)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-
-            cur.execute(query, (
-                auth.current_user,
-                int(self.cant_personas),
-                self.fecha,
-                self.hora,
-                self.tipo_evento,
-                self.id_sucursal
-            ))
-
             conn.commit()
             
-            # Limpieza y recarga de horas (para quitar la que acabas de tomar)
-            temp_fecha = self.fecha
-            self.tipo_evento = ""
-            self.hora = ""
-            await self.set_fecha_y_buscar_horas(temp_fecha) # Refrescar lista
-        
             # ----- LIMPIAR FORMULARIO COMPLETO -----
             self.fecha = ""
-            self.hora = ""
-            self.tipo_evento = ""
-            self.cant_personas = 1
             self.horas_disponibles = []
+            self.form_version += 1
             
             return rx.toast.success("¡Reservación realizada con éxito!", position="bottom-right")
 
         except Exception as e:
+            print(f"Error guardando reservación: {e}")
             if conn:
                 conn.rollback()
-            return rx.toast.error(f"Error al guardar: {str(e)}", position="bottom-right")
+            # El detalle queda en el log; al usuario no se le muestra el error de la BD
+            return rx.toast.error("No pudimos guardar tu reservación. Intenta de nuevo.", position="bottom-right")
 
         finally:
             if conn:
@@ -237,112 +252,118 @@ def reservaciones_page():
         sidebar(active_item="reservaciones"),
         sidebar_button(),
         rx.center(
-            glass_card(
-                rx.heading("Haz tu reservación ahora", color="white", size="6", margin_bottom="25px", text_align="center"),
+            # 🟢 Formulario no controlado: hora, tipo y personas se envían juntos
+            rx.form(
+                glass_card(
+                    rx.heading("Haz tu reservación ahora", color="white", size="6", margin_bottom="25px", text_align="center"),
 
-                # --- FILA 1: FECHA + HORA (SELECT) ---
-                rx.hstack(
-                    rx.vstack(
-                        rx.text("Fecha", color="white", margin_bottom="5px"),
-                        rx.input(
-                            type="date",
-                            value=ReservaState.fecha,
-                            # 7. AQUÍ CAMBIAMOS EL EVENTO:
-                            on_change=ReservaState.set_fecha_y_buscar_horas,
-                            min=ReservaState.fecha_minima,
-                            size="3",
-                            width="100%",
-                            background="rgba(255,255,255,0.08)",
-                            color="white",
-                            border_radius="10px",
-                            padding_left="10px",
-                            # Truco para que el icono del calendario se vea blanco (depende navegador)
-                            style={"color-scheme": "dark"}, 
+                    # --- FILA 1: FECHA + HORA (SELECT) ---
+                    rx.hstack(
+                        rx.vstack(
+                            rx.text("Fecha", color="white", margin_bottom="5px"),
+                            rx.input(
+                                type="date",
+                                name="fecha",
+                                value=ReservaState.fecha,
+                                # 7. AQUÍ CAMBIAMOS EL EVENTO:
+                                on_change=ReservaState.set_fecha_y_buscar_horas,
+                                min=ReservaState.fecha_minima,
+                                size="3",
+                                width="100%",
+                                background="rgba(255,255,255,0.08)",
+                                color="white",
+                                border_radius="10px",
+                                padding_left="10px",
+                                # Truco para que el icono del calendario se vea blanco (depende navegador)
+                                style={"color-scheme": "dark"}, 
+                            ),
+                            spacing="1",
+                            width="50%"
                         ),
-                        spacing="1",
-                        width="50%"
-                    ),
-                    # ---------------------------------------------------------
-                    # 🟡 COLUMNA HORA CON "ESCUDO INVISIBLE"
-                    # ---------------------------------------------------------
-                    rx.vstack(
-                        rx.text("Hora Disponible", color="white", margin_bottom="5px"),
+                        # ---------------------------------------------------------
+                        # 🟡 COLUMNA HORA CON "ESCUDO INVISIBLE"
+                        # ---------------------------------------------------------
+                        rx.vstack(
+                            rx.text("Hora Disponible", color="white", margin_bottom="5px"),
                         
-                        rx.box(
-                            # 1. El Select Real (Siempre está ahí visualmente)
-                            rx.select(
-                                ReservaState.horas_disponibles,
-                                placeholder="Selecciona hora...",
-                                on_change=ReservaState.set_hora,
-                                value=ReservaState.hora,
-                                size="3", width="100%", background="rgba(255,255,255,0.08)", color="white", border_radius="10px",
-                                border="1px solid rgba(255,255,255,0.2)",
-                                style={"color-scheme": "dark", "padding-left": "10px"},
-                                _placeholder={"color": "rgba(255,255,255,0.5)"},
-                                _hover={"background": "rgba(255,255,255,0.12)"},
-                            ),
+                            rx.box(
+                                # 1. El Select Real (Siempre está ahí visualmente)
+                                rx.select(
+                                    ReservaState.horas_disponibles,
+                                    placeholder="Selecciona hora...",
+                                    name="hora",
+                                    # Nueva fecha = select nuevo, sin la hora anterior
+                                    key=ReservaState.fecha,
+                                    size="3", width="100%", background="rgba(255,255,255,0.08)", color="white", border_radius="10px",
+                                    border="1px solid rgba(255,255,255,0.2)",
+                                    style={"color-scheme": "dark", "padding-left": "10px"},
+                                    _placeholder={"color": "rgba(255,255,255,0.5)"},
+                                    _hover={"background": "rgba(255,255,255,0.12)"},
+                                ),
 
-                            # 2. El Escudo Invisible
-                            # Solo se renderiza si la fecha está vacía ("")
-                            rx.cond(
-                                ReservaState.fecha == "",
-                                rx.box(
-                                    width="100%",
-                                    height="100%",
-                                    position="absolute", # Se pone encima del padre
-                                    top="0",
-                                    left="0",
-                                    z_index="10", # Asegura que esté encima del Select
-                                    cursor="not-allowed", # Opcional: cambia el cursor
-                                    # Al hacer click aquí, lanzamos el aviso
-                                    on_click=ReservaState.verificar_fecha_para_horas,
-                                )
-                            ),
+                                # 2. El Escudo Invisible
+                                # Solo se renderiza si la fecha está vacía ("")
+                                rx.cond(
+                                    ReservaState.fecha == "",
+                                    rx.box(
+                                        width="100%",
+                                        height="100%",
+                                        position="absolute", # Se pone encima del padre
+                                        top="0",
+                                        left="0",
+                                        z_index="10", # Asegura que esté encima del Select
+                                        cursor="not-allowed", # Opcional: cambia el cursor
+                                        # Al hacer click aquí, lanzamos el aviso
+                                        on_click=ReservaState.verificar_fecha_para_horas,
+                                    )
+                                ),
                             
-                            # Estilos del contenedor padre para permitir el posicionamiento
-                            position="relative", 
-                            width="100%"
-                        ),
+                                # Estilos del contenedor padre para permitir el posicionamiento
+                                position="relative", 
+                                width="100%"
+                            ),
                         
-                        spacing="1", width="50%"
+                            spacing="1", width="50%"
+                        ),
+                        spacing="4",
+                        margin_bottom="20px",
                     ),
-                    spacing="4",
-                    margin_bottom="20px",
-                ),
 
-                # ... (El resto de inputs: Tipo, Cantidad, Tienda, Botón se quedan IGUAL) ...
-                rx.hstack(
-                    rx.vstack(
-                        rx.text("Tipo de reservación", color="white", margin_bottom="5px"),
-                        rx.input(
-                            placeholder="Trabajo, familia, cumpleaños...",
-                            value=ReservaState.tipo_evento,
-                            on_change=ReservaState.set_tipo_evento,
-                            size="3", width="100%", background="rgba(255,255,255,0.08)", color="white", border_radius="10px", padding_left="10px",
+                    # ... (El resto de inputs: Tipo, Cantidad, Tienda, Botón se quedan IGUAL) ...
+                    rx.hstack(
+                        rx.vstack(
+                            rx.text("Tipo de reservación", color="white", margin_bottom="5px"),
+                            rx.input(
+                                placeholder="Trabajo, familia, cumpleaños...",
+                                name="tipo_evento",
+                                size="3", width="100%", background="rgba(255,255,255,0.08)", color="white", border_radius="10px", padding_left="10px",
+                            ),
+                            spacing="1", width="70%"
+                        ),
+                        rx.vstack(
+                            rx.text("Cantidad de personas", color="white", margin_bottom="5px"),
+                            rx.input(
+                                type="number", min=1,
+                                name="cant_personas",
+                                default_value="1",
+                                size="3", width="100%", background="rgba(255,255,255,0.08)", color="white", border_radius="10px", padding_left="10px",
+                            ),
+                            spacing="1", width="30%"
                         ),
-                        spacing="1", width="70%"
+                        spacing="4", margin_bottom="20px",
                     ),
                     rx.vstack(
-                        rx.text("Cantidad de personas", color="white", margin_bottom="5px"),
-                        rx.input(
-                            type="number", min=1,
-                            value=ReservaState.cant_personas,   # ← NECESARIO
-                            on_change=ReservaState.set_cant_personas,
-                            size="3", width="100%", background="rgba(255,255,255,0.08)", color="white", border_radius="10px", padding_left="10px",
-                        ),
-                        spacing="1", width="30%"
+                        rx.text("Tienda", color="white", margin_bottom="5px"),
+                        rx.input(value="Paseo Tabasco", disabled=True, size="3", width="100%", background="rgba(255,255,255,0.15)", color="white", border_radius="10px", padding_left="10px"),
+                        spacing="1", margin_bottom="20px"
+                    ),
+                    rx.button(
+                        "Reservar", width="100%", size="3", background="red", color="white", border_radius="10px", padding="10px", cursor="pointer",
+                        type="submit", transition="background 0.3s ease-in-out", _hover={"background": "#b30000"},
                     ),
-                    spacing="4", margin_bottom="20px",
-                ),
-                rx.vstack(
-                    rx.text("Tienda", color="white", margin_bottom="5px"),
-                    rx.input(value="Paseo Tabasco", disabled=True, size="3", width="100%", background="rgba(255,255,255,0.15)", color="white", border_radius="10px", padding_left="10px"),
-                    spacing="1", margin_bottom="20px"
-                ),
-                rx.button(
-                    "Reservar", width="100%", size="3", background="red", color="white", border_radius="10px", padding="10px", cursor="pointer",
-                    on_click=ReservaState.reservar, transition="background 0.3s ease-in-out", _hover={"background": "#b30000"},
                 ),
+                on_submit=ReservaState.reservar,
+                key=ReservaState.form_version,
             )
         ),
         width="100%", height="100vh",
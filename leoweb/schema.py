@@ -0,0 +1,300 @@
+# schema.py
+# Objetos auxiliares de la base de datos (tablas, funciones y triggers) que usa
+# el panel de administración. Todas las sentencias son idempotentes, así que el
+# script se puede correr tantas veces como se quiera:
+#
+#     python -m leoweb.schema
+#
+# No es un trabajo de mantenimiento: la purga del feed de cambios la hace la
+# app (leoweb/admin/cambios.py) y `resumen_diario` sólo se reconstruye la
+# primera vez (cuando está vacío) o si se pide:
+#
+#     python -m leoweb.schema --reconstruir-resumen
+import sys
+
+from .auth_state import get_connection
+
+# --------------------------------------------------------
+# FEED DE CAMBIOS (seguimiento incremental para el admin)
+# --------------------------------------------------------
+# Cada INSERT/UPDATE/DELETE sobre las tablas vigiladas deja una fila en
+# `cambios` con el xid de la transacción que lo hizo. La "versión" que guarda
+# cada state del admin no es `id_cambio` (se asigna al insertar, no al hacer
+# commit: una transacción más vieja puede hacer commit después) sino el xmin de
+# su snapshot, ver leoweb/admin/cambios.py.
+CAMBIOS_SQL = """
+CREATE TABLE IF NOT EXISTS cambios (
+    id_cambio BIGSERIAL PRIMARY KEY,
+    tabla TEXT NOT NULL,
+    id_registro INTEGER NOT NULL,
+    operacion CHAR(1) NOT NULL,
+    fecha TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_cambios_tabla_id ON cambios (tabla, id_cambio);
+
+-- Transacción que hizo el cambio (xid8 como número)
+ALTER TABLE cambios ADD COLUMN IF NOT EXISTS xid BIGINT NOT NULL
+    DEFAULT pg_current_xact_id()::text::bigint;
+CREATE INDEX IF NOT EXISTS idx_cambios_tabla_xid ON cambios (tabla, xid);
+
+-- Hasta qué xid se purgó el feed (una sola fila). Un state con una marca
+-- anterior pudo perder cambios y tiene que recargar todo.
+CREATE TABLE IF NOT EXISTS cambios_purga (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    hasta_xid BIGINT NOT NULL
+);
+
+-- TG_ARGV[0]: columna con el id del registro
+-- TG_ARGV[1]: nombre lógico de la tabla en el feed
+-- TG_ARGV[2]: (opcional) operación fija a registrar
+-- Además del registro en `cambios`, avisa por NOTIFY en el canal
+-- `cambios_<tabla>` (lo escucha leoweb/admin/live.py).
+CREATE OR REPLACE FUNCTION registrar_cambio() RETURNS trigger AS $$
+DECLARE
+    fila JSONB;
+    v_id INTEGER;
+    v_op CHAR(1);
+    v_cambio BIGINT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        fila := to_jsonb(OLD);
+    ELSE
+        fila := to_jsonb(NEW);
+    END IF;
+
+    v_id := (fila->>TG_ARGV[0])::INTEGER;
+    v_op := COALESCE(TG_ARGV[2], left(TG_OP, 1));
+
+    INSERT INTO cambios (tabla, id_registro, operacion)
+    VALUES (TG_ARGV[1], v_id, v_op)
+    RETURNING id_cambio INTO v_cambio;
+
+    PERFORM pg_notify(
+        'cambios_' || TG_ARGV[1],
+        json_build_object('id', v_id, 'op', v_op, 'cambio', v_cambio)::TEXT
+    );
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_cambios_reserva ON reserva;
+CREATE TRIGGER trg_cambios_reserva
+    AFTER INSERT OR UPDATE OR DELETE ON reserva
+    FOR EACH ROW EXECUTE FUNCTION registrar_cambio('id_reserva', 'reserva');
+
+DROP TRIGGER IF EXISTS trg_cambios_eventos ON eventos;
+CREATE TRIGGER trg_cambios_eventos
+    AFTER INSERT OR UPDATE OR DELETE ON eventos
+    FOR EACH ROW EXECUTE FUNCTION registrar_cambio('id_evento', 'eventos');
+
+-- Un cambio en las líneas del menú es un cambio (U) del evento al que pertenecen
+DROP TRIGGER IF EXISTS trg_cambios_menu_evento ON menu_evento;
+CREATE TRIGGER trg_cambios_menu_evento
+    AFTER INSERT OR UPDATE OR DELETE ON menu_evento
+    FOR EACH ROW EXECUTE FUNCTION registrar_cambio('id_evento', 'eventos', 'U');
+
+DROP TRIGGER IF EXISTS trg_cambios_menu ON menu;
+CREATE TRIGGER trg_cambios_menu
+    AFTER INSERT OR UPDATE OR DELETE ON menu
+    FOR EACH ROW EXECUTE FUNCTION registrar_cambio('id_producto', 'menu');
+"""
+
+# --------------------------------------------------------
+# BÚSQUEDA DEL ADMIN (índices trigram para ILIKE '%texto%')
+# --------------------------------------------------------
+BUSQUEDA_SQL = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_usuarios_nombre_trgm ON usuarios USING gin (nombre gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_usuarios_correo_trgm ON usuarios USING gin (correo gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_usuarios_telefono_trgm ON usuarios USING gin (telefono gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_reserva_tipo_evento_trgm ON reserva USING gin (tipo_evento gin_trgm_ops);
+
+-- Paginación por llave de /admin/usuarios (ORDER BY nombre, id_usuario)
+CREATE INDEX IF NOT EXISTS idx_usuarios_rol_nombre ON usuarios (rol, nombre, id_usuario);
+
+-- Conteo de reservas/eventos por usuario
+CREATE INDEX IF NOT EXISTS idx_reserva_usuario ON reserva (id_usuario);
+CREATE INDEX IF NOT EXISTS idx_eventos_usuario ON eventos (id_usuario);
+"""
+
+# --------------------------------------------------------
+# RESUMEN DIARIO (series de tiempo del dashboard)
+# --------------------------------------------------------
+# Una fila por día y sucursal, mantenida al vuelo por triggers: cada alta,
+# cambio o baja en `reserva`/`eventos` suma o resta su parte. Los eventos a
+# domicilio (y las reservas sin sucursal) van a id_sucursal = 0.
+# leoweb/admin/analitica.py agrega estas filas por día, semana o mes.
+RESUMEN_SQL = """
+CREATE TABLE IF NOT EXISTS resumen_diario (
+    dia DATE NOT NULL,
+    id_sucursal INTEGER NOT NULL DEFAULT 0,
+    reservas INTEGER NOT NULL DEFAULT 0,
+    personas_reservas INTEGER NOT NULL DEFAULT 0,
+    eventos INTEGER NOT NULL DEFAULT 0,
+    personas_eventos INTEGER NOT NULL DEFAULT 0,
+    ingresos NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, id_sucursal)
+);
+
+CREATE OR REPLACE FUNCTION acumular_resumen(
+    p_dia DATE, p_sucursal INTEGER,
+    p_reservas INTEGER, p_personas_reservas INTEGER,
+    p_eventos INTEGER, p_personas_eventos INTEGER, p_ingresos NUMERIC
+) RETURNS void AS $$
+    INSERT INTO resumen_diario AS r
+        (dia, id_sucursal, reservas, personas_reservas, eventos, personas_eventos, ingresos)
+    VALUES (p_dia, COALESCE(p_sucursal, 0), p_reservas, p_personas_reservas,
+            p_eventos, p_personas_eventos, p_ingresos)
+    ON CONFLICT (dia, id_sucursal) DO UPDATE SET
+        reservas = r.reservas + EXCLUDED.reservas,
+        personas_reservas = r.personas_reservas + EXCLUDED.personas_reservas,
+        eventos = r.eventos + EXCLUDED.eventos,
+        personas_eventos = r.personas_eventos + EXCLUDED.personas_eventos,
+        ingresos = r.ingresos + EXCLUDED.ingresos;
+$$ LANGUAGE sql;
+
+-- Un UPDATE resta la fila vieja y suma la nueva (puede cambiar de día o sucursal)
+CREATE OR REPLACE FUNCTION resumen_reserva() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM acumular_resumen(OLD.fecha, OLD.id_sucursal,
+                                 -1, -COALESCE(OLD.cant_personas, 0), 0, 0, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM acumular_resumen(NEW.fecha, NEW.id_sucursal,
+                                 1, COALESCE(NEW.cant_personas, 0), 0, 0, 0);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION resumen_evento() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM acumular_resumen(OLD.fecha, 0, 0, 0,
+                                 -1, -COALESCE(OLD.cant_personas, 0), -COALESCE(OLD.costo, 0));
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM acumular_resumen(NEW.fecha, 0, 0, 0,
+                                 1, COALESCE(NEW.cant_personas, 0), COALESCE(NEW.costo, 0));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_resumen_reserva ON reserva;
+CREATE TRIGGER trg_resumen_reserva
+    AFTER INSERT OR UPDATE OR DELETE ON reserva
+    FOR EACH ROW EXECUTE FUNCTION resumen_reserva();
+
+DROP TRIGGER IF EXISTS trg_resumen_eventos ON eventos;
+CREATE TRIGGER trg_resumen_eventos
+    AFTER INSERT OR UPDATE OR DELETE ON eventos
+    FOR EACH ROW EXECUTE FUNCTION resumen_evento();
+"""
+
+# Reconstrucción completa del resumen a partir de las tablas crudas. Bloquea
+# las escrituras mientras tanto para que ningún trigger quede a medias, así que
+# no va en SCHEMA_SQL: ver create_schema().
+RECONSTRUIR_RESUMEN_SQL = """
+LOCK TABLE reserva, eventos IN SHARE MODE;
+
+TRUNCATE resumen_diario;
+
+INSERT INTO resumen_diario
+    (dia, id_sucursal, reservas, personas_reservas, eventos, personas_eventos, ingresos)
+SELECT dia, id_sucursal,
+       SUM(reservas), SUM(personas_reservas),
+       SUM(eventos), SUM(personas_eventos), SUM(ingresos)
+FROM (
+    SELECT fecha AS dia, COALESCE(id_sucursal, 0) AS id_sucursal,
+           1 AS reservas, COALESCE(cant_personas, 0) AS personas_reservas,
+           0 AS eventos, 0 AS personas_eventos, 0 AS ingresos
+    FROM reserva
+    UNION ALL
+    SELECT fecha, 0, 0, 0, 1, COALESCE(cant_personas, 0), COALESCE(costo, 0)
+    FROM eventos
+) t
+GROUP BY dia, id_sucursal;
+"""
+
+# --------------------------------------------------------
+# DEMANDA DE PRODUCTOS (la llena leoweb/admin/demanda.py)
+# --------------------------------------------------------
+DEMANDA_SQL = """
+CREATE TABLE IF NOT EXISTS demanda_diaria (
+    id_producto INTEGER NOT NULL,
+    dia DATE NOT NULL,
+    cantidad INTEGER NOT NULL,
+    PRIMARY KEY (id_producto, dia)
+);
+
+CREATE INDEX IF NOT EXISTS idx_demanda_diaria_dia ON demanda_diaria (dia);
+
+CREATE TABLE IF NOT EXISTS pronostico_demanda (
+    id_producto INTEGER PRIMARY KEY,
+    promedio_movil NUMERIC(10, 2) NOT NULL,
+    suavizado NUMERIC(10, 2) NOT NULL,
+    pronostico NUMERIC(10, 2) NOT NULL,
+    confirmado INTEGER NOT NULL,
+    actualizado TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+# --------------------------------------------------------
+# ELIMINACIÓN DIFERIDA DE USUARIOS (ver leoweb/admin/purga.py)
+# --------------------------------------------------------
+USUARIOS_SQL = """
+ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS eliminado_en TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_usuarios_eliminados
+    ON usuarios (id_usuario) WHERE eliminado_en IS NOT NULL;
+"""
+
+# Orden en que se aplican los bloques
+SCHEMA_SQL = [
+    CAMBIOS_SQL,
+    BUSQUEDA_SQL,
+    RESUMEN_SQL,
+    DEMANDA_SQL,
+    USUARIOS_SQL,
+]
+
+
+def create_schema(reconstruir_resumen: bool = False):
+    """
+    Crea (o actualiza) los objetos auxiliares de la base de datos. El resumen
+    diario se llena sólo si está vacío, o si se pide `reconstruir_resumen`.
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+
+        for sql in SCHEMA_SQL:
+            cur.execute(sql)
+
+        if not reconstruir_resumen:
+            cur.execute("SELECT NOT EXISTS (SELECT 1 FROM resumen_diario);")
+            reconstruir_resumen = cur.fetchone()[0]
+        if reconstruir_resumen:
+            cur.execute(RECONSTRUIR_RESUMEN_SQL)
+            print("✅ Resumen diario reconstruido.")
+
+        conn.commit()
+        print("✅ Esquema auxiliar actualizado.")
+
+    except Exception as e:
+        print(f"❌ ERROR de Base de Datos: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    create_schema(reconstruir_resumen="--reconstruir-resumen" in sys.argv[1:])
@@ -0,0 +1,242 @@
+# sesiones.py
+# Almacén de los states de sesión con límites (reemplaza al StateManagerDisk
+# que Reflex usa por defecto sin Redis).
+#
+# El almacén por defecto guarda un .pkl por substate en `.states/` y sólo los
+# borra por antigüedad. Las sesiones de admin incluyen listas grandes
+# (_eventos, _reservas...), así que el directorio y la memoria
+# crecen con el tráfico. Aquí:
+#   - TTL: los archivos sin uso en ESTADOS_TTL segundos se borran.
+#   - Tope de bytes en disco: al pasarse se borran los menos usados (LRU).
+#   - Tope de sesiones en memoria: las menos usadas se sueltan (siguen en disco).
+#   - Serialización compacta: el pickle de Reflex comprimido con zlib.
+#   - metricas_sesiones(): cuántos states y cuántos bytes hay.
+import dataclasses
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from reflex.istate.manager.disk import StateManagerDisk
+from reflex.state import BaseState, _split_substate_key, _substate_key
+from reflex.utils.misc import run_in_thread
+
+# Vida de un state sin uso (segundos)
+ESTADOS_TTL = 24 * 60 * 60
+# Tope de bytes de `.states/`
+ESTADOS_MAX_BYTES = 100 * 1024 * 1024
+# Sesiones (árboles de state completos) que se mantienen en memoria
+ESTADOS_MAX_EN_MEMORIA = 500
+# Cada cuánto se vuelve a revisar el directorio completo (segundos)
+REVISION_SEGUNDOS = 60
+
+# Prefijo que distingue los archivos comprimidos de los .pkl viejos sin comprimir
+_MAGICO = b"LWZ1"
+
+_metricas: Dict[str, int] = {
+    "en_memoria": 0,
+    "archivos": 0,
+    "bytes": 0,
+    "expirados": 0,
+    "expulsados_disco": 0,
+    "expulsados_memoria": 0,
+}
+
+
+def metricas_sesiones() -> Dict[str, int]:
+    """Copia de las métricas del almacén de sesiones."""
+    return dict(_metricas)
+
+
+@dataclasses.dataclass
+class StateManagerAcotado(StateManagerDisk):
+    """StateManagerDisk con TTL, tope de bytes/memoria (LRU) y archivos comprimidos."""
+
+    token_expiration: int = ESTADOS_TTL
+
+    # archivo -> bytes, del menos al más usado
+    _indice: "OrderedDict[Path, int]" = dataclasses.field(default_factory=OrderedDict, init=False)
+    _bytes: int = dataclasses.field(default=0, init=False)
+    _ultima_revision: float = dataclasses.field(default=0.0, init=False)
+    # archivo -> client token de su sesión, y al revés (sólo los archivos que
+    # este proceso leyó o escribió; los demás no tienen dueño conocido)
+    _dueno: Dict[Path, str] = dataclasses.field(default_factory=dict, init=False)
+    _archivos_de: Dict[str, Set[Path]] = dataclasses.field(default_factory=dict, init=False)
+    # Reflex corre la revisión en un hilo (run_in_thread) mientras el event
+    # loop registra usos: todo cambio al índice pasa por este lock
+    _lock_indice: threading.Lock = dataclasses.field(default_factory=threading.Lock, init=False)
+
+    # --------------------------------------------------
+    # TTL + reconstrucción del índice (lo llama Reflex al iniciar y en cada
+    # vuelta de la cola de escritura, en un hilo; aquí sólo corre cada
+    # REVISION_SEGUNDOS)
+    # --------------------------------------------------
+    def _purge_expired_states(self):
+        ahora = time.time()
+        if ahora - self._ultima_revision < REVISION_SEGUNDOS:
+            return
+        self._ultima_revision = ahora
+
+        # El recorrido del directorio va sin el lock
+        archivos = []
+        expirados = set()
+        # Rutas absolutas, como las de token_path(): si no, el mismo archivo
+        # entraría dos veces al índice
+        for path in self.states_directory.absolute().glob("*.pkl"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if ahora - st.st_mtime > self.token_expiration:
+                path.unlink(missing_ok=True)
+                expirados.add(path)
+                _metricas["expirados"] += 1
+            else:
+                archivos.append((st.st_mtime, path, st.st_size))
+        archivos.sort() # Por último uso (mtime)
+
+        with self._lock_indice:
+            # El índice en memoria es al menos tan nuevo como el recorrido: se
+            # respetan sus tamaños y lo que se escribió mientras se recorría
+            anterior = self._indice
+            indice = OrderedDict(
+                (path, anterior.get(path, size)) for _, path, size in archivos
+            )
+            for path, size in anterior.items():
+                if path not in indice and path not in expirados:
+                    indice[path] = size
+            for path in expirados:
+                self._olvidar(path)
+
+            self._indice = indice
+            self._bytes = sum(indice.values())
+            self._respetar_tope()
+
+    def _respetar_tope(self):
+        """
+        Borra los archivos menos usados hasta quedar bajo ESTADOS_MAX_BYTES
+        (con el lock tomado). Nunca toca los de una sesión que sigue en
+        memoria, y una sesión fría se borra completa: borrar sólo parte de sus
+        substates (p. ej. AuthState) la dejaría a medias.
+        """
+        if self._bytes > ESTADOS_MAX_BYTES:
+            for path in list(self._indice):
+                if self._bytes <= ESTADOS_MAX_BYTES:
+                    break
+                if path not in self._indice:
+                    continue # Ya salió con el resto de su sesión
+                dueno = self._dueno.get(path)
+                if dueno is not None and dueno in self.states:
+                    continue
+                for archivo in list(self._archivos_de.get(dueno, ())) or [path]:
+                    self._borrar(archivo)
+        _metricas["archivos"] = len(self._indice)
+        _metricas["bytes"] = self._bytes
+
+    def _borrar(self, path: Path):
+        size = self._indice.pop(path, 0)
+        path.unlink(missing_ok=True)
+        self._bytes -= size
+        self._olvidar(path)
+        _metricas["expulsados_disco"] += 1
+
+    def _olvidar(self, path: Path):
+        dueno = self._dueno.pop(path, None)
+        if dueno is not None:
+            archivos = self._archivos_de.get(dueno)
+            if archivos is not None:
+                archivos.discard(path)
+                if not archivos:
+                    del self._archivos_de[dueno]
+
+    def _registrar_uso(self, path: Path, token: str, size: Optional[int] = None):
+        """Marca el archivo como el más reciente (y actualiza su tamaño si cambió)."""
+        client_token = _split_substate_key(token)[0]
+        with self._lock_indice:
+            anterior = self._indice.pop(path, 0)
+            if size is None:
+                size = anterior
+            self._indice[path] = size
+            self._bytes += size - anterior
+            self._dueno[path] = client_token
+            self._archivos_de.setdefault(client_token, set()).add(path)
+            self._respetar_tope()
+
+    # --------------------------------------------------
+    # LECTURA / ESCRITURA COMPRIMIDA
+    # --------------------------------------------------
+    def _escribir(self, path: Path, datos: bytes):
+        path.write_bytes(_MAGICO + zlib.compress(datos, 6))
+
+    async def load_state(self, token: str) -> Optional[BaseState]:
+        path = self.token_path(token)
+        try:
+            datos = path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        try:
+            if datos.startswith(_MAGICO):
+                datos = zlib.decompress(datos[len(_MAGICO):])
+            state = BaseState._deserialize(data=datos)
+        except Exception:
+            return None
+
+        # Leerlo cuenta como uso: también para el TTL por mtime
+        path.touch()
+        self._registrar_uso(path, token)
+        return state
+
+    async def set_state_for_substate(self, client_token: str, substate: BaseState):
+        substate_token = _substate_key(client_token, substate)
+
+        if substate._get_was_touched():
+            substate._was_touched = False
+            pickle_state = substate._serialize()
+            if pickle_state:
+                self.states_directory.mkdir(parents=True, exist_ok=True)
+                path = self.token_path(substate_token)
+                await run_in_thread(lambda: self._escribir(path, pickle_state))
+                self._registrar_uso(path, substate_token, path.stat().st_size)
+
+        for substate_substate in substate.substates.values():
+            await self.set_state_for_substate(client_token, substate_substate)
+
+    # --------------------------------------------------
+    # TOPE DE SESIONES EN MEMORIA
+    # --------------------------------------------------
+    async def get_state(self, token: str) -> BaseState:
+        client_token = _split_substate_key(token)[0]
+        root_state = await super().get_state(token)
+
+        # Reinsertar = la más usada queda al final
+        self.states[client_token] = self.states.pop(client_token)
+        self._soltar_sesiones(client_token)
+        _metricas["en_memoria"] = len(self.states)
+        return root_state
+
+    def _soltar_sesiones(self, actual: str):
+        """Suelta de memoria las sesiones menos usadas que ya estén guardadas en disco."""
+        exceso = len(self.states) - ESTADOS_MAX_EN_MEMORIA
+        if exceso <= 0:
+            return
+        # La cola de escritura va por substate: sus sesiones aún no están en disco
+        pendientes = {_split_substate_key(k)[0] for k in self._write_queue}
+        for token in list(self.states):
+            if exceso <= 0:
+                break
+            lock = self._states_locks.get(token)
+            # Nunca soltar una sesión en uso o con escritura pendiente
+            if token == actual or token in pendientes or (lock is not None and lock.locked()):
+                continue
+            self.states.pop(token, None)
+            exceso -= 1
+            _metricas["expulsados_memoria"] += 1
+
+
+def usar_almacen_acotado(app):
+    """Cambia el almacén de disco de Reflex por StateManagerAcotado (con Redis no hace nada)."""
+    if isinstance(app._state_manager, StateManagerDisk) and not isinstance(app._state_manager, StateManagerAcotado):
+        app._state_manager = StateManagerAcotado(state=app._state)
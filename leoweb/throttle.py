@@ -0,0 +1,127 @@
+# throttle.py
+# Límite de intentos de login (token bucket) por correo y por IP.
+#
+# Cada intento fallido de login cuesta una consulta y un PBKDF2 completo, así
+# que un ataque de credential stuffing puede saturar el CPU. Antes de tocar la
+# BD o el hash, LoginState.login pide una ficha a cada cubeta (la del correo y la
+# de la IP); si alguna está vacía el intento se rechaza sin costo. Es todo o
+# nada: se revisan las dos y sólo se descuenta si ambas tienen ficha, así un
+# intento rechazado por la IP no gasta los del correo (ni al revés).
+#
+# Backends:
+#   - MemoriaBackend: un OrderedDict acotado (LRU) por proceso.
+#   - RedisBackend: compartido entre workers; se usa solo si rxconfig tiene
+#     redis_url (el mismo Redis que usa Reflex para el state).
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+
+from reflex.utils.prerequisites import get_redis
+
+# (capacidad, fichas por segundo)
+# Por correo: 5 intentos seguidos, luego 1 cada 30 s
+LIMITE_CORREO = (5, 1 / 30)
+# Por IP: 20 intentos seguidos, luego 1 por segundo (varias personas detrás de un NAT)
+LIMITE_IP = (20, 1.0)
+
+# Máximo de cubetas en memoria; se descartan las menos usadas
+MAX_CUBETAS = 100_000
+
+# (clave, capacidad, fichas por segundo)
+Cubeta = Tuple[str, int, float]
+
+
+class MemoriaBackend:
+    """Cubetas en memoria: clave -> (fichas, último acceso), con desalojo LRU."""
+
+    def __init__(self, max_cubetas: int = MAX_CUBETAS):
+        self.max_cubetas = max_cubetas
+        self._cubetas: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consumir(self, cubetas: Sequence[Cubeta]) -> bool:
+        ahora = time.monotonic()
+        rellenas = []
+        for clave, capacidad, por_segundo in cubetas:
+            fichas, ultimo = self._cubetas.pop(clave, (capacidad, ahora))
+            rellenas.append((clave, min(capacidad, fichas + (ahora - ultimo) * por_segundo)))
+
+        permitido = all(fichas >= 1 for _, fichas in rellenas)
+
+        for clave, fichas in rellenas:
+            # Reinsertar al final = usada más recientemente
+            self._cubetas[clave] = (fichas - 1 if permitido else fichas, ahora)
+            if len(self._cubetas) > self.max_cubetas:
+                self._cubetas.popitem(last=False)
+        return permitido
+
+
+class RedisBackend:
+    """Cubetas en Redis (un hash por clave) para compartirlas entre workers."""
+
+    # Rellenar todas las cubetas y consumir de todas o de ninguna, de forma
+    # atómica del lado de Redis. ARGV: ahora, luego capacidad y fichas por
+    # segundo de cada clave en KEYS.
+    SCRIPT = """
+        local ahora = tonumber(ARGV[1])
+        local fichas = {}
+        local permitido = 1
+        for i, clave in ipairs(KEYS) do
+            local capacidad = tonumber(ARGV[i * 2])
+            local por_segundo = tonumber(ARGV[i * 2 + 1])
+            local c = redis.call('HMGET', clave, 'f', 't')
+            local f = tonumber(c[1]) or capacidad
+            local ultimo = tonumber(c[2]) or ahora
+            fichas[i] = math.min(capacidad, f + (ahora - ultimo) * por_segundo)
+            if fichas[i] < 1 then
+                permitido = 0
+            end
+        end
+        for i, clave in ipairs(KEYS) do
+            local capacidad = tonumber(ARGV[i * 2])
+            local por_segundo = tonumber(ARGV[i * 2 + 1])
+            redis.call('HSET', clave, 'f', fichas[i] - permitido, 't', ahora)
+            redis.call('EXPIRE', clave, math.ceil(capacidad / por_segundo))
+        end
+        return permitido
+    """
+
+    def __init__(self, redis):
+        self._consumir = redis.register_script(self.SCRIPT)
+
+    async def consumir(self, cubetas: Sequence[Cubeta]) -> bool:
+        args = [time.time()]
+        for _, capacidad, por_segundo in cubetas:
+            args += [capacidad, por_segundo]
+        resultado = await self._consumir(
+            keys=[f"leoweb:login:{clave}" for clave, _, _ in cubetas],
+            args=args,
+        )
+        return bool(resultado)
+
+
+_backend = None
+
+
+def backend():
+    """Backend activo: Redis si está configurado, si no memoria local."""
+    global _backend
+    if _backend is None:
+        redis = get_redis()
+        _backend = RedisBackend(redis) if redis is not None else MemoriaBackend()
+    return _backend
+
+
+def usar_backend(nuevo) -> None:
+    """Reemplaza el backend (cualquier objeto con `async consumir(cubetas) -> bool`, todo o nada)."""
+    global _backend
+    _backend = nuevo
+
+
+async def permitir_login(correo: str, ip: Optional[str]) -> bool:
+    """True si el intento de login puede seguir (hay ficha para el correo y para la IP)."""
+    correo = correo.strip().lower()
+    cubetas = [(f"correo:{correo}", *LIMITE_CORREO)]
+    if ip:
+        cubetas.append((f"ip:{ip}", *LIMITE_IP))
+    # Se descuenta de las dos sólo si ambas tienen ficha
+    return await backend().consumir(cubetas)
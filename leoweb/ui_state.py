@@ -1,7 +1,21 @@
-import reflex as rx
+# ui_state.py
+# Estado puramente visual (sidebar, modales, desplegables) que vive sólo en el
+# navegador. Cambiarlo no manda nada al backend ni serializa ningún state; el
+# backend sólo lo toca cuando hace falta (p. ej. cerrar un modal tras guardar)
+# con `var.push(valor)`.
+#
+#     rx.cond(UIState.sidebar_open, ...)        # leer
+#     on_click=UIState.toggle_sidebar           # cambiar
+from reflex.experimental.client_state import ClientStateVar
 
-class UIState(rx.State):
-    sidebar_open: bool = False
 
-    def toggle_sidebar(self):
-        self.sidebar_open = not self.sidebar_open
+def alternar(var: ClientStateVar):
+    """Acción de cliente que invierte un ClientStateVar booleano."""
+    return var.set_value(~var.value)
+
+
+class UIState:
+    # Sidebar de la parte pública (cerrada por defecto)
+    sidebar = ClientStateVar.create("sidebar_open", default=False)
+    sidebar_open = sidebar.value
+    toggle_sidebar = alternar(sidebar)
@@ -1,7 +1,35 @@
 import reflex as rx
 
+# Modo multi-worker: basta con apuntar a un Redis (o compatible: Valkey, KeyDB...)
+#
+#     REFLEX_REDIS_URL=redis://localhost:6379 reflex run --env prod
+#
+# Con redis_url Reflex guarda el state de las sesiones en Redis y levanta varios
+# workers del backend. Las cachés locales de cada worker se mantienen coherentes
+# con el bus de invalidación (leoweb/admin/bus.py) y los límites de login y los
+# tickets de exportación se comparten por el mismo Redis.
+#
+# Lo que sigue siendo de cada proceso (a propósito, no pasa por Redis ni el bus):
+#   - leoweb/admin/live.py TABLAS / SUSCRIPTORES: cada worker avisa en vivo
+#     sólo a las pestañas cuyo websocket atiende. Si una pestaña reconecta a
+#     otro worker deja de recibir deltas hasta que vuelve a cargar la página
+#     (el on_load la suscribe ahí y el feed de cambios la pone al día).
+#   - leoweb/admin/segundo_plano.py _activas: cancelar() sólo corta cargas de
+#     su propio proceso. Si el cancel llega a otro worker (la pestaña
+#     reconectó a media carga) la consulta corre hasta el final y escribe su
+#     resultado con su marca del feed; el siguiente sync lo pone al día. Se
+#     desperdicia esa consulta, no la consistencia.
+#   - leoweb/admin/acceso.py _roles: caché local, pero se invalida en todos
+#     los workers por el bus; si un aviso se pierde (listener reconectando)
+#     el rol viejo dura a lo más ROL_TTL segundos.
+#
+# Prueba rápida con dos procesos contra la misma BD y el mismo Redis:
+#
+#     REFLEX_REDIS_URL=redis://localhost:6379 python -m scripts.smoke_workers
 config = rx.Config(
     app_name="leoweb",
+    # Misma vida que las sesiones en disco (leoweb/sesiones.py)
+    redis_token_expiration=24 * 60 * 60,
     plugins=[
         rx.plugins.SitemapPlugin(),
         rx.plugins.TailwindV4Plugin(),
@@ -0,0 +1,124 @@
+# scripts/bench_delta.py
+# Tamaño del delta de state de las reservaciones del admin, antes y después
+# del almacén por id (ver leoweb/admin/reservaciones.py).
+#
+# Antes: la ventana viajaba agrupada por día con cada reserva completa
+# (fecha_dt incluida) y otra vez copiada en grouped_reservations_list.
+# Ahora: la ventana viaja una vez, por id (reservas), y los grupos sólo
+# llevan ids (grupos).
+#
+# No necesita BD: arma N filas sintéticas y serializa el delta con el mismo
+# json de Reflex. Mide la ventana inicial, la lista completa (ya se hizo
+# scroll hasta el final) y lo que viaja cuando cambia una sola fila. También
+# el pickle del almacén del backend, que es lo que se guarda en Redis.
+#
+#     python -m scripts.bench_delta            # N = 100, 1000, 10000
+#     python -m scripts.bench_delta 500 5000
+import pickle
+import random
+import sys
+from datetime import date, datetime, time, timedelta
+
+# reflex.state primero: importar los módulos del admin sueltos sin él
+# dispara un import circular
+import reflex.state  # noqa: F401
+from reflex.utils.format import json_dumps
+
+from leoweb.admin import ventana
+from leoweb.admin.agrupacion import agrupar_ids_por_fecha, agrupar_por_fecha, clave_orden
+from leoweb.admin.reservaciones import Reserva, formatear_reserva
+
+TAMANOS = [100, 1000, 10000]
+TIPOS = ["Cumpleaños", "Aniversario", "Reunión", "Cena de negocios", "Otro"]
+SUCURSALES = ["Centro", "Norte", None]
+
+
+def filas_sinteticas(n: int, hoy: date) -> list:
+    """N reservas repartidas en ±60 días, en el orden de la consulta (por cubetas)."""
+    azar = random.Random(n)
+    filas = [
+        Reserva(
+            id_reserva=i,
+            cant_personas=azar.randint(1, 12),
+            fecha_dt=datetime.combine(
+                hoy + timedelta(days=azar.randint(-60, 60)),
+                time(azar.randint(12, 22), azar.choice((0, 30))),
+            ),
+            tipo_evento=azar.choice(TIPOS),
+            sucursal=azar.choice(SUCURSALES),
+            usuario_nombre=f"Cliente {i}",
+            usuario_correo=f"cliente{i}@correo.com",
+            usuario_telefono=f"55{i:08d}" if i % 3 else None,
+        )
+        for i in range(1, n + 1)
+    ]
+    filas.sort(key=lambda r: (clave_orden(r.fecha_dt, hoy), r.id_reserva))
+    return filas
+
+
+def _dict_antes(r: Reserva, ahora: datetime) -> dict:
+    """La reserva como la armaba el fetch anterior (con fecha_dt)."""
+    return {**formatear_reserva(r, ahora), "fecha_dt": r.fecha_dt}
+
+
+def delta_antes(filas: list, ahora: datetime, hoy: date) -> dict:
+    """grouped_reservations + su copia en lista, como viajaban antes."""
+    agrupadas = {
+        clave: {"header": g["header"], "reservas": [_dict_antes(r, ahora) for r in g["filas"]]}
+        for clave, g in agrupar_por_fecha(filas, "filas", "RESERVACIONES PASADAS", hoy).items()
+    }
+    return {
+        "grouped_reservations": agrupadas,
+        "grouped_reservations_list": [
+            {"date_key": k, "header": v["header"], "reservas": v["reservas"]}
+            for k, v in agrupadas.items()
+        ],
+    }
+
+
+def delta_despues(filas: list, ahora: datetime, hoy: date) -> dict:
+    """reservas por id + grupos con sólo ids."""
+    return {
+        "reservas": {r.id_reserva: formatear_reserva(r, ahora) for r in filas},
+        "grupos": agrupar_ids_por_fecha(filas, "id_reserva", "RESERVACIONES PASADAS", hoy),
+    }
+
+
+def tam(valor) -> int:
+    return len(json_dumps(valor).encode())
+
+
+def kb(n: int) -> str:
+    return f"{n / 1024:,.1f} KB"
+
+
+def medir(n: int):
+    hoy, ahora = date.today(), datetime.now()
+    filas = filas_sinteticas(n, hoy)
+
+    # Cambia una reserva de la ventana visible: ambos lados reenvían sus vars completas
+    ventana_inicial = filas[:ventana.VENTANA_PASO]
+    cambiada = list(ventana_inicial)
+    cambiada[0] = Reserva(**{**{f: getattr(cambiada[0], f) for f in Reserva.__slots__}, "cant_personas": 99})
+
+    casos = [
+        ("ventana inicial", ventana_inicial),
+        ("lista completa", filas),
+        ("1 fila cambiada", cambiada),
+    ]
+    print(f"\nN = {n:,} (ventana de {ventana.VENTANA_PASO})")
+    print(f"  {'caso':<18}{'antes':>14}{'después':>14}{'ahorro':>10}")
+    for nombre, visibles in casos:
+        antes = tam(delta_antes(visibles, ahora, hoy))
+        despues = tam(delta_despues(visibles, ahora, hoy))
+        print(f"  {nombre:<18}{kb(antes):>14}{kb(despues):>14}{1 - despues / antes:>10.0%}")
+
+    # Almacén del backend (lo que va en el pickle del state con Redis)
+    antes = len(pickle.dumps([_dict_antes(r, ahora) for r in filas]))
+    despues = len(pickle.dumps({r.id_reserva: r for r in filas}))
+    print(f"  {'pickle almacén':<18}{kb(antes):>14}{kb(despues):>14}{1 - despues / antes:>10.0%}")
+
+
+if __name__ == "__main__":
+    for n in [int(a) for a in sys.argv[1:]] or TAMANOS:
+        medir(n)
@@ -0,0 +1,155 @@
+# scripts/smoke_workers.py
+# Prueba rápida de lo que comparten varios workers del backend.
+#
+# Levanta dos procesos ("workers") que importan el backend igual que la app y
+# revisan, contra la misma BD y el mismo Redis:
+#   1. lider: si los dos piden el mismo trabajo a la vez, sólo uno lo corre.
+#   2. bus: una invalidación publicada por un worker le llega al otro.
+#   3. exportar: un ticket creado en un worker se canjea (una vez) en el otro.
+#      Sólo con redis_url; sin Redis los tickets son de cada proceso.
+#
+# Se corre desde la raíz del repo (necesita rxconfig.py y las variables de la BD):
+#
+#     REFLEX_REDIS_URL=redis://localhost:6379 python -m scripts.smoke_workers
+#
+# Sale con código 1 si algo falla.
+import multiprocessing as mp
+import select
+import sys
+import time
+
+# Espera máxima por paso (segundos)
+ESPERA = 10
+# Lo que dura el trabajo del líder: de sobra para que el otro worker lo pida a la vez
+TRABAJO_SEGUNDOS = 1.0
+# Usuario inexistente para ensuciar la caché de roles sin tocar datos reales
+USUARIO_PRUEBA = -1
+
+
+def _importar():
+    # reflex.state primero: importar los módulos del admin sueltos sin él
+    # dispara un import circular
+    import reflex.state  # noqa: F401
+    from leoweb.admin import acceso, bus, exportar, lider
+    from leoweb.auth_state import get_connection
+    return acceso, bus, exportar, lider, get_connection
+
+
+# --------------------------------------------------
+# WORKERS
+# --------------------------------------------------
+def _worker_a(resultados, salida, listo, publicado, ticket_q):
+    acceso, bus, exportar, lider, get_connection = _importar()
+
+    # 1. Líder (a la vez que B)
+    salida.wait(ESPERA)
+    corrio = lider.como_lider("smoke_workers", lambda: time.sleep(TRABAJO_SEGUNDOS) or True)
+    resultados.put(("lider", "a", bool(corrio)))
+
+    # 2. Bus: A escucha y tiene el rol cacheado; B publica la invalidación
+    conn = get_connection()
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"LISTEN {bus.CANAL_BUS};")
+    acceso._roles[USUARIO_PRUEBA] = ("admin", time.monotonic() + 3600)
+    listo.set()
+
+    limite = time.monotonic() + ESPERA
+    publicado.wait(ESPERA)
+    while USUARIO_PRUEBA in acceso._roles and time.monotonic() < limite:
+        if select.select([conn], [], [], 0.5) == ([], [], []):
+            continue
+        conn.poll()
+        while conn.notifies:
+            bus.aplicar(conn.notifies.pop(0).payload)
+    conn.close()
+    resultados.put(("bus", "a", USUARIO_PRUEBA not in acceso._roles))
+
+    # 3. Ticket de exportación creado en B
+    ticket = ticket_q.get(timeout=ESPERA)
+    if ticket is None:
+        resultados.put(("exportar", "a", None))
+        return
+    primero = exportar._canjear_ticket(ticket)
+    segundo = exportar._canjear_ticket(ticket)
+    resultados.put(("exportar", "a", primero is not None and primero[0] == "reservas" and segundo is None))
+
+
+def _worker_b(resultados, salida, listo, publicado, ticket_q):
+    acceso, bus, exportar, lider, get_connection = _importar()
+
+    salida.wait(ESPERA)
+    corrio = lider.como_lider("smoke_workers", lambda: time.sleep(TRABAJO_SEGUNDOS) or True)
+    resultados.put(("lider", "b", bool(corrio)))
+
+    listo.wait(ESPERA)
+    conn = get_connection()
+    try:
+        bus.publicar(conn.cursor(), "roles", USUARIO_PRUEBA)
+        conn.commit() # NOTIFY sólo sale con el commit
+    finally:
+        conn.close()
+    publicado.set()
+
+    if exportar._cliente_redis() is None:
+        ticket_q.put(None)
+    else:
+        ticket_q.put(exportar.crear_ticket("reservas"))
+
+
+# --------------------------------------------------
+# ORQUESTACIÓN
+# --------------------------------------------------
+def main() -> int:
+    ctx = mp.get_context("spawn") # Procesos limpios, como workers separados
+    resultados = ctx.Queue()
+    salida, listo, publicado = ctx.Event(), ctx.Event(), ctx.Event()
+    ticket_q = ctx.Queue()
+
+    args = (resultados, salida, listo, publicado, ticket_q)
+    workers = [ctx.Process(target=_worker_a, args=args), ctx.Process(target=_worker_b, args=args)]
+    for w in workers:
+        w.start()
+    # Dar tiempo a que ambos importen el backend antes de la salida simultánea
+    time.sleep(5)
+    salida.set()
+
+    vistos = {}
+    limite = time.monotonic() + 4 * ESPERA
+    while len(vistos) < 4 and time.monotonic() < limite:
+        try:
+            prueba, worker, ok = resultados.get(timeout=1)
+        except Exception:
+            if not any(w.is_alive() for w in workers):
+                break
+            continue
+        vistos[(prueba, worker)] = ok
+
+    for w in workers:
+        w.join(ESPERA)
+        if w.is_alive():
+            w.terminate()
+
+    fallas = []
+    lideres = [vistos.get(("lider", w)) for w in ("a", "b")]
+    if lideres.count(True) != 1:
+        fallas.append(f"lider: corrieron {lideres.count(True)} de 2 (se esperaba 1)")
+    if vistos.get(("bus", "a")) is not True:
+        fallas.append("bus: la invalidación de B no llegó a A")
+    exportado = vistos.get(("exportar", "a"), False)
+    if ("exportar", "a") not in vistos:
+        fallas.append("exportar: A no llegó a canjear el ticket")
+    elif exportado is None:
+        print("⚠️ exportar: sin redis_url, los tickets no se comparten (omitido)")
+    elif exportado is not True:
+        fallas.append("exportar: el ticket de B no se canjeó una sola vez en A")
+
+    for falla in fallas:
+        print(f"❌ {falla}")
+    if not fallas:
+        print("✅ Dos workers: líder único, bus y tickets compartidos.")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())